@@ -0,0 +1,77 @@
+"""
+Micro-benchmark for the parsers of model output.
+Times the tolerant single-pass parser against the strict parser on the fixture corpus of raw outputs,
+and reports how many outputs each of them parses correctly.
+
+Run from the root of the repository with `python -m src.bench_parse`.
+
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+import os
+import json
+import argparse
+import timeit
+from typing import Callable
+
+from .core.rest import RESTSpecification
+
+
+_CORPUS_PATH: str = os.path.join(os.path.dirname(__file__), "core", "fixtures", "raw_outputs.json")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the parsers of model output.")
+    parser.add_argument("--number", "-n", dest="number", type=int, default=2000, help="Number of times to parse each output. Default is 2000.")
+    parser.add_argument("--corpus", "-c", dest="corpus", type=str, default=_CORPUS_PATH, help="Path to a JSON list of raw outputs with their expected test indices. Defaults to the fixture corpus.")
+
+    args = parser.parse_args()
+
+    corpus: list[dict]
+    with open(args.corpus) as f:
+        corpus = json.load(f)
+
+    # A specification with enough tests for the indices of the corpus
+    n_tests: int = 1 + max(
+        (int(test.replace("T-", "")) for entry in corpus for test in entry["tests"]),
+        default=0
+    )
+    specs: RESTSpecification = RESTSpecification.load_specs_from_str(
+        "ID,Feature,Description\n1,test,test",
+        "ID,Purpose,Test steps\n" + "\n".join(f"{i},test,test" for i in range(n_tests))
+    )
+
+    def strict(res: str) -> list[str] | None:
+        try:
+            return specs._parse_intermediary_output(res)
+        except Exception:
+            return None
+
+    def tolerant(res: str) -> list[str]:
+        return specs._parse_output(res)[0]
+
+    parsers: dict[str, Callable[[str], list[str] | None]] = {"strict": strict, "tolerant": tolerant}
+
+    print(f"{'Parser':<12}{'Correct':>10}{'us/call':>10}")
+    for name, parse in parsers.items():
+        correct: int = sum(
+            1 for entry in corpus
+            if parse(entry["raw"]) == specs._map_test_keys(entry["tests"], None)
+        )
+
+        seconds: float = timeit.timeit(
+            lambda: [parse(entry["raw"]) for entry in corpus],
+            number=args.number
+        )
+        per_call: float = seconds / (args.number * len(corpus)) * 1_000_000
+
+        print(f"{name:<12}{f'{correct}/{len(corpus)}':>10}{per_call:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
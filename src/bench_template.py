@@ -0,0 +1,97 @@
+"""
+Micro-benchmark for chat templating.
+Times encoding a growing conversation with the token-level chat encoder against rendering and tokenizing the whole string,
+the way the chatbot encodes its history on every turn, and checks that both produce the same token IDs.
+Only the tokenizer and configuration of the model are loaded, not its weights.
+
+Run from the root of the repository with `python -m src.bench_template`.
+
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+import os
+import argparse
+import copy
+import time
+from typing import Callable
+
+from accelerate import init_empty_weights
+from dotenv import load_dotenv
+from transformers import AutoConfig, AutoModelForCausalLM, PreTrainedModel
+
+from .core.model import Model
+
+
+def main() -> None:
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Benchmark chat templating.")
+    parser.add_argument("--model", "-m", dest="model", type=str, default=os.getenv("MODEL_PATH"), help="Path to the model to use the tokenizer and chat template of. Defaults to MODEL_PATH.")
+    parser.add_argument("--turns", "-t", dest="turns", type=int, default=20, help="Number of turns of the conversation. Default is 20.")
+    parser.add_argument("--tests", "-T", dest="tests", type=int, default=200, help="Number of tests in the first prompt. Default is 200.")
+    parser.add_argument("--number", "-n", dest="number", type=int, default=3, help="Number of times to encode the conversation. Default is 3.")
+
+    args = parser.parse_args()
+
+    # A model without weights is enough to template
+    with init_empty_weights():
+        weightless: PreTrainedModel = AutoModelForCausalLM.from_config(AutoConfig.from_pretrained(args.model))
+    model: Model = Model(Model.get_tokenizer(args.model), weightless, 1)
+
+    # A conversation opening with a large block of tests, followed by short questions and answers
+    tests: str = "\n".join(
+        f"ID: T-{i}, Purpose: \"Verify feature {i}\", Test steps: \"Open view {i}, enter value {i * 7}, submit.\""
+        for i in range(args.tests)
+    )
+    messages: list[dict[str, str]] = [{"role": "system", "content": "You are a helpful assistant."}]
+    conversation: list[list[dict[str, str]]] = []
+    for turn in range(args.turns):
+        question: str = f"Which tests verify REQ-{turn}?"
+        messages.append({"role": "user", "content": f"{tests}\n\n{question}" if turn == 0 else question})
+        conversation.append(copy.deepcopy(messages))
+        messages.append({"role": "assistant", "content": f"[\"T-{turn}\", \"T-{turn + 1}\"]"})
+
+    def string_path(history: list[dict[str, str]]) -> list[int]:
+        return model.tokenizer(model._render_chat_template(history))["input_ids"]
+
+    def token_path(history: list[dict[str, str]]) -> list[int]:
+        return model._apply_chat_template(history)["input_ids"][0].tolist()
+
+    # Start every run of the token path without memoized messages
+    def reset() -> None:
+        model._chat_encoder = None
+
+    paths: dict[str, tuple[Callable[[list[dict[str, str]]], list[int]], Callable[[], None]]] = {
+        "string": (string_path, lambda: None),
+        "token": (token_path, reset)
+    }
+
+    reset()
+    exact: bool = model._get_chat_encoder().exact
+    matches: bool = all(string_path(copy.deepcopy(h)) == token_path(copy.deepcopy(h)) for h in conversation)
+    print(f"Info - Token path {'enabled' if exact else 'disabled, falling back to the string path'}. Same token IDs: {matches}")
+
+    print(f"{'Path':<10}{'Total ms':>12}{'Last turn ms':>14}")
+    for name, (encode, before) in paths.items():
+        total: float = 0.0
+        last: float = 0.0
+        for _ in range(args.number):
+            before()
+            histories: list[list[dict[str, str]]] = copy.deepcopy(conversation)
+
+            for history in histories:
+                start: float = time.perf_counter()
+                encode(history)
+                last = time.perf_counter() - start
+                total += last
+
+        print(f"{name:<10}{total / args.number * 1000:>12.2f}{last * 1000:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
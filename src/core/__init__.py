@@ -3,10 +3,20 @@ Core functionality module for REST-at.
 
 Includes:
 ---------
+A class for caching model responses on disk.\n
+Classes for restricting and ending the output of local models while generating.\n
+Classes for choosing where and in what precision local models run.\n
+A class for estimating the token usage of a run.\n
+Classes for describing the output expected from models as a grammar.\n
 Classes for abstracting pretrained models and conversation sessions.\n
+Functions for tolerant parsing of model output.\n
 A function for formatting prompt strings.\n
+A class for storing REST requirements and tests.\n
 A class for abstracting REST specifications.\n
-A class for calculating and formatting statistical data.
+Classes for streaming per-requirement results to a file.\n
+A class for retrieving candidate tests for requirements.\n
+A class for calculating and formatting statistical data.\n
+A class for caching parsed data files on disk.
 
 Copyright:
 ----------
@@ -16,15 +26,34 @@ License:
 --------
 MIT (see LICENSE for more information)
 """
+import importlib
+from types import ModuleType
+
 __all__ = [
+    "cache",
+    "decoding",
+    "device",
+    "estimate",
+    "grammar",
     "model",
+    "parse",
     "prompt",
+    "records",
     "rest",
-    "stats"
+    "results",
+    "retrieval",
+    "stats",
+    "tables"
 ]
 
 
-from . import model
-from . import prompt
-from . import rest
-from . import stats
+def __getattr__(name: str) -> ModuleType:
+    # Import modules on first access, so only the modules in use load their dependencies, such as torch
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
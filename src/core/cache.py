@@ -0,0 +1,193 @@
+"""
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+from os import PathLike
+import sqlite3
+import time
+from typing import Final
+
+
+class ResponseCache:
+    # Default location of the cache, relative to the project root
+    _DEFAULT_PATH: Final[str] = "./.cache/responses.sqlite"
+
+    # 512 MiB
+    _DEFAULT_MAX_SIZE: Final[int] = 512 * 1024 * 1024
+    # 30 days
+    _DEFAULT_MAX_AGE: Final[float] = 30 * 24 * 60 * 60
+
+    def __init__(
+            self,
+            path: str | PathLike = _DEFAULT_PATH,
+            max_size: int | None = _DEFAULT_MAX_SIZE,
+            max_age: float | None = _DEFAULT_MAX_AGE
+        ) -> None:
+        self._path: str | PathLike = path
+        self._max_size: int | None = max_size
+        self._max_age: float | None = max_age
+
+        self._hits: int = 0
+        self._misses: int = 0
+
+        # Total size of the cached values, kept up to date by the cache
+        self._size: int = 0
+
+        dir_: str = os.path.dirname(path)
+        if dir_:
+            os.makedirs(dir_, exist_ok=True)
+
+        self._conn: sqlite3.Connection = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, "
+            "value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "created REAL NOT NULL, "
+            "accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+        # Drop stale entries left by previous runs
+        self.evict()
+
+    @staticmethod
+    def key(
+            model: str | PathLike,
+            system_prompt: str,
+            prompt: str,
+            seed: int | None,
+            temperature: float,
+            max_new_tokens: int | None,
+            constraint: str | None = None
+        ) -> str:
+        # Serialize as a list to avoid ambiguous concatenations, keeping the keys of unconstrained prompts unchanged
+        params: list = [str(model), system_prompt, prompt, seed, temperature, max_new_tokens]
+        if constraint is not None:
+            params.append(constraint)
+
+        data: str = json.dumps(params)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        now: float = time.time()
+        row: tuple[str, float] | None = self._conn \
+            .execute("SELECT value, created FROM responses WHERE key = ?", (key,)) \
+            .fetchone()
+
+        # Treat expired entries as missing
+        if row is None or (self._max_age is not None and now - row[1] > self._max_age):
+            self._misses += 1
+            return None
+
+        self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+
+        self._hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: dict) -> None:
+        now: float = time.time()
+        data: str = json.dumps(value)
+
+        # A replaced entry no longer takes space
+        replaced: tuple[int] | None = self._conn \
+            .execute("SELECT size FROM responses WHERE key = ?", (key,)) \
+            .fetchone()
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, data, len(data), now, now)
+        )
+        self._size += len(data) - (replaced[0] if replaced else 0)
+
+        # Stay within the size budget during long runs, not only when opening and closing the cache
+        if self._max_size is not None and self._size > self._max_size:
+            self._evict_size()
+
+        self._conn.commit()
+
+    def evict(self) -> int:
+        evicted: int = 0
+
+        # Age-based eviction
+        if self._max_age is not None:
+            evicted += self._conn \
+                .execute("DELETE FROM responses WHERE created < ?", (time.time() - self._max_age,)) \
+                .rowcount
+
+        # Recount the size, other connections may have changed the cache
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        # Size-based eviction
+        if self._max_size is not None and self._size > self._max_size:
+            evicted += self._evict_size()
+
+        self._conn.commit()
+        return evicted
+
+    def _evict_size(self) -> int:
+        """
+        Evicts the least recently accessed entries until the cached values fit in the size budget, without committing.
+        Only the entries to evict are read, in the order of the index on the access time.
+
+        Returns:
+        --------
+        `int` - The number of evicted entries.
+        """
+        stale: list[tuple[str]] = []
+        rows: sqlite3.Cursor = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed, rowid")
+        for key, entry_size in rows:
+            if self._size <= self._max_size:
+                break
+            stale.append((key,))
+            self._size -= entry_size
+        rows.close()
+
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        self._conn.execute("DELETE FROM responses")
+        self._conn.commit()
+        self._size = 0
+
+    def close(self) -> None:
+        self.evict()
+        self._conn.close()
+
+    @property
+    def path(self) -> str | PathLike:
+        return self._path
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def as_dict(self) -> dict:
+        return {
+            "path": str(self._path),
+            "hits": self._hits,
+            "misses": self._misses
+        }
+
+    def __enter__(self) -> ResponseCache:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
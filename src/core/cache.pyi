@@ -0,0 +1,165 @@
+"""
+Core module for caching model responses on disk.
+
+Includes:
+---------
+`ResponseCache` - A content-addressed SQLite cache for raw model responses.
+
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from os import PathLike
+
+
+class ResponseCache:
+    """
+    A content-addressed SQLite cache for raw model responses.
+    Entries are keyed by everything that affects a response: the model, the prompts, and the generation parameters.
+
+    Entries older than `max_age` are treated as missing and evicted. If the total size of the cached
+    values exceeds `max_size`, the least recently accessed entries are evicted.
+    Eviction runs when the cache is opened and closed, and entries exceeding the size budget are also evicted as responses are cached.
+
+    Properties:
+    -----------
+    `readonly path: str | PathLike` - The path to the SQLite database.\n
+    `readonly hits: int` - The number of lookups that found a cached response.\n
+    `readonly misses: int` - The number of lookups that found no cached response.\n
+    `readonly as_dict: dict` - A dict representation of the cache usage.
+
+    Methods:
+    --------
+    `static key -> str` - Creates a cache key from the parameters of a prompt.\n
+    `get -> dict | None` - Retrieves a cached response.\n
+    `put -> None` - Caches a response.\n
+    `evict -> int` - Evicts expired entries and entries exceeding the size budget.\n
+    `clear -> None` - Removes all entries.\n
+    `close -> None` - Evicts stale entries and closes the database connection.
+    """
+
+    def __init__(
+            self,
+            path: str | PathLike = "./.cache/responses.sqlite",
+            max_size: int | None = 512 * 1024 * 1024,
+            max_age: float | None = 30 * 24 * 60 * 60
+        ) -> None:
+        """
+        Opens a response cache, creating the database if needed.
+
+        Parameters:
+        -----------
+        path: str | PathLike - (Optional) The path to the SQLite database. Defaults to `./.cache/responses.sqlite`.\n
+        max_size: int | None - (Optional) The maximum total size of the cached values in bytes. Defaults to 512 MiB. `None` disables size-based eviction.\n
+        max_age: float | None - (Optional) The maximum age of an entry in seconds. Defaults to 30 days. `None` disables age-based eviction.
+        """
+        ...
+
+    @staticmethod
+    def key(
+            model: str | PathLike,
+            system_prompt: str,
+            prompt: str,
+            seed: int | None,
+            temperature: float,
+            max_new_tokens: int | None,
+            constraint: str | None = None
+        ) -> str:
+        """
+        Creates a cache key from the parameters of a prompt.
+
+        Parameters:
+        -----------
+        model: str | PathLike - The model name or path.\n
+        system_prompt: str - The system prompt.\n
+        prompt: str - The rendered user prompt.\n
+        seed: int | None - The seed used when sampling, if any.\n
+        temperature: float - The sampling temperature.\n
+        max_new_tokens: int | None - The `max_new_tokens` parameter used when generating, if any.\n
+        constraint: str | None - (Optional) The constraint on the output used when generating, if any.
+
+        Returns:
+        --------
+        `str` - A SHA-256 hex digest identifying the prompt.
+        """
+        ...
+
+    def get(self, key: str) -> dict | None:
+        """
+        Retrieves a cached response and counts the lookup as a hit or a miss.
+
+        Parameters:
+        -----------
+        key: str - The key of the response.
+
+        Returns:
+        --------
+        `dict | None` - The cached response if present and not expired, else `None`.
+        """
+        ...
+
+    def put(self, key: str, value: dict) -> None:
+        """
+        Caches a response, replacing any existing entry with the same key.
+        If the cached values then exceed the size budget, the least recently accessed entries are evicted.
+
+        Parameters:
+        -----------
+        key: str - The key of the response.\n
+        value: dict - The JSON serializable response.
+        """
+        ...
+
+    def evict(self) -> int:
+        """
+        Evicts expired entries and, least recently accessed first, entries exceeding the size budget.
+
+        Returns:
+        --------
+        `int` - The number of evicted entries.
+        """
+        ...
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the cache.
+        """
+        ...
+
+    def close(self) -> None:
+        """
+        Evicts stale entries and closes the database connection.
+        """
+        ...
+
+    @property
+    def path(self) -> str | PathLike:
+        """
+        The path to the SQLite database.
+        """
+        ...
+
+    @property
+    def hits(self) -> int:
+        """
+        The number of lookups that found a cached response.
+        """
+        ...
+
+    @property
+    def misses(self) -> int:
+        """
+        The number of lookups that found no cached response.
+        """
+        ...
+
+    @property
+    def as_dict(self) -> dict:
+        """
+        A dict representation of the cache usage.
+        """
+        ...
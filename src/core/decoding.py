@@ -0,0 +1,239 @@
+"""
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from __future__ import annotations
+from typing import Final, Iterable
+import weakref
+
+from transformers import LogitsProcessor, PreTrainedTokenizer, PreTrainedTokenizerFast, StoppingCriteria
+import torch
+
+from .grammar import OutputGrammar
+from .parse import is_answer, iter_json
+
+
+# Marks the end of a token in a trie
+_END: Final[None] = None
+
+# Characters closing a JSON answer
+_CLOSERS: Final[str] = "]}"
+
+
+class _Vocabulary:
+    def __init__(self, tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast) -> None:
+        # Decode each token after an anchor to keep the leading spaces that decoding on its own strips
+        anchor: list[int] = tokenizer.encode("a", add_special_tokens=False)[-1:]
+        prefix: str = tokenizer.decode(anchor, clean_up_tokenization_spaces=False)
+        decoded: list[str] = tokenizer.batch_decode(
+            [anchor + [token_id] for token_id in range(len(tokenizer))],
+            clean_up_tokenization_spaces=False
+        )
+
+        special: set[int] = set(tokenizer.all_special_ids)
+
+        # The text of each token, None for special tokens and tokens without text of their own
+        self.strings: list[str | None] = [
+            text[len(prefix):] if token_id not in special and text.startswith(prefix) and len(text) > len(prefix) else None
+            for token_id, text in enumerate(decoded)
+        ]
+
+        # Tries of the tokens made of only the characters of an alphabet
+        self._tries: dict[frozenset[str], dict] = {}
+
+    def trie(self, alphabet: frozenset[str]) -> dict:
+        trie: dict | None = self._tries.get(alphabet)
+        if trie is None:
+            trie = {}
+            for token_id, text in enumerate(self.strings):
+                if text is None or not alphabet.issuperset(text):
+                    continue
+
+                node: dict = trie
+                for char in text:
+                    node = node.setdefault(char, {})
+                node.setdefault(_END, []).append(token_id)
+
+            self._tries[alphabet] = trie
+
+        return trie
+
+
+# Vocabularies mapped from their tokenizer, dropped along with the tokenizer once its model is unloaded
+_VOCABULARIES: Final[weakref.WeakKeyDictionary[PreTrainedTokenizer | PreTrainedTokenizerFast, _Vocabulary]] = weakref.WeakKeyDictionary()
+
+
+def _vocabulary(tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast) -> _Vocabulary:
+    """
+    Gets the decoded vocabulary of a tokenizer, decoding it on first use.
+
+    Parameters:
+    -----------
+    tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast - The tokenizer.
+
+    Returns:
+    --------
+    `_Vocabulary` - The decoded vocabulary.
+    """
+    vocabulary: _Vocabulary | None = _VOCABULARIES.get(tokenizer)
+    if vocabulary is None:
+        vocabulary = _Vocabulary(tokenizer)
+        _VOCABULARIES[tokenizer] = vocabulary
+
+    return vocabulary
+
+
+class GrammarLogitsProcessor(LogitsProcessor):
+    def __init__(
+            self,
+            tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast,
+            grammars: list[OutputGrammar | None],
+            eos_token_ids: Iterable[int],
+            max_new_tokens: list[int] | None = None
+        ) -> None:
+        self._vocabulary: _Vocabulary = _vocabulary(tokenizer)
+        self._grammars: list[OutputGrammar | None] = grammars
+        self._eos_token_ids: list[int] = list(eos_token_ids)
+        self._max_new_tokens: list[int] | None = max_new_tokens
+
+        # The state of each sequence, None once it leaves its grammar
+        self._states: list[tuple | None] = [None if grammar is None else grammar.start() for grammar in grammars]
+        self._tries: list[dict | None] = [
+            None if grammar is None else self._vocabulary.trie(grammar.alphabet) for grammar in grammars
+        ]
+
+        # Length of the sequences the first and the last time scores were processed
+        self._input_len: int | None = None
+        self._length: int | None = None
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        # Follow the tokens generated since the last call
+        if self._length is not None:
+            for row, token_ids in enumerate(input_ids[:, self._length:].tolist()):
+                for token_id in token_ids:
+                    self._states[row] = self._consume(row, token_id)
+        else:
+            self._input_len = input_ids.shape[-1]
+        self._length = input_ids.shape[-1]
+        generated: int = self._length - self._input_len
+
+        for row, (grammar, state) in enumerate(zip(self._grammars, self._states)):
+            if grammar is None or state is None:
+                continue
+
+            # Close the answer once the remaining tokens might not fit another ID
+            if self._max_new_tokens is not None and self._max_new_tokens[row] - generated < grammar.reserve:
+                state = grammar.close(state) or state
+
+            # End as soon as the answer is complete, or if nothing can continue it
+            allowed: list[int] = [] if grammar.accepts(state) else self._allowed(grammar, state, self._tries[row], [])
+            if not allowed:
+                allowed = self._eos_token_ids
+
+            mask: torch.Tensor = torch.full_like(scores[row], float("-inf"))
+            mask[allowed] = 0
+            scores[row] = scores[row] + mask
+
+        return scores
+
+    def _consume(self, row: int, token_id: int) -> tuple | None:
+        """
+        Advances the grammar of a sequence through a generated token.
+
+        Parameters:
+        -----------
+        row: int - The position of the sequence in the batch.\n
+        token_id: int - The generated token.
+
+        Returns:
+        --------
+        `tuple | None` - The state after the token, or `None` if the token left the grammar, such as an end of sequence token.
+        """
+        state: tuple | None = self._states[row]
+        if state is None:
+            return None
+
+        text: str | None = self._vocabulary.strings[token_id] if token_id < len(self._vocabulary.strings) else None
+        if text is None:
+            return None
+
+        for char in text:
+            state = self._grammars[row].advance(state, char)
+            if state is None:
+                return None
+
+        return state
+
+    def _allowed(self, grammar: OutputGrammar, state: tuple, node: dict, allowed: list[int]) -> list[int]:
+        """
+        Collects the tokens that keep an answer within its grammar, walking the trie of tokens along the grammar.
+
+        Parameters:
+        -----------
+        grammar: OutputGrammar - The grammar of the answer.\n
+        state: tuple - The state of the answer.\n
+        node: dict - The node of the trie of tokens reached from the state.\n
+        allowed: list[int] - The list to add the allowed token IDs to.
+
+        Returns:
+        --------
+        `list[int]` - The allowed token IDs.
+        """
+        for char, child in node.items():
+            if char is _END:
+                continue
+
+            next_state: tuple | None = grammar.advance(state, char)
+            if next_state is None:
+                continue
+
+            allowed += child.get(_END, ())
+            self._allowed(grammar, next_state, child, allowed)
+
+        return allowed
+
+
+class AnswerStoppingCriteria(StoppingCriteria):
+    def __init__(
+            self,
+            tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast,
+            input_len: int,
+            max_new_tokens: list[int],
+            eos_token_ids: Iterable[int]
+        ) -> None:
+        self._tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast = tokenizer
+        self._input_len: int = input_len
+        self._max_new_tokens: list[int] = max_new_tokens
+        self._eos_token_ids: set[int] = set(eos_token_ids)
+
+        # The number of tokens generated for each sequence when it ended, None while it is running
+        self.ends: list[int | None] = [None] * len(max_new_tokens)
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> bool:
+        generated: int = input_ids.shape[-1] - self._input_len
+
+        for row, end in enumerate(self.ends):
+            if end is not None:
+                continue
+
+            token_id: int = int(input_ids[row, -1])
+            if token_id in self._eos_token_ids or generated >= self._max_new_tokens[row]:
+                self.ends[row] = generated
+                continue
+
+            # Only a closing bracket can complete an answer
+            if not any(char in _CLOSERS for char in self._tokenizer.decode([token_id])):
+                continue
+
+            # Other JSON, such as an example in the chatter, doesn't end the answer
+            text: str = self._tokenizer.decode(input_ids[row, self._input_len:], skip_special_tokens=True)
+            if any(is_answer(value) for value in iter_json(text)):
+                self.ends[row] = generated
+
+        # Sequences of a batch can only end together
+        return all(end is not None for end in self.ends)
@@ -0,0 +1,115 @@
+"""
+Core module for restricting the output of local models to a grammar while generating, and for ending it once the answer is complete.
+
+Includes:
+---------
+`GrammarLogitsProcessor` - A logits processor restricting generation to a grammar.\n
+`AnswerStoppingCriteria` - Stopping criteria ending generation once the answer is complete.
+
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from typing import Iterable
+
+import torch
+from transformers import LogitsProcessor, PreTrainedTokenizer, PreTrainedTokenizerFast, StoppingCriteria
+
+from .grammar import OutputGrammar
+
+
+class GrammarLogitsProcessor(LogitsProcessor):
+    """
+    A logits processor restricting each sequence of a batch to its grammar.
+    Tokens that can't continue the answer are masked out, and once the answer is complete, only the end of sequence tokens are allowed.
+    If no token can continue the answer, the end of sequence tokens are allowed instead.
+    Once the tokens left for a sequence might not fit another ID, only the tokens ending the answer are allowed between IDs.
+
+    The vocabulary of each tokenizer is decoded once, and the allowed tokens are found by walking a trie of the tokens along the grammar.
+    A processor follows the tokens of a single call to `generate`, so a new processor is needed for every call.
+    """
+
+    def __init__(
+            self,
+            tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast,
+            grammars: list[OutputGrammar | None],
+            eos_token_ids: Iterable[int],
+            max_new_tokens: list[int] | None = None
+        ) -> None:
+        """
+        Parameters:
+        -----------
+        tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast - The tokenizer of the model.\n
+        grammars: list[OutputGrammar | None] - The grammar of each sequence of the batch, `None` for unconstrained sequences.\n
+        eos_token_ids: Iterable[int] - The token IDs that end generation.\n
+        max_new_tokens: list[int] | None - (Optional) The maximum number of tokens to generate for each sequence.
+        Answers are only closed early to fit their budget if set.
+        """
+        ...
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        """
+        Masks out the tokens that can't continue the answer of each sequence.
+
+        Parameters:
+        -----------
+        input_ids: torch.LongTensor - The token IDs of the sequences so far.\n
+        scores: torch.FloatTensor - The scores of the next token of each sequence.
+
+        Returns:
+        --------
+        `torch.FloatTensor` - The masked scores.
+        """
+        ...
+
+
+class AnswerStoppingCriteria(StoppingCriteria):
+    """
+    Stopping criteria ending each sequence of a batch once its answer is complete,
+    i.e. once the response contains a complete JSON object or list, the way `parse.iter_json` finds it, with the shape of an answer (`parse.is_answer`).
+    A sequence also ends on an end of sequence token, or once it reaches its own maximum number of tokens.
+    The batch ends once every sequence has ended.
+
+    A criteria follows the tokens of a single call to `generate`, so new criteria are needed for every call.
+
+    Attributes:
+    -----------
+    `ends: list[int | None]` - The number of tokens generated for each sequence when it ended, `None` while it is running.
+    Tokens generated after the end only fill the batch.
+    """
+
+    def __init__(
+            self,
+            tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast,
+            input_len: int,
+            max_new_tokens: list[int],
+            eos_token_ids: Iterable[int]
+        ) -> None:
+        """
+        Parameters:
+        -----------
+        tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast - The tokenizer of the model.\n
+        input_len: int - The length of the padded input.\n
+        max_new_tokens: list[int] - The maximum number of tokens to generate for each sequence.\n
+        eos_token_ids: Iterable[int] - The token IDs that end generation.
+        """
+        ...
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> bool:
+        """
+        Checks if every sequence has ended, recording the end of the sequences ending with the last token.
+
+        Parameters:
+        -----------
+        input_ids: torch.LongTensor - The token IDs of the sequences so far.\n
+        scores: torch.FloatTensor - The scores of the last token of each sequence.
+
+        Returns:
+        --------
+        `bool` - Whether every sequence has ended.
+        """
+        ...
@@ -0,0 +1,111 @@
+"""
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from __future__ import annotations
+from enum import Enum
+import os
+from typing import Any, Final
+
+import torch
+
+
+class Device(Enum):
+    AUTO = "auto"
+    CUDA = "cuda"
+    CPU = "cpu"
+
+
+class DevicePolicy:
+    # Environment variables configuring the policy used by default
+    _DEVICE_VAR: Final[str] = "MODEL_DEVICE"
+    _DTYPE_VAR: Final[str] = "MODEL_DTYPE"
+    _THREADS_VAR: Final[str] = "MODEL_THREADS"
+
+    # Data types models can be loaded in, by name
+    _DTYPES: Final[dict[str, torch.dtype]] = {
+        "float16": torch.float16,
+        "bfloat16": torch.bfloat16,
+        "float32": torch.float32
+    }
+
+    # Data types used unless set, half precision is slow or unsupported by most CPUs
+    _DEFAULT_DTYPES: Final[dict[Device, torch.dtype]] = {
+        Device.CUDA: torch.float16,
+        Device.CPU: torch.float32
+    }
+
+    def __init__(
+            self,
+            device: Device = Device.AUTO,
+            dtype: torch.dtype | None = None,
+            num_threads: int | None = None
+        ) -> None:
+        if num_threads is not None and num_threads < 1:
+            raise ValueError(f"The number of threads must be at least 1, got {num_threads}.")
+
+        # Resolve the device once, so the policy stays the same for every model
+        if device is Device.AUTO:
+            device = Device.CUDA if torch.cuda.is_available() else Device.CPU
+        elif device is Device.CUDA and not torch.cuda.is_available():
+            raise ValueError("CUDA is not available.")
+
+        self._device: Device = device
+        self._dtype: torch.dtype = dtype or DevicePolicy._DEFAULT_DTYPES[device]
+        self._num_threads: int | None = num_threads
+
+    @property
+    def device(self) -> Device:
+        return self._device
+
+    @property
+    def dtype(self) -> torch.dtype:
+        return self._dtype
+
+    @property
+    def num_threads(self) -> int | None:
+        return self._num_threads
+
+    @property
+    def as_dict(self) -> dict:
+        return {
+            "device": self._device.value,
+            "dtype": str(self._dtype).removeprefix("torch."),
+            "num_threads": self._num_threads
+        }
+
+    @staticmethod
+    def from_env() -> DevicePolicy:
+        device: str = os.getenv(DevicePolicy._DEVICE_VAR) or Device.AUTO.value
+        dtype: str | None = os.getenv(DevicePolicy._DTYPE_VAR) or None
+        num_threads: str | None = os.getenv(DevicePolicy._THREADS_VAR) or None
+
+        return DevicePolicy(
+            Device(device.lower()),
+            DevicePolicy.parse_dtype(dtype) if dtype else None,
+            int(num_threads) if num_threads else None
+        )
+
+    @staticmethod
+    def parse_dtype(name: str) -> torch.dtype:
+        dtype: torch.dtype | None = DevicePolicy._DTYPES.get(name.lower().removeprefix("torch."))
+        if dtype is None:
+            raise ValueError(f"Unsupported data type {name}, expected one of {', '.join(DevicePolicy._DTYPES)}.")
+
+        return dtype
+
+    def apply(self) -> None:
+        if self._device is Device.CPU and self._num_threads is not None:
+            torch.set_num_threads(self._num_threads)
+
+    def load_kwargs(self) -> dict[str, Any]:
+        # Spread models over the GPUs, or keep them whole in memory on the CPU
+        if self._device is Device.CUDA:
+            return {"torch_dtype": self._dtype, "device_map": "auto"}
+
+        return {"torch_dtype": self._dtype, "low_cpu_mem_usage": True}
@@ -0,0 +1,147 @@
+"""
+Core module for choosing where and in what precision local models run.
+
+Includes:
+---------
+`Device` - The devices models can run on.\n
+`DevicePolicy` - A policy placing models on a device in a data type.
+
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from enum import Enum
+from typing import Any
+
+import torch
+
+
+class Device(Enum):
+    """
+    The devices models can run on.
+
+    Values:
+    -------
+    `AUTO` - CUDA if available, else the CPU.\n
+    `CUDA` - The GPUs, with models spread over every visible GPU.\n
+    `CPU` - The CPU.
+    """
+    AUTO = "auto"
+    CUDA = "cuda"
+    CPU = "cpu"
+
+
+class DevicePolicy:
+    """
+    A policy placing models on a device in a data type.
+    Models on CUDA default to `torch.float16`, and models on the CPU to `torch.float32`.
+    `torch.bfloat16` halves the memory of models on the CPU, but is only fast on CPUs supporting it.
+
+    The default policy is read from the environment variables `MODEL_DEVICE` (`auto`, `cuda`, or `cpu`),
+    `MODEL_DTYPE` (`float16`, `bfloat16`, or `float32`), and `MODEL_THREADS`.
+
+    Properties:
+    -----------
+    `readonly device: Device` - The device, never `Device.AUTO`.\n
+    `readonly dtype: torch.dtype` - The data type of the weights.\n
+    `readonly num_threads: int | None` - The number of threads used by operations on the CPU, `None` to leave it to torch.\n
+    `readonly as_dict: dict` - A dict representation of the policy.
+
+    Methods:
+    --------
+    `static from_env -> DevicePolicy` - Creates the policy set by the environment.\n
+    `static parse_dtype -> torch.dtype` - Gets a supported data type by name.\n
+    `apply -> None` - Applies the thread count of the policy to torch.\n
+    `load_kwargs -> dict[str, Any]` - Gets the arguments placing a model when loading it with `from_pretrained`.
+    """
+
+    def __init__(
+            self,
+            device: Device = Device.AUTO,
+            dtype: torch.dtype | None = None,
+            num_threads: int | None = None
+        ) -> None:
+        """
+        Parameters:
+        -----------
+        device: Device - (Optional) The device. `Device.AUTO` is resolved when creating the policy.\n
+        dtype: torch.dtype | None - (Optional) The data type of the weights. Defaults to the data type of the device.\n
+        num_threads: int | None - (Optional) The number of threads used by operations on the CPU. Only applied on the CPU.
+
+        Raises:
+        -------
+        `ValueError` if the device is `Device.CUDA` and CUDA isn't available, or if the number of threads is less than 1.
+        """
+        ...
+
+    @property
+    def device(self) -> Device:
+        ...
+
+    @property
+    def dtype(self) -> torch.dtype:
+        ...
+
+    @property
+    def num_threads(self) -> int | None:
+        ...
+
+    @property
+    def as_dict(self) -> dict:
+        ...
+
+    @staticmethod
+    def from_env() -> DevicePolicy:
+        """
+        Creates the policy set by the `MODEL_DEVICE`, `MODEL_DTYPE`, and `MODEL_THREADS` environment variables.
+        Unset variables fall back to the defaults.
+
+        Returns:
+        --------
+        `DevicePolicy` - The policy.
+
+        Raises:
+        -------
+        `ValueError` if a variable has an unsupported value.
+        """
+        ...
+
+    @staticmethod
+    def parse_dtype(name: str) -> torch.dtype:
+        """
+        Gets a supported data type by name, such as `bfloat16` or `torch.bfloat16`.
+
+        Parameters:
+        -----------
+        name: str - The name of the data type.
+
+        Returns:
+        --------
+        `torch.dtype` - The data type.
+
+        Raises:
+        -------
+        `ValueError` if the data type isn't supported.
+        """
+        ...
+
+    def apply(self) -> None:
+        """
+        Sets the number of threads used by torch on the CPU, if the policy runs models on the CPU and sets a number.
+        The setting is global to the process.
+        """
+        ...
+
+    def load_kwargs(self) -> dict[str, Any]:
+        """
+        Gets the arguments placing a model on the device of the policy when loading it with `from_pretrained`.
+
+        Returns:
+        --------
+        `dict[str, Any]` - The keyword arguments.
+        """
+        ...
@@ -0,0 +1,109 @@
+"""
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from __future__ import annotations
+from functools import lru_cache
+import math
+from os import PathLike
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from transformers import PreTrainedTokenizer, PreTrainedTokenizerFast
+
+
+def approximate_counter(chars_per_token: float) -> Callable[[str], int]:
+    if chars_per_token <= 0:
+        raise ValueError(f"Characters per token must be positive, got {chars_per_token}.")
+
+    def count_tokens(text: str) -> int:
+        return math.ceil(len(text) / chars_per_token)
+
+    return count_tokens
+
+
+def tokenizer_counter(model_name_or_path: str | PathLike) -> Callable[[str], int]:
+    # Imported here to only load torch and transformers when counting with a tokenizer
+    from .model import Model
+
+    tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast = Model.get_tokenizer(model_name_or_path)
+
+    # Memoized since the same tests are counted for every requirement
+    @lru_cache(maxsize=None)
+    def count_tokens(text: str) -> int:
+        return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    return count_tokens
+
+
+class TokenEstimate:
+    def __init__(
+            self,
+            input_tokens: dict[str, list[int]],
+            max_context: int | None,
+            max_new_tokens: int
+        ) -> None:
+        self._input_tokens: dict[str, list[int]] = input_tokens
+        self._max_context: int | None = max_context
+        self._max_new_tokens: int = max_new_tokens
+
+    @property
+    def input_tokens(self) -> dict[str, int]:
+        return {req_id: sum(tokens) for req_id, tokens in self._input_tokens.items()}
+
+    @property
+    def prompts(self) -> int:
+        return sum(len(tokens) for tokens in self._input_tokens.values())
+
+    @property
+    def total_input_tokens(self) -> int:
+        return sum(sum(tokens) for tokens in self._input_tokens.values())
+
+    @property
+    def worst_case(self) -> tuple[str, int] | None:
+        worst: tuple[str, int] | None = None
+
+        for req_id, tokens in self._input_tokens.items():
+            for curr in tokens:
+                if worst is None or curr > worst[1]:
+                    worst = (req_id, curr)
+
+        return worst
+
+    @property
+    def over_context(self) -> list[str]:
+        if self._max_context is None:
+            return []
+
+        # Prompts must leave room for the response
+        limit: int = self._max_context - self._max_new_tokens
+        return [req_id for req_id, tokens in self._input_tokens.items() if any(curr > limit for curr in tokens)]
+
+    def cost(self, input_price: float, output_price: float, output_tokens: int | None = None) -> float:
+        if output_tokens is None:
+            output_tokens = self._max_new_tokens
+
+        # Prices are given per million tokens
+        return (self.total_input_tokens * input_price + self.prompts * output_tokens * output_price) / 1_000_000
+
+    @property
+    def as_dict(self) -> dict:
+        worst_case: tuple[str, int] | None = self.worst_case
+
+        return {
+            "requirements": {
+                req_id: {"prompts": len(tokens), "input_tokens": sum(tokens), "largest_prompt": max(tokens, default=0)}
+                for req_id, tokens in self._input_tokens.items()
+            },
+            "prompts": self.prompts,
+            "total_input_tokens": self.total_input_tokens,
+            "max_context": self._max_context,
+            "max_new_tokens": self._max_new_tokens,
+            "worst_case": {"req_id": worst_case[0], "input_tokens": worst_case[1]} if worst_case else None,
+            "over_context": self.over_context
+        }
@@ -0,0 +1,150 @@
+"""
+Core module for estimating the token usage of a run before prompting a model.
+
+Includes:
+---------
+`approximate_counter -> Callable[[str], int]` - A function that creates a token counter approximating tokens from characters.\n
+`tokenizer_counter -> Callable[[str], int]` - A function that creates a token counter using the tokenizer of a local model.\n
+`TokenEstimate` - A class summarizing the input tokens of every prompt of a run.
+
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from os import PathLike
+from typing import Callable
+
+
+def approximate_counter(chars_per_token: float) -> Callable[[str], int]:
+    """
+    Creates a token counter approximating the number of tokens from the number of characters.
+    Used for models without a local tokenizer, such as GPT models.
+
+    Parameters:
+    -----------
+    chars_per_token: float - The average number of characters per token. Lower values give more conservative counts.
+
+    Returns:
+    --------
+    `Callable[[str], int]` - A function counting the approximate number of tokens of a text, rounded up.
+
+    Raises:
+    -------
+    `ValueError` if `chars_per_token` is not positive.
+    """
+    ...
+
+
+def tokenizer_counter(model_name_or_path: str | PathLike) -> Callable[[str], int]:
+    """
+    Creates a token counter using the tokenizer of a local model. Only the tokenizer is loaded.
+
+    Parameters:
+    -----------
+    model_name_or_path: str | PathLike - The model to count tokens for. Can be either a model name from Hugging Face Hub or a path to a local model.
+
+    Returns:
+    --------
+    `Callable[[str], int]` - A memoized function counting the tokens of a text, excluding special tokens.
+    """
+    ...
+
+
+class TokenEstimate:
+    """
+    The input tokens of every prompt of a run, counted without prompting a model.
+    Token counts include the system prompt and the user prompt, but not the chat template.
+
+    Properties:
+    -----------
+    `readonly input_tokens: dict[str, int]` - The total input tokens of each requirement.\n
+    `readonly prompts: int` - The number of prompts in the run.\n
+    `readonly total_input_tokens: int` - The total input tokens of the run.\n
+    `readonly worst_case: tuple[str, int] | None` - The requirement with the largest prompt and the size of the prompt, if any.\n
+    `readonly over_context: list[str]` - The requirements with a prompt that leaves no room for the response in the context.\n
+    `readonly as_dict: dict` - A dict representation of the estimate.
+
+    Methods:
+    --------
+    `cost -> float` - Estimates the cost of the run.
+    """
+
+    def __init__(
+            self,
+            input_tokens: dict[str, list[int]],
+            max_context: int | None,
+            max_new_tokens: int
+        ) -> None:
+        """
+        Creates a token estimate.
+
+        Parameters:
+        -----------
+        input_tokens: dict[str, list[int]] - The input tokens of each prompt, mapped from requirement ID.\n
+        max_context: int | None - The context length of the model, if known.\n
+        max_new_tokens: int - The number of tokens reserved for each response.
+        """
+        ...
+
+    @property
+    def input_tokens(self) -> dict[str, int]:
+        """
+        The total input tokens of each requirement.
+        """
+        ...
+
+    @property
+    def prompts(self) -> int:
+        """
+        The number of prompts in the run.
+        """
+        ...
+
+    @property
+    def total_input_tokens(self) -> int:
+        """
+        The total input tokens of the run.
+        """
+        ...
+
+    @property
+    def worst_case(self) -> tuple[str, int] | None:
+        """
+        The requirement with the largest prompt and the size of the prompt, or `None` if there are no prompts.
+        """
+        ...
+
+    @property
+    def over_context(self) -> list[str]:
+        """
+        The requirements with a prompt that leaves less than `max_new_tokens` of the context for the response.
+        Empty if the context length is unknown.
+        """
+        ...
+
+    def cost(self, input_price: float, output_price: float, output_tokens: int | None = None) -> float:
+        """
+        Estimates the cost of the run.
+
+        Parameters:
+        -----------
+        input_price: float - The price per million input tokens.\n
+        output_price: float - The price per million output tokens.\n
+        output_tokens: int | None - (Optional) The expected number of output tokens per prompt. Defaults to `max_new_tokens`.
+
+        Returns:
+        --------
+        `float` - The estimated cost, in the currency of the prices.
+        """
+        ...
+
+    @property
+    def as_dict(self) -> dict:
+        """
+        A dict representation of the estimate.
+        """
+        ...
@@ -0,0 +1,216 @@
+"""
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from __future__ import annotations
+from enum import Enum
+from typing import Final, Iterable
+
+
+# Marks the end of a string in a trie
+_END: Final[None] = None
+
+# Whitespace allowed before the answer, tokenizers often merge it with the first character
+_LEAD_WHITESPACE: Final[str] = " \n"
+_MAX_LEAD: Final[int] = 2
+
+
+class OutputShape(Enum):
+    LIST = "list"
+    JSON = "json"
+
+
+class OutputGrammar:
+    def __init__(self, shape: OutputShape, test_ids: Iterable[str], req_id: str | None = None) -> None:
+        self._shape: OutputShape = shape
+
+        # Literals around the list of IDs and around each ID
+        self._open: str
+        self._close: str
+        self._id_quote: str
+        match shape:
+            case OutputShape.LIST:
+                self._open, self._close, self._id_quote = "[", "]", "\""
+            case OutputShape.JSON:
+                if req_id is None:
+                    raise ValueError("The JSON shape requires a requirement ID.")
+
+                self._open, self._close, self._id_quote = f"{{\"requirementID\": \"{req_id}\", \"tests\": \"", "\"}", ""
+
+        self._sep: str = ","
+
+        # The allowed IDs as a trie of characters, ending in the ID
+        self._ids: dict = {}
+        alphabet: set[str] = set(_LEAD_WHITESPACE + self._open + self._close + self._id_quote + self._sep + " ")
+        for id_ in test_ids:
+            if not id_:
+                continue
+
+            node: dict = self._ids
+            for char in id_:
+                node = node.setdefault(char, {})
+            node[_END] = id_
+
+            alphabet.update(id_)
+
+        self._alphabet: frozenset[str] = frozenset(alphabet)
+
+        # The IDs reachable from each node of the trie, by the id of the node
+        self._below: dict[int, frozenset[str]] = {}
+        self._index_below(self._ids)
+
+        # Upper bound of the tokens taken by one more ID and the end of the answer, each token has at least one character
+        self._reserve: int = len(self._sep + " " + self._id_quote * 2 + self._close) \
+            + max((len(id_) for id_ in self._below[id(self._ids)]), default=0)
+
+    @property
+    def shape(self) -> OutputShape:
+        return self._shape
+
+    @property
+    def alphabet(self) -> frozenset[str]:
+        return self._alphabet
+
+    @property
+    def reserve(self) -> int:
+        return self._reserve
+
+    def start(self) -> tuple:
+        # The phase, the position within the phase, and the IDs already in the answer
+        return ("lead", 0, frozenset())
+
+    def accepts(self, state: tuple) -> bool:
+        return state[0] == "done"
+
+    def advance(self, state: tuple, char: str) -> tuple | None:
+        phase, position, used = state
+        match phase:
+            case "lead":
+                if char in _LEAD_WHITESPACE and position < _MAX_LEAD:
+                    return ("lead", position + 1, used)
+
+                return self.advance(("open", 0, used), char)
+            case "open":
+                return OutputGrammar._literal(state, self._open, char, ("first", None, used))
+            case "first":
+                # Either the first ID or an empty list
+                return self._start_id(used, char) or self.advance(("close", 0, used), char)
+            case "id_open":
+                return OutputGrammar._literal(state, self._id_quote, char, ("id", self._ids, used))
+            case "id":
+                # Only follow the IDs not in the answer yet
+                child: dict | None = position.get(char)
+                if child is not None and self._below[id(child)] - used:
+                    return ("id", child, used)
+
+                # Only a complete ID can be followed by anything else
+                id_: str | None = position.get(_END)
+                if id_ is None or id_ in used:
+                    return None
+
+                used = used | {id_}
+                return self.advance(("id_close", 0, used) if self._id_quote else ("next", None, used), char)
+            case "id_close":
+                return OutputGrammar._literal(state, self._id_quote, char, ("next", None, used))
+            case "next":
+                # Another ID can only follow while some are left
+                if char == self._sep and len(used) < len(self._below[id(self._ids)]):
+                    return ("sep", None, used)
+
+                return self.advance(("close", 0, used), char)
+            case "sep":
+                if char == " ":
+                    return ("space", None, used)
+
+                return self._start_id(used, char)
+            case "space":
+                return self._start_id(used, char)
+            case "close":
+                return OutputGrammar._literal(state, self._close, char, ("done", None, used))
+
+        # Nothing follows a complete answer
+        return None
+
+    def close(self, state: tuple) -> tuple | None:
+        # The answer can only end between IDs
+        if state[0] in ("first", "next"):
+            return ("close", 0, state[2])
+
+        return None
+
+    def matches(self, text: str) -> bool:
+        state: tuple | None = self.start()
+        for char in text:
+            state = self.advance(state, char)
+            if state is None:
+                return False
+
+        return self.accepts(state)
+
+    def _index_below(self, node: dict) -> frozenset[str]:
+        """
+        Indexes the IDs reachable from each node of a trie of IDs.
+
+        Parameters:
+        -----------
+        node: dict - The root of the trie.
+
+        Returns:
+        --------
+        `frozenset[str]` - The IDs reachable from the root.
+        """
+        below: set[str] = set()
+        for char, child in node.items():
+            if char is _END:
+                below.add(child)
+            else:
+                below |= self._index_below(child)
+
+        self._below[id(node)] = frozenset(below)
+
+        return self._below[id(node)]
+
+    def _start_id(self, used: frozenset[str], char: str) -> tuple | None:
+        """
+        Advances into a new ID.
+
+        Parameters:
+        -----------
+        used: frozenset[str] - The IDs already in the answer.\n
+        char: str - The next character.
+
+        Returns:
+        --------
+        `tuple | None` - The state after the character, or `None` if it can't start an ID.
+        """
+        if self._id_quote:
+            return self.advance(("id_open", 0, used), char)
+
+        return self.advance(("id", self._ids, used), char)
+
+    @staticmethod
+    def _literal(state: tuple, literal: str, char: str, then: tuple) -> tuple | None:
+        """
+        Advances through a literal.
+
+        Parameters:
+        -----------
+        state: tuple - The state matching the literal, at the number of characters of the literal already matched.\n
+        literal: str - The literal.\n
+        char: str - The next character.\n
+        then: tuple - The state following the literal.
+
+        Returns:
+        --------
+        `tuple | None` - The state after the character, or `None` if it doesn't match the literal.
+        """
+        phase, i, used = state
+        if char != literal[i]:
+            return None
+
+        return then if i + 1 == len(literal) else (phase, i + 1, used)
@@ -0,0 +1,149 @@
+"""
+Core module for describing the output expected from models as a grammar.
+
+Includes:
+---------
+`OutputShape` - The shapes of answers accepted by the parsers.\n
+`OutputGrammar` - A character-level grammar of an answer listing test IDs.
+
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from enum import Enum
+from typing import Iterable
+
+
+class OutputShape(Enum):
+    """
+    The shapes of answers accepted by the parsers.
+
+    Values:
+    -------
+    `LIST` - A list of test IDs, `["<test ID>", "<test ID>"]`.\n
+    `JSON` - A JSON object with the requirement ID and the test IDs, `{"requirementID": "<req ID>", "tests": "<test ID>, <test ID>"}`.
+    """
+    LIST = "list"
+    JSON = "json"
+
+
+class OutputGrammar:
+    """
+    A character-level grammar of an answer listing test IDs, in the canonical form of the prompts.
+    Up to two spaces or newlines may precede the answer, and a space may follow each separating comma.
+    The test IDs are restricted to a given set, each ID may appear at most once, and no separator follows once every ID is in the answer.
+
+    States are opaque immutable tuples, so any state can be advanced along several branches.
+
+    Properties:
+    -----------
+    `readonly shape: OutputShape` - The shape of the answer.\n
+    `readonly alphabet: frozenset[str]` - The characters that may appear in an answer.\n
+    `readonly reserve: int` - An upper bound of the number of tokens needed to add one more ID and end the answer from between two IDs.
+
+    Methods:
+    --------
+    `start -> tuple` - Gets the state before the answer.\n
+    `accepts -> bool` - Checks if a state completes the answer.\n
+    `advance -> tuple | None` - Advances a state by a character.\n
+    `close -> tuple | None` - Gets the state of an answer that may only end.\n
+    `matches -> bool` - Checks if a string is a complete answer.
+    """
+
+    def __init__(self, shape: OutputShape, test_ids: Iterable[str], req_id: str | None = None) -> None:
+        """
+        Parameters:
+        -----------
+        shape: OutputShape - The shape of the answer.\n
+        test_ids: Iterable[str] - The test IDs allowed in the answer.\n
+        req_id: str | None - The requirement ID of the answer. Required by `OutputShape.JSON`.
+
+        Raises:
+        -------
+        `ValueError` - If the shape requires a requirement ID and none is provided.
+        """
+        ...
+
+    @property
+    def shape(self) -> OutputShape:
+        ...
+
+    @property
+    def alphabet(self) -> frozenset[str]:
+        ...
+
+    @property
+    def reserve(self) -> int:
+        ...
+
+    def start(self) -> tuple:
+        """
+        Gets the state before the answer.
+
+        Returns:
+        --------
+        `tuple` - The initial state.
+        """
+        ...
+
+    def accepts(self, state: tuple) -> bool:
+        """
+        Checks if a state completes the answer. Nothing can follow a complete answer.
+
+        Parameters:
+        -----------
+        state: tuple - The state.
+
+        Returns:
+        --------
+        `bool` - Whether the answer is complete.
+        """
+        ...
+
+    def advance(self, state: tuple, char: str) -> tuple | None:
+        """
+        Advances a state by a character.
+
+        Parameters:
+        -----------
+        state: tuple - The state.\n
+        char: str - The next character.
+
+        Returns:
+        --------
+        `tuple | None` - The state after the character, or `None` if the character can't continue the answer.
+        """
+        ...
+
+    def close(self, state: tuple) -> tuple | None:
+        """
+        Gets the state of an answer that may only end, such as when it runs out of tokens.
+        Answers can only end before their first ID or right after an ID.
+
+        Parameters:
+        -----------
+        state: tuple - The state.
+
+        Returns:
+        --------
+        `tuple | None` - The state only allowing the end of the answer, or `None` if the answer can't end at the state.
+        """
+        ...
+
+    def matches(self, text: str) -> bool:
+        """
+        Checks if a string is a complete answer.
+
+        Parameters:
+        -----------
+        text: str - The string.
+
+        Returns:
+        --------
+        `bool` - Whether the string is a complete answer.
+        """
+        ...
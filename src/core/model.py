@@ -8,33 +8,46 @@ License:
 MIT (see LICENSE for more information)
 """
 from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import Future
 from enum import Enum
 from os import PathLike
 import copy
+import gc
+import hashlib
+import os
+import re
+import threading
+import weakref
 
 from transformers import (
+    AutoConfig,
     AutoTokenizer,
     AutoModelForCausalLM,
     BatchEncoding,
+    Cache,
     Conversation,
+    LogitsProcessorList,
     PreTrainedTokenizer,
     PreTrainedTokenizerFast,
     PreTrainedModel,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
     MistralForCausalLM,
     MixtralForCausalLM,
     LlamaForCausalLM
 )
+from accelerate import init_empty_weights
 import torch
-from typing import Final
+from typing import Any, Final, Iterator
 
+from .decoding import AnswerStoppingCriteria, GrammarLogitsProcessor
+from .device import DevicePolicy
+from .grammar import OutputGrammar
 from .model import *
 
 
-class ModelLoadingException(Exception):
-    def __init__(self, model_name_or_path: str | PathLike, *args):
-        super().__init__(f"{model_name_or_path} is being loaded.", *args)
-
-
 class UnsupportedModelException(Exception):
     def __init__(self, model_type: str, *args: object) -> None:
         super().__init__(f"{model_type} is not supported right now.", *args)
@@ -56,6 +69,154 @@ class _ModelType(Enum):
     }
 
 
+class KVCache:
+    def __init__(self, input_ids: torch.Tensor, past_key_values: tuple | Cache) -> None:
+        # Store the legacy format, which is never modified in place when generating
+        if isinstance(past_key_values, Cache):
+            past_key_values = past_key_values.to_legacy_cache()
+
+        self.past_key_values: tuple[tuple[torch.Tensor, torch.Tensor], ...] = past_key_values
+
+        # Only keep the tokens with cached keys and values
+        self.input_ids: torch.Tensor = input_ids[:past_key_values[0][0].shape[-2]]
+
+    def __len__(self) -> int:
+        return len(self.input_ids)
+
+    def match(self, input_ids: torch.Tensor) -> int:
+        # Leave at least one token of the input for the model to process
+        n: int = min(len(self.input_ids), len(input_ids) - 1)
+        if n <= 0:
+            return 0
+
+        mismatches: torch.Tensor = (self.input_ids[:n] != input_ids[:n].to(self.input_ids.device)).nonzero()
+        return int(mismatches[0][0]) if len(mismatches) else n
+
+    def past_key_values_for(self, input_ids: torch.Tensor) -> tuple[tuple[torch.Tensor, torch.Tensor], ...] | None:
+        n: int = self.match(input_ids)
+        if not n:
+            return None
+
+        if n == len(self.input_ids):
+            return self.past_key_values
+
+        # Slicing creates views, the cached tensors are left intact
+        return tuple((k[:, :, :n], v[:, :, :n]) for k, v in self.past_key_values)
+
+
+class _ChatEncoder:
+    # Maximum number of memoized pieces
+    _MAX_PIECES: Final[int] = 1024
+
+    def __init__(self, tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast) -> None:
+        self._tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast = tokenizer
+
+        # Tokenizers split the text on added tokens first and tokenize the text between them independently
+        self._added_ids: dict[str, int] = tokenizer.get_added_vocab()
+        self._split: re.Pattern | None = re.compile(
+            "(" + "|".join(re.escape(token) for token in sorted(self._added_ids, key=len, reverse=True)) + ")"
+        ) if self._added_ids else None
+
+        # Tokens the tokenizer adds around every input, such as the beginning of sequence token
+        with_special: list[int] = tokenizer("a")["input_ids"]
+        without_special: list[int] = tokenizer("a", add_special_tokens=False)["input_ids"]
+        start: int = next(
+            (
+                i for i in range(len(with_special) - len(without_special) + 1)
+                if with_special[i:i + len(without_special)] == without_special
+            ),
+            -1
+        )
+        self._prefix: list[int] = with_special[:start] if start >= 0 else []
+        self._suffix: list[int] = with_special[start + len(without_special):] if start >= 0 else []
+
+        # Only fast tokenizers with plain added tokens split exactly like this, see `verify`
+        self.exact: bool = start >= 0 and tokenizer.is_fast and not any(
+            token.lstrip or token.rstrip or token.single_word or token.normalized
+            for token in tokenizer.added_tokens_decoder.values()
+        )
+
+        # Token IDs of the pieces between added tokens, mapped from the hash of their text, least recently used first
+        self._pieces: OrderedDict[bytes, list[int]] = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def verify(self, chat: str) -> bool:
+        """
+        Checks that a chat is encoded exactly like the tokenizer encodes it, disabling the encoder if not.
+
+        Parameters:
+        -----------
+        chat: str - A rendered chat.
+
+        Returns:
+        --------
+        `bool` - Whether the encoder is exact.
+        """
+        self.exact = self.exact and self.encode(chat) == self._tokenizer(chat)["input_ids"]
+        return self.exact
+
+    def encode(self, chat: str) -> list[int]:
+        """
+        Encodes a rendered chat, only tokenizing the pieces between added tokens that aren't memoized.
+
+        Parameters:
+        -----------
+        chat: str - The rendered chat.
+
+        Returns:
+        --------
+        `list[int]` - The token IDs, including the special tokens added by the tokenizer.
+        """
+        input_ids: list[int] = list(self._prefix)
+        for piece in (self._split.split(chat) if self._split else [chat]):
+            if not piece:
+                continue
+
+            added_id: int | None = self._added_ids.get(piece)
+            if added_id is not None:
+                input_ids.append(added_id)
+            else:
+                input_ids += self._encode_piece(piece)
+
+        return input_ids + self._suffix
+
+    def _encode_piece(self, piece: str) -> list[int]:
+        """
+        Tokenizes the text between added tokens, memoized by the hash of the text.
+
+        Parameters:
+        -----------
+        piece: str - The text.
+
+        Returns:
+        --------
+        `list[int]` - The token IDs of the text.
+        """
+        key: bytes = hashlib.blake2b(piece.encode(), digest_size=16).digest()
+        with self._lock:
+            input_ids: list[int] | None = self._pieces.get(key)
+            if input_ids is not None:
+                self._pieces.move_to_end(key)
+                return input_ids
+
+        input_ids = self._tokenizer(piece, add_special_tokens=False)["input_ids"]
+
+        with self._lock:
+            self._pieces[key] = input_ids
+            if len(self._pieces) > _ChatEncoder._MAX_PIECES:
+                self._pieces.popitem(last=False)
+
+        return input_ids
+
+
+class _CancelledCriteria(StoppingCriteria):
+    def __init__(self, cancelled: threading.Event) -> None:
+        self._cancelled: threading.Event = cancelled
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> bool:
+        return self._cancelled.is_set()
+
+
 class Model:
     def __init__(
             self,
@@ -66,6 +227,12 @@ class Model:
         self.tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast = tokenizer
         self.model: PreTrainedModel = model
         self.max_new_tokens: int = max_new_tokens
+
+        # Bytes taken by the parameters and buffers of the model
+        self.memory_footprint: int = model.get_memory_footprint()
+
+        # Encodes chats without re-tokenizing repeated messages, created on first use
+        self._chat_encoder: _ChatEncoder | None = None
         
         # Set the type of the model
         self.type: _ModelType
@@ -73,82 +240,257 @@ class Model:
             self.type = _ModelType.MISTRAL
         elif isinstance(model, LlamaForCausalLM):
             self.type = _ModelType.LLAMA
-        # Pass the placeholder
-        elif tokenizer is None and model is None and max_new_tokens is None:
-            pass
         else:
             raise UnsupportedModelException(type(model).__name__)
 
-    _MODELS: Final[dict[str | PathLike, Model]] = {}
+    # Loaded models, least recently used first
+    _MODELS: Final[OrderedDict[str | PathLike, Model]] = OrderedDict()
 
-    _PLACEHOLDER: Model = None
+    # Unloaded models still referenced elsewhere, such as by a session, until they are freed
+    _UNLOADED: Final[weakref.WeakValueDictionary[str | PathLike, Model]] = weakref.WeakValueDictionary()
+
+    # Models being loaded, resolved once loaded
+    _LOADS: Final[dict[str | PathLike, Future[Model]]] = {}
+
+    # Guards the loaded models, the models being loaded, and the cached tokenizers
+    _LOCK: Final[threading.RLock] = threading.RLock()
+
+    # Environment variable setting the memory budget in bytes
+    _MEMORY_BUDGET_VAR: Final[str] = "MODEL_MEMORY_BUDGET"
+
+    # Maximum number of bytes taken by the loaded models, None to read the environment variable
+    _memory_budget: int | None = None
+
+    # Device and data type models are loaded in, None to read the environment variables
+    _device_policy: DevicePolicy | None = None
+
+    # Tokenizers loaded without their models
+    _TOKENIZERS: Final[dict[str | PathLike, PreTrainedTokenizer | PreTrainedTokenizerFast]] = {}
 
     # System prompt used for REST-at
     _SYSTEM_PROMPT: Final[str] = "You are a helpful AI called Kalle."
 
+    # Sampling temperature used when generating
+    _TEMPERATURE: Final[float] = 0.1
+
     @staticmethod
-    def _get_placeholder() -> Model:
+    def _get(model_name_or_path: str | PathLike) -> Model | None:
         """
-        Retrieves the placeholder for loading models.
+        Gets a model if loaded or still in memory after being unloaded, else `None`
+
+        Parameters:
+        -----------
+        model_name_or_path: str | PathLike - The model to get. Can be either a model name from Hugging Face Hub or a path to a local model.
 
         Returns:
         --------
-        `Model` - An empty placeholder model.
+        `Model | None` The tokenizer and the model itself if in memory, else None.
         """
-        if not Model._PLACEHOLDER:
-            Model._PLACEHOLDER = Model(None, None, None)
-        return Model._PLACEHOLDER
+        return Model._MODELS.get(model_name_or_path, None) or Model._UNLOADED.get(model_name_or_path, None)
 
     @staticmethod
-    def _get(model_name_or_path: str | PathLike) -> Model | None:
+    def get(model_name_or_path: str | PathLike, max_new_tokens: int = None, timeout: float | None = None) -> Model:
+        future: Future[Model] | None
+        with Model._LOCK:
+            m: Model | None = Model._get(model_name_or_path)
+
+            # Return model if already loaded, taking back an unloaded model still in memory rather than loading it twice
+            if m:
+                Model._UNLOADED.pop(model_name_or_path, None)
+                Model._MODELS[model_name_or_path] = m
+                Model._MODELS.move_to_end(model_name_or_path)
+                return m
+
+            # Share the load if another caller is already loading the model
+            future = Model._LOADS.get(model_name_or_path)
+            if future is None:
+                if max_new_tokens is None:
+                    raise ValueError("Cannot load model without max_new_tokens.")
+
+                loading: Future[Model] = Future()
+                Model._LOADS[model_name_or_path] = loading
+
+        if future is not None:
+            return future.result(timeout)
+
+        try:
+            m = Model._load(model_name_or_path, max_new_tokens)
+        except BaseException as e:
+            # Let later calls retry the load, and free whatever was loaded
+            with Model._LOCK:
+                del Model._LOADS[model_name_or_path]
+            Model._release()
+
+            loading.set_exception(e)
+            raise
+
+        with Model._LOCK:
+            del Model._LOADS[model_name_or_path]
+            Model._TOKENIZERS.pop(model_name_or_path, None)
+            Model._MODELS[model_name_or_path] = m
+
+            # The estimate may be off, make room for the actual footprint
+            Model._evict(0)
+
+        loading.set_result(m)
+
+        return m
+
+    @staticmethod
+    def _load(model_name_or_path: str | PathLike, max_new_tokens: int) -> Model:
         """
-        Gets a model if loaded, else `None`
+        Loads a model and its tokenizer, unloading the least recently used models to make room for it first.
+        The model is not added to the loaded models.
 
         Parameters:
         -----------
-        model_name_or_path: str | PathLike - The model to get. Can be either a model name from Hugging Face Hub or a path to a local model.
+        model_name_or_path: str | PathLike - The model to load. Can be either a model name from Hugging Face Hub or a path to a local model.\n
+        max_new_tokens: int - The `max_new_tokens` parameter used when generating.
 
         Returns:
         --------
-        `Model | None` The tokenizer and the model itself if loaded, else None.
+        `Model` - The loaded model.
         """
-        return Model._MODELS.get(model_name_or_path, None)
+        # Make room for the model before loading it
+        needed: int = Model.estimate_memory_footprint(model_name_or_path)
+        with Model._LOCK:
+            Model._evict(needed)
+
+        # Reuse the tokenizer if already loaded
+        tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast = Model._TOKENIZERS.get(model_name_or_path) \
+            or AutoTokenizer.from_pretrained(model_name_or_path)
+
+        policy: DevicePolicy = Model.get_device_policy()
+        policy.apply()
+
+        model: PreTrainedModel = AutoModelForCausalLM.from_pretrained(model_name_or_path, **policy.load_kwargs())
+        model.eval()
+
+        return Model(tokenizer, model, max_new_tokens)
 
     @staticmethod
-    def get(model_name_or_path: str | PathLike, max_new_tokens: int = None) -> Model | None:
-        m: Model = Model._get(model_name_or_path)
+    def unload(model_name_or_path: str | PathLike) -> bool:
+        with Model._LOCK:
+            if model_name_or_path not in Model._MODELS:
+                return False
 
-        # Return None if the loading placeholder is present
-        if m is Model._get_placeholder():
-            return None
+            # Keep counting the model while it is still referenced
+            Model._UNLOADED[model_name_or_path] = Model._MODELS.pop(model_name_or_path)
 
-        # Return model if already loaded
-        if m:
-            return m
-        
-        if max_new_tokens is None:
-            raise ValueError("Cannot load model without max_new_tokens.")
-        
-        # Add a placeholder in the dict to prevent additional loads
-        Model._MODELS[model_name_or_path] = Model._get_placeholder()
+        Model._release()
 
-        # Load the model and its tokenizer
-        tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast = AutoTokenizer.from_pretrained(model_name_or_path)
+        return True
 
-        model: PreTrainedModel = AutoModelForCausalLM.from_pretrained(
-            model_name_or_path,
-            torch_dtype=torch.float16,
-            device_map="auto"
-        )
-        model.eval()
+    @staticmethod
+    def get_memory_budget() -> int | None:
+        if Model._memory_budget is not None:
+            return Model._memory_budget
 
-        Model._MODELS[model_name_or_path] = m = Model(tokenizer, model, max_new_tokens)
+        budget: str | None = os.getenv(Model._MEMORY_BUDGET_VAR)
+        return int(budget) if budget else None
 
-        return m
+    @staticmethod
+    def set_memory_budget(budget: int | None) -> None:
+        if budget is not None and budget < 0:
+            raise ValueError("The memory budget can't be negative.")
+
+        with Model._LOCK:
+            Model._memory_budget = budget
+            Model._evict(0)
+
+    @staticmethod
+    def get_device_policy() -> DevicePolicy:
+        if Model._device_policy is None:
+            Model._device_policy = DevicePolicy.from_env()
+
+        return Model._device_policy
+
+    @staticmethod
+    def set_device_policy(policy: DevicePolicy | None) -> None:
+        Model._device_policy = policy
+
+    @staticmethod
+    def memory_in_use() -> int:
+        # Unloaded models take memory until they are freed
+        with Model._LOCK:
+            return sum(m.memory_footprint for m in Model._MODELS.values()) \
+                + sum(m.memory_footprint for m in Model._UNLOADED.values())
+
+    @staticmethod
+    def estimate_memory_footprint(model_name_or_path: str | PathLike) -> int:
+        # Build the model without allocating its weights to count them
+        try:
+            with init_empty_weights(include_buffers=True):
+                model: PreTrainedModel = AutoModelForCausalLM.from_config(
+                    AutoConfig.from_pretrained(model_name_or_path),
+                    torch_dtype=Model.get_device_policy().dtype
+                )
+        except (OSError, ValueError):
+            return 0
+
+        return model.get_memory_footprint()
+
+    @staticmethod
+    def _evict(needed: int) -> None:
+        """
+        Unloads the least recently used models until the models in memory and `needed` more bytes fit in the memory budget.
+        Unloaded models still referenced elsewhere keep counting, so unreferenced models are unloaded in their place.
+        The most recently used model is kept when making room for no more bytes. Must be called holding the lock.
+
+        Parameters:
+        -----------
+        needed: int - The number of bytes to make room for.
+        """
+        budget: int | None = Model.get_memory_budget()
+        if budget is None:
+            return
+
+        # Keep the most recently used model unless making room for a new one
+        candidates: list[str | PathLike] = list(Model._MODELS)
+        if not needed:
+            candidates = candidates[:-1]
+
+        for name in candidates:
+            if Model.memory_in_use() + needed <= budget:
+                break
+
+            # Free the model right away to know if it's still referenced
+            Model._UNLOADED[name] = Model._MODELS.pop(name)
+            Model._release()
+
+    @staticmethod
+    def _release() -> None:
+        """
+        Frees the memory of unreferenced models, returning cached GPU memory to the device.
+        """
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    @staticmethod
+    def get_tokenizer(model_name_or_path: str | PathLike) -> PreTrainedTokenizer | PreTrainedTokenizerFast:
+        tokenizer: PreTrainedTokenizer | PreTrainedTokenizerFast | None
+        with Model._LOCK:
+            # Use the tokenizer of the model if loaded
+            m: Model | None = Model._get(model_name_or_path)
+            tokenizer = m.tokenizer if m else Model._TOKENIZERS.get(model_name_or_path)
+
+        if tokenizer is None:
+            tokenizer = AutoTokenizer.from_pretrained(model_name_or_path)
+
+            # Keep the first tokenizer if loaded concurrently
+            with Model._LOCK:
+                tokenizer = Model._TOKENIZERS.setdefault(model_name_or_path, tokenizer)
+
+        return tokenizer
+
+    @staticmethod
+    def get_max_context(model_name_or_path: str | PathLike) -> int:
+        return AutoConfig.from_pretrained(model_name_or_path).max_position_embeddings
     
-    def _apply_chat_template_llama(self, messages: list[dict[str, str]]) -> BatchEncoding:
+    def _render_chat_template_llama(self, messages: list[dict[str, str]]) -> str:
         """
-        Applies a pre-defined Llama chat template to a message history and tokenizes it.
+        Applies a pre-defined Llama chat template to a message history.
 
         Parameters:
         -----------
@@ -156,7 +498,7 @@ class Model:
 
         Returns:
         --------
-        `BatchEncoding` - The encoded input.
+        `str` - The formatted conversation.
 
         Raises:
         -------
@@ -171,15 +513,11 @@ class Model:
                 raise ValueError("Messages can't be empty!")
 
         # The LLaMA tokeniser supports system prompts
-        return self.tokenizer(
-            self.tokenizer.apply_chat_template(messages, tokenize=False),
-            return_tensors="pt",
-            return_attention_mask=True
-        )
+        return self.tokenizer.apply_chat_template(messages, tokenize=False)
     
-    def _apply_chat_template_mistral(self, messages: list[dict[str, str]]) -> BatchEncoding:
+    def _render_chat_template_mistral(self, messages: list[dict[str, str]]) -> str:
         """
-        Applies a pre-defined Mistral/Mixtral chat template to a message history and tokenizes it.
+        Applies a pre-defined Mistral/Mixtral chat template to a message history.
 
         Parameters:
         -----------
@@ -187,7 +525,7 @@ class Model:
 
         Returns:
         --------
-        `BatchEncoding` - The encoded input.
+        `str` - The formatted conversation.
 
         Raises:
         -------
@@ -229,43 +567,445 @@ class Model:
             else:
                 raise Exception("Only system, user, and assistant roles are supported!")
 
-        return self.tokenizer(chat, return_tensors="pt", return_attention_mask=True)
+        return chat
 
-    def _apply_chat_template(self, messages: list[dict[str, str]]) -> BatchEncoding:
+    def _render_chat_template(self, messages: list[dict[str, str]]) -> str:
         match (self.type):
             case _ModelType.MISTRAL:
-                return self._apply_chat_template_mistral(messages)
+                return self._render_chat_template_mistral(messages)
             case _ModelType.LLAMA:
-                return self._apply_chat_template_llama(messages)
+                return self._render_chat_template_llama(messages)
+
+    def _apply_chat_template(self, messages: list[dict[str, str]]) -> BatchEncoding:
+        """
+        Applies the chat template of the model to a message history and tokenizes it.
+        The text between special tokens is tokenized once and memoized, so repeated messages aren't tokenized again.
+
+        Parameters:
+        -----------
+        messages: list[dict[str, str]] - The message history.
+
+        Returns:
+        --------
+        `BatchEncoding` - The encoded input.
+
+        Raises:
+        -------
+        `ValueError` if `message["content"]` is empty or consists of only whitespace characters for any message.
+        """
+        chat: str = self._render_chat_template(messages)
+
+        encoder: _ChatEncoder = self._get_chat_encoder()
+        if not encoder.exact:
+            return self.tokenizer(chat, return_tensors="pt", return_attention_mask=True)
+
+        input_ids: torch.Tensor = torch.tensor([encoder.encode(chat)], dtype=torch.long)
+        return BatchEncoding({"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)})
+
+    def _get_chat_encoder(self) -> _ChatEncoder:
+        """
+        Gets the chat encoder of the model, checking it against the tokenizer on a sample chat when first created.
+
+        Returns:
+        --------
+        `_ChatEncoder` - The chat encoder. Only used if exact.
+        """
+        if self._chat_encoder is None:
+            encoder: _ChatEncoder = _ChatEncoder(self.tokenizer)
+            if encoder.exact:
+                encoder.verify(self._render_chat_template([
+                    {"role": "system", "content": "You are a helpful assistant."},
+                    {"role": "user", "content": "Which tests cover REQ-1?\n\n  ID: T-1, Purpose: \"Log in\""},
+                    {"role": "assistant", "content": "[\"T-1\", \"T-2\"]"},
+                    {"role": "user", "content": "And REQ-2?"}
+                ]))
+
+            self._chat_encoder = encoder
+
+        return self._chat_encoder
+
+    def prefill(
+            self,
+            history: list[dict[str, str]] | Conversation,
+            prefix: str
+        ) -> KVCache:
+        # Render the history with the prefix as the next user message
+        # and cut the template off after the prefix
+        messages: list[dict[str, str]] = copy.deepcopy(list(history)) + [{"role": "user", "content": prefix}]
+        chat: str = self._render_chat_template(messages)
+        content: str = messages[-1]["content"]
+        chat = chat[:chat.rfind(content) + len(content)]
+
+        input_ids: BatchEncoding = self.tokenizer(
+            chat,
+            return_tensors="pt",
+            return_attention_mask=True
+        ).to(self.model.device)
+
+        with torch.no_grad():
+            outputs = self.model(
+                input_ids=input_ids["input_ids"],
+                attention_mask=input_ids["attention_mask"],
+                use_cache=True
+            )
+
+        return KVCache(input_ids["input_ids"][0], outputs.past_key_values)
     
     def prompt(
             self,
             history: list[dict[str, str]] | Conversation,
             prompt: str,
+            cache: KVCache | None = None,
+            grammar: OutputGrammar | None = None,
+            max_new_tokens: int | None = None,
+            stop_on_answer: bool = False,
+            usage: list[int] | None = None,
+            next_cache: list[KVCache] | None = None
         ) -> str:
         history.append({"role": "user", "content": prompt})
-        input_ids: BatchEncoding = self._apply_chat_template(history).to("cuda")
 
-        outputs = self.model.generate(
+        budget: int = max_new_tokens or self.max_new_tokens
+        kwargs: dict[str, Any] = self._generate_kwargs(history, cache, grammar, budget, stop_on_answer)
+
+        return self._finish_prompt(history, kwargs, self.model.generate(**kwargs), budget, usage, next_cache)
+
+    def prompt_stream(
+            self,
+            history: list[dict[str, str]] | Conversation,
+            prompt: str,
+            cache: KVCache | None = None,
+            grammar: OutputGrammar | None = None,
+            max_new_tokens: int | None = None,
+            stop_on_answer: bool = False,
+            usage: list[int] | None = None,
+            next_cache: list[KVCache] | None = None
+        ) -> Iterator[str]:
+        history.append({"role": "user", "content": prompt})
+
+        budget: int = max_new_tokens or self.max_new_tokens
+        kwargs: dict[str, Any] = self._generate_kwargs(history, cache, grammar, budget, stop_on_answer)
+
+        # Generate in the background, decoding the tokens as they are produced
+        streamer: TextIteratorStreamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        cancelled: threading.Event = threading.Event()
+        kwargs["stopping_criteria"].append(_CancelledCriteria(cancelled))
+
+        outputs: list = []
+        errors: list[BaseException] = []
+
+        def generate() -> None:
+            try:
+                outputs.append(self.model.generate(**kwargs, streamer=streamer))
+            except BaseException as e:
+                errors.append(e)
+                # Let the stream end instead of waiting for more tokens
+                streamer.end()
+
+        thread: threading.Thread = threading.Thread(target=generate, daemon=True)
+        thread.start()
+
+        finished: bool = False
+        try:
+            started: bool = False
+            for text in streamer:
+                # Responses are stripped, so leave out leading whitespace
+                if not started:
+                    text = text.lstrip()
+                    started = bool(text)
+
+                if text:
+                    yield text
+
+            finished = True
+        finally:
+            # Stop generating if the stream is abandoned
+            if not finished:
+                cancelled.set()
+            thread.join()
+
+            # A turn that didn't finish leaves the history as it was
+            if not finished or errors:
+                history.pop()
+
+        if errors:
+            raise errors[0]
+
+        self._finish_prompt(history, kwargs, outputs[0], budget, usage, next_cache)
+
+    def _generate_kwargs(
+            self,
+            history: list[dict[str, str]] | Conversation,
+            cache: KVCache | None,
+            grammar: OutputGrammar | None,
+            budget: int,
+            stop_on_answer: bool
+        ) -> dict[str, Any]:
+        """
+        Gets the arguments to `generate` a response to a conversation ending with a user prompt.
+
+        Parameters:
+        -----------
+        history: list[dict[str, str]] | Conversation - The conversation history, ending with the user prompt.\n
+        cache: KVCache | None - Cached keys and values to reuse for the matching start of the input.\n
+        grammar: OutputGrammar | None - The grammar to restrict the response to.\n
+        budget: int - The maximum number of tokens to generate.\n
+        stop_on_answer: bool - Whether to end generation once the response contains a complete JSON answer.
+
+        Returns:
+        --------
+        `dict[str, Any]` - The keyword arguments of `generate`.
+        """
+        input_ids: BatchEncoding = self._apply_chat_template(history).to(self.model.device)
+        input_len: int = input_ids["input_ids"].shape[-1]
+
+        # Only prefill the tokens following the cached prefix
+        past_key_values: tuple | None = None
+        if cache is not None:
+            past_key_values = cache.past_key_values_for(input_ids["input_ids"][0])
+
+        stopping: AnswerStoppingCriteria | None = self._stopping_criteria(input_len, [budget], stop_on_answer)
+
+        return {
             **input_ids,
-            max_new_tokens=self.max_new_tokens,
+            "past_key_values": past_key_values,
+            "max_new_tokens": budget,
+            "do_sample": True,
+            "temperature": Model._TEMPERATURE,
+            "logits_processor": self._logits_processors([grammar], [budget]),
+            "stopping_criteria": StoppingCriteriaList([stopping] if stopping else []),
+            "return_dict_in_generate": True
+        }
+
+    def _finish_prompt(
+            self,
+            history: list[dict[str, str]] | Conversation,
+            kwargs: dict[str, Any],
+            outputs: Any,
+            budget: int,
+            usage: list[int] | None,
+            next_cache: list[KVCache] | None
+        ) -> str:
+        """
+        Cuts the response out of the output of `generate` and appends it to the history.
+
+        Parameters:
+        -----------
+        history: list[dict[str, str]] | Conversation - The conversation history, ending with the user prompt.\n
+        kwargs: dict[str, Any] - The keyword arguments passed to `generate`.\n
+        outputs: Any - The output of `generate`.\n
+        budget: int - The maximum number of tokens to generate.\n
+        usage: list[int] | None - A list to add the number of generated tokens of the response to.\n
+        next_cache: list[KVCache] | None - A list to add the keys and values of the input and the response to.
+
+        Returns:
+        --------
+        `str` - The response.
+        """
+        input_len: int = kwargs["input_ids"].shape[-1]
+        stopping: AnswerStoppingCriteria | None = next(
+            (criteria for criteria in kwargs["stopping_criteria"] if isinstance(criteria, AnswerStoppingCriteria)),
+            None
+        )
+        sequence: torch.Tensor = outputs.sequences[0]
+
+        generated: torch.Tensor = self._trim_generated(
+            sequence[input_len:],
+            budget if stopping is None or stopping.ends[0] is None else stopping.ends[0]
+        )
+        if usage is not None:
+            usage.append(len(generated))
+
+        # The last token is never fed back to the model, so its keys and values are missing
+        if next_cache is not None and outputs.past_key_values is not None:
+            next_cache.append(KVCache(sequence, outputs.past_key_values))
+
+        res: str = self._decode_response(torch.cat((sequence[:input_len], generated)))
+
+        # Append response to history
+        history.append({"role": "assistant", "content": res})
+        return res
+
+    def prompt_batch(
+            self,
+            history: list[dict[str, str]] | Conversation,
+            prompts: list[str],
+            grammars: list[OutputGrammar | None] | None = None,
+            max_new_tokens: list[int] | None = None,
+            stop_on_answer: bool = False,
+            usage: list[int] | None = None
+        ) -> list[str]:
+        # Render each prompt as the next user message of its own copy of the history
+        encodings: list[torch.Tensor] = [
+            self._apply_chat_template(
+                copy.deepcopy(list(history)) + [{"role": "user", "content": prompt}]
+            )["input_ids"][0]
+            for prompt in prompts
+        ]
+
+        pad_token_id: int = self._pad_token_id()
+        input_len: int = max(len(encoding) for encoding in encodings)
+
+        budgets: list[int] = max_new_tokens or [self.max_new_tokens] * len(prompts)
+        stopping: AnswerStoppingCriteria | None = self._stopping_criteria(input_len, budgets, stop_on_answer)
+
+        # Left-pad the prompts so that generation continues right after each of them
+        input_ids: torch.Tensor = torch.full((len(encodings), input_len), pad_token_id, dtype=torch.long)
+        attention_mask: torch.Tensor = torch.zeros((len(encodings), input_len), dtype=torch.long)
+        for i, encoding in enumerate(encodings):
+            input_ids[i, input_len - len(encoding):] = encoding
+            attention_mask[i, input_len - len(encoding):] = 1
+
+        outputs = self.model.generate(
+            input_ids=input_ids.to(self.model.device),
+            attention_mask=attention_mask.to(self.model.device),
+            pad_token_id=pad_token_id,
+            max_new_tokens=max(budgets),
             do_sample=True,
-            temperature=0.1
+            temperature=Model._TEMPERATURE,
+            logits_processor=self._logits_processors(grammars or [], budgets),
+            stopping_criteria=StoppingCriteriaList([stopping] if stopping else [])
         )
 
-        raw_res: str = self.tokenizer.decode(outputs[0])
+        res: list[str] = []
+        for row, (encoding, output) in enumerate(zip(encodings, outputs)):
+            # Sequences keep generating until the whole batch ends, so cut each of them at its own end
+            generated: torch.Tensor = self._trim_generated(
+                output[input_len:],
+                budgets[row] if stopping is None or stopping.ends[row] is None else stopping.ends[row]
+            )
+            if usage is not None:
+                usage.append(len(generated))
+
+            # Decode the unpadded prompt and its continuation
+            res.append(self._decode_response(torch.cat((encoding.to(generated.device), generated))))
+
+        return res
+
+    def _decode_response(self, output: torch.Tensor) -> str:
+        """
+        Decodes a generated sequence and cuts the response out of it.
+
+        Parameters:
+        -----------
+        output: torch.Tensor - The token IDs of the prompt followed by the generated tokens.
+
+        Returns:
+        --------
+        `str` - The response of the model.
+        """
+        raw_res: str = self.tokenizer.decode(output)
 
         # 1 at inst in the instruction suffix
         inst_suffix: str = self.type.value["inst"][1]
         inst_suffix_len: int = len(inst_suffix)
+
+        inst_suffix_pos: int = raw_res.rfind(inst_suffix)
+
+        # Keep the rest of the output if generation stopped before the end of sequence token
+        eos_pos: int = raw_res.rfind(self.tokenizer.eos_token)
+        if eos_pos <= inst_suffix_pos:
+            eos_pos = len(raw_res)
+
         # Cut out the instruction section of the output
-        res: str = raw_res[
-            (raw_res.rfind(inst_suffix) + inst_suffix_len):raw_res.rfind(self.tokenizer.eos_token)
-        ].strip()
+        return raw_res[(inst_suffix_pos + inst_suffix_len):eos_pos].strip()
 
-        # Append response to history
-        history.append({"role": "assistant", "content": res})
-        return res
+    def _stopping_criteria(
+            self,
+            input_len: int,
+            max_new_tokens: list[int],
+            stop_on_answer: bool
+        ) -> AnswerStoppingCriteria | None:
+        """
+        Creates the stopping criteria ending each sequence of a batch once its answer is complete.
+
+        Parameters:
+        -----------
+        input_len: int - The length of the padded input.\n
+        max_new_tokens: list[int] - The maximum number of tokens to generate for each sequence.\n
+        stop_on_answer: bool - Whether to end the sequences once their answer is complete.
+
+        Returns:
+        --------
+        `AnswerStoppingCriteria | None` - The stopping criteria, `None` if the sequences only end on their own.
+        """
+        if not stop_on_answer:
+            return None
+
+        return AnswerStoppingCriteria(self.tokenizer, input_len, max_new_tokens, self._eos_token_ids())
+
+    def _trim_generated(self, generated: torch.Tensor, limit: int) -> torch.Tensor:
+        """
+        Cuts the tokens generated for a sequence at its end.
+
+        Parameters:
+        -----------
+        generated: torch.Tensor - The tokens generated for the sequence, including any padding.\n
+        limit: int - The maximum number of tokens to keep.
+
+        Returns:
+        --------
+        `torch.Tensor` - The generated tokens up to and including the first end of sequence token, at most `limit` of them.
+        """
+        eos_token_ids: set[int] = self._eos_token_ids()
+
+        # Drop the padding after the first end of sequence token
+        for i, token_id in enumerate(generated.tolist()):
+            if token_id in eos_token_ids:
+                generated = generated[:i + 1]
+                break
+
+        return generated[:limit]
+
+    def _logits_processors(self, grammars: list[OutputGrammar | None], max_new_tokens: list[int]) -> LogitsProcessorList:
+        """
+        Creates the logits processors restricting each sequence of a batch to its grammar.
+
+        Parameters:
+        -----------
+        grammars: list[OutputGrammar | None] - The grammar of each sequence, `None` for unconstrained sequences.\n
+        max_new_tokens: list[int] - The maximum number of tokens to generate for each sequence.
+
+        Returns:
+        --------
+        `LogitsProcessorList` - The logits processors, empty if no sequence is constrained.
+        """
+        if all(grammar is None for grammar in grammars):
+            return LogitsProcessorList()
+
+        return LogitsProcessorList([GrammarLogitsProcessor(self.tokenizer, grammars, self._eos_token_ids(), max_new_tokens)])
+
+    def _pad_token_id(self) -> int:
+        """
+        Gets the token ID to pad batched inputs with.
+        Mistral and Llama tokenizers don't define a padding token, so fall back on
+        the unknown token, and lastly on the end of sequence token.
+        Padded positions are masked out, so the choice doesn't affect the output.
+
+        Returns:
+        --------
+        `int` - The padding token ID.
+        """
+        for token_id in (self.tokenizer.pad_token_id, self.tokenizer.unk_token_id, self.tokenizer.eos_token_id):
+            if token_id is not None:
+                return token_id
+
+    def _eos_token_ids(self) -> set[int]:
+        """
+        Gets the token IDs that end generation.
+
+        Returns:
+        --------
+        `set[int]` - The end of sequence token IDs of the tokenizer and the generation config.
+        """
+        eos_token_ids: set[int] = {self.tokenizer.eos_token_id}
+
+        config_eos: int | list[int] | None = self.model.generation_config.eos_token_id
+        if isinstance(config_eos, int):
+            eos_token_ids.add(config_eos)
+        elif config_eos:
+            eos_token_ids.update(config_eos)
+
+        return eos_token_ids
 
 
 class Session:
@@ -274,18 +1014,18 @@ class Session:
             name: str,
             model_name_or_path: str | PathLike,
             max_new_tokens: int,
-            system_prompt: str
+            system_prompt: str,
+            timeout: float | None = None
         ):
         self.name: str = name
-        self.model: Model = Model.get(model_name_or_path, max_new_tokens)
-
-        # Don't instantiate if model is loading
-        if not self.model:
-            raise ModelLoadingException(model_name_or_path)
+        self.model: Model = Model.get(model_name_or_path, max_new_tokens, timeout)
 
         self._system_prompt: str = system_prompt
         self._history: list[dict[str, str]] = [{"role": "system", "content": system_prompt}]
 
+        # Keys and values of the conversation up to the last response, None if the history changed since
+        self._kv_cache: KVCache | None = None
+
     _SESSIONS: dict[str, Session] = {}
 
     @staticmethod
@@ -293,14 +1033,15 @@ class Session:
         name: str,
         model_name_or_path: str | PathLike,
         max_new_tokens: int,
-        system_prompt: str = Model._SYSTEM_PROMPT
+        system_prompt: str = Model._SYSTEM_PROMPT,
+        timeout: float | None = None
     ) -> Session:
         session: Session = Session.get(name)
 
         if session:
             return session
 
-        session = Session(name, model_name_or_path, max_new_tokens, system_prompt)
+        session = Session(name, model_name_or_path, max_new_tokens, system_prompt, timeout)
 
         Session._SESSIONS[name] = session
         return session
@@ -319,19 +1060,85 @@ class Session:
             system_prompt = Model._SYSTEM_PROMPT
         self._system_prompt = system_prompt
         self._history[0] = {"role": "system", "content": self._system_prompt}
+        self._kv_cache = None
     
-    def prompt(self, prompt: str, ephemeral: bool = False) -> str:
-        res: str = self.model.prompt(self._history, prompt)
+    def prefill(self, prefix: str) -> KVCache:
+        return self.model.prefill(self._history, prefix)
+
+    def prompt_batch(
+            self,
+            prompts: list[str],
+            grammars: list[OutputGrammar | None] | None = None,
+            max_new_tokens: list[int] | None = None,
+            stop_on_answer: bool = False,
+            usage: list[int] | None = None
+        ) -> list[str]:
+        return self.model.prompt_batch(self._history, prompts, grammars, max_new_tokens, stop_on_answer, usage)
+
+    def prompt(
+            self,
+            prompt: str,
+            ephemeral: bool = False,
+            cache: KVCache | None = None,
+            grammar: OutputGrammar | None = None,
+            max_new_tokens: int | None = None,
+            stop_on_answer: bool = False,
+            usage: list[int] | None = None
+        ) -> str:
+        # Continue from the previous turn unless given a cache, only keeping the new cache if the turn is kept
+        next_cache: list[KVCache] | None = None if ephemeral else []
+        res: str = self.model.prompt(
+            self._history,
+            prompt,
+            cache or self._kv_cache,
+            grammar,
+            max_new_tokens,
+            stop_on_answer,
+            usage,
+            next_cache
+        )
 
         # Pop twice to remove the newly added user and assistant messages if ephemeral
         if ephemeral:
             self._history.pop()
             self._history.pop()
+        else:
+            self._kv_cache = next_cache[0] if next_cache else None
         
         return res
 
+    def prompt_stream(
+            self,
+            prompt: str,
+            ephemeral: bool = False,
+            cache: KVCache | None = None,
+            grammar: OutputGrammar | None = None,
+            max_new_tokens: int | None = None,
+            stop_on_answer: bool = False,
+            usage: list[int] | None = None
+        ) -> Iterator[str]:
+        next_cache: list[KVCache] | None = None if ephemeral else []
+        yield from self.model.prompt_stream(
+            self._history,
+            prompt,
+            cache or self._kv_cache,
+            grammar,
+            max_new_tokens,
+            stop_on_answer,
+            usage,
+            next_cache
+        )
+
+        # Pop twice to remove the newly added user and assistant messages if ephemeral
+        if ephemeral:
+            self._history.pop()
+            self._history.pop()
+        else:
+            self._kv_cache = next_cache[0] if next_cache else None
+
     def clear(self) -> None:
         self._history = [{"role": "system", "content": self._system_prompt}]
+        self._kv_cache = None
 
     @property
     def history(self) -> list[dict[str, str]]:
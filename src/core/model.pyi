@@ -3,6 +3,7 @@ Core module for handling models.
 
 Includes:
 ---------
+`KVCache` - A class holding the keys and values computed for a prompt prefix.\n
 `Model` - A class abstracting pretrained models, providing methods to load, retrieve, and prompt a model.\n
 `Session` - A class for handling conversations with models.
 
@@ -15,62 +16,309 @@ License:
 MIT (see LICENSE for more information)
 """
 from os import PathLike
+from typing import Iterator
 
-from transformers import Conversation
+import torch
+from transformers import Cache, Conversation
 
+from .device import DevicePolicy
+from .grammar import OutputGrammar
 
-class ModelLoadingException(Exception):
+
+class UnsupportedModelException(Exception):
     """
-    An exception raised if trying to create a Session using a model that's being loaded.
+    An exception raised if trying to load a model that REST-at doesn't support.
     """
     ...
 
 
-class UnsupportedModelException(Exception):
+class KVCache:
     """
-    An exception raised if trying to load a model that REST-at doesn't support.
+    The keys and values computed for a prompt prefix, used to skip prefilling the prefix when prompting.
+    Any input starting with the same tokens can reuse the cache. The cache is never modified by prompting.
+
+    Attributes:
+    -----------
+    `input_ids: torch.Tensor` - The token IDs of the cached prefix.\n
+    `past_key_values: tuple[tuple[torch.Tensor, torch.Tensor], ...]` - The keys and values of the prefix in the legacy cache format.
+
+    Methods:
+    --------
+    `match -> int` - Gets the number of leading tokens of an input that can be reused from the cache.\n
+    `past_key_values_for -> tuple | None` - Gets the cached keys and values for the reusable prefix of an input.
     """
-    ...
+    def __init__(self, input_ids: torch.Tensor, past_key_values: tuple | Cache) -> None:
+        """
+        Parameters:
+        -----------
+        input_ids: torch.Tensor - The token IDs of the prefix, without a batch dimension. Tokens beyond the cached keys and values are dropped.\n
+        past_key_values: tuple | Cache - The keys and values computed for the prefix.
+        """
+        ...
+
+    def match(self, input_ids: torch.Tensor) -> int:
+        """
+        Gets the number of leading tokens of an input that can be reused from the cache.
+        At least one token of the input is always left for the model to process.
+
+        Parameters:
+        -----------
+        input_ids: torch.Tensor - The token IDs of the input, without a batch dimension.
+
+        Returns:
+        --------
+        `int` - The length of the reusable prefix.
+        """
+        ...
+
+    def past_key_values_for(self, input_ids: torch.Tensor) -> tuple[tuple[torch.Tensor, torch.Tensor], ...] | None:
+        """
+        Gets the cached keys and values for the reusable prefix of an input.
+
+        Parameters:
+        -----------
+        input_ids: torch.Tensor - The token IDs of the input, without a batch dimension.
+
+        Returns:
+        --------
+        `tuple[tuple[torch.Tensor, torch.Tensor], ...] | None` - The keys and values of the prefix if any are reusable, else `None`.
+        """
+        ...
 
 
 class Model:
     """
     A class abstracting pretrained models, providing functions to load, retrieve, and prompt a model.
 
+    Loaded models are kept within a memory budget, read from the `MODEL_MEMORY_BUDGET` environment variable in bytes unless set with `set_memory_budget`.
+    Without a budget, models are never unloaded. Otherwise, the least recently used models are unloaded to make room for a model before loading it.
+    An unloaded model is only freed once nothing else, such as a `Session`, references it. Until then, it counts towards the budget,
+    so unreferenced models are unloaded in its place, and getting it takes it back instead of loading it again.
+
+    Models are safe to get from several threads. Each model is loaded once, and concurrent callers wait for the load in progress.
+
+    Models are placed according to a device policy, read from the `MODEL_DEVICE`, `MODEL_DTYPE`, and `MODEL_THREADS` environment variables
+    unless set with `set_device_policy`. Inputs are moved to the device the model was loaded on.
+
+    Attributes:
+    -----------
+    `memory_footprint: int` - The number of bytes taken by the parameters and buffers of the model.
+
     Methods:
     --------
-    `static get -> Model | None` - Loads a given model if not already loaded and returns the model. Returns `None` if the model is being loaded.\n
-    `prompt -> str` - Prompts the model and returns the response.
+    `static get -> Model` - Loads a given model if not already loaded and returns the model, waiting for the model if it's being loaded.\n
+    `static unload -> bool` - Unloads a model and frees its memory.\n
+    `static get_memory_budget -> int | None` - Gets the maximum number of bytes taken by the loaded models.\n
+    `static set_memory_budget -> None` - Sets the maximum number of bytes taken by the loaded models.\n
+    `static get_device_policy -> DevicePolicy` - Gets the policy placing the models that are loaded.\n
+    `static set_device_policy -> None` - Sets the policy placing the models that are loaded.\n
+    `static memory_in_use -> int` - Gets the number of bytes taken by the loaded models.\n
+    `static estimate_memory_footprint -> int` - Estimates the number of bytes a model takes when loaded, without loading it.\n
+    `static get_tokenizer -> PreTrainedTokenizer | PreTrainedTokenizerFast` - Gets the tokenizer of a model without loading the model.\n
+    `static get_max_context -> int` - Gets the context length of a model without loading the model.\n
+    `prefill -> KVCache` - Computes the keys and values for a prompt prefix.\n
+    `prompt -> str` - Prompts the model and returns the response.\n
+    `prompt_stream -> Iterator[str]` - Prompts the model and yields the response as it is generated.\n
+    `prompt_batch -> list[str]` - Prompts the model with several prompts in a single call and returns the responses.
     """
 
     @staticmethod
-    def get(model_name_or_path: str | PathLike, max_new_tokens: int = None) -> Model | None:
+    def get(model_name_or_path: str | PathLike, max_new_tokens: int = None, timeout: float | None = None) -> Model:
         """
-        Loads a specified model if not already loaded.
+        Loads a specified model if not already loaded, unloading the least recently used models to fit the memory budget.
+        If another caller is loading the model, waits for that load instead and gets the same model.
+        If loading fails, every waiting caller gets the error, and the model can be loaded again by a later call.
 
         Parameters:
         -----------
         model_name_or_path: str | PathLike - The model to get. Can be either a model name from Hugging Face Hub or a path to a local model.\n
-        max_new_tokens: int - The `max_new_tokens` parameter used when generating. Required when loading.
+        max_new_tokens: int - The `max_new_tokens` parameter used when generating. Required when loading.\n
+        timeout: float | None - (Optional) The number of seconds to wait for a load by another caller. Waits indefinitely if `None`.
+        A caller loading the model itself always finishes the load.
+
+        Returns:
+        --------
+        `Model` The loaded model.
+
+        Raises:
+        -------
+        `ValueError` when trying to load without `max_new_tokens`.\n
+        `TimeoutError` if the load by another caller doesn't finish within `timeout`.\n
+        Any exception raised while loading the model.
+        """
+        ...
+
+    @staticmethod
+    def unload(model_name_or_path: str | PathLike) -> bool:
+        """
+        Unloads a model and frees its memory, unless it's still referenced elsewhere.
+        A model still referenced elsewhere keeps counting towards the memory budget until it is freed.
+
+        Parameters:
+        -----------
+        model_name_or_path: str | PathLike - The model to unload.
+
+        Returns:
+        --------
+        `bool` - Whether the model was loaded. Models being loaded are not unloaded.
+        """
+        ...
+
+    @staticmethod
+    def get_memory_budget() -> int | None:
+        """
+        Gets the maximum number of bytes taken by the loaded models.
+
+        Returns:
+        --------
+        `int | None` - The budget set with `set_memory_budget`, else the `MODEL_MEMORY_BUDGET` environment variable. `None` if unbounded.
+        """
+        ...
+
+    @staticmethod
+    def set_memory_budget(budget: int | None) -> None:
+        """
+        Sets the maximum number of bytes taken by the loaded models, unloading the least recently used models to fit it.
+        The most recently used model is kept even if it doesn't fit on its own.
+
+        Parameters:
+        -----------
+        budget: int | None - The budget in bytes. `None` to fall back to the `MODEL_MEMORY_BUDGET` environment variable.
+
+        Raises:
+        -------
+        `ValueError` if the budget is negative.
+        """
+        ...
+
+    @staticmethod
+    def get_device_policy() -> DevicePolicy:
+        """
+        Gets the policy placing the models that are loaded.
+
+        Returns:
+        --------
+        `DevicePolicy` - The policy set with `set_device_policy`, else the policy set by the environment variables.
+
+        Raises:
+        -------
+        `ValueError` if an environment variable has an unsupported value.
+        """
+        ...
+
+    @staticmethod
+    def set_device_policy(policy: DevicePolicy | None) -> None:
+        """
+        Sets the policy placing the models that are loaded. Models already loaded are left as is.
+
+        Parameters:
+        -----------
+        policy: DevicePolicy | None - The policy. `None` to fall back to the environment variables.
+        """
+        ...
+
+    @staticmethod
+    def memory_in_use() -> int:
+        """
+        Gets the number of bytes taken by the parameters and buffers of the loaded models,
+        and of the unloaded models that are still referenced elsewhere.
+
+        Returns:
+        --------
+        `int` - The number of bytes.
+        """
+        ...
+
+    @staticmethod
+    def estimate_memory_footprint(model_name_or_path: str | PathLike) -> int:
+        """
+        Estimates the number of bytes taken by the parameters and buffers of a model when loaded, from its configuration.
+        No weights are loaded.
+
+        Parameters:
+        -----------
+        model_name_or_path: str | PathLike - The model. Can be either a model name from Hugging Face Hub or a path to a local model.
+
+        Returns:
+        --------
+        `int` - The estimated number of bytes, 0 if the configuration can't be read.
+        """
+        ...
+
+    @staticmethod
+    def get_tokenizer(model_name_or_path: str | PathLike) -> PreTrainedTokenizer | PreTrainedTokenizerFast:
+        """
+        Gets the tokenizer of a model. Uses the tokenizer of the model if loaded, else loads and caches the tokenizer only.
+
+        Parameters:
+        -----------
+        model_name_or_path: str | PathLike - The model to get the tokenizer of. Can be either a model name from Hugging Face Hub or a path to a local model.
+
+        Returns:
+        --------
+        `PreTrainedTokenizer | PreTrainedTokenizerFast` - The tokenizer of the model.
+        """
+        ...
+
+    @staticmethod
+    def get_max_context(model_name_or_path: str | PathLike) -> int:
+        """
+        Gets the maximum number of tokens a model can attend to, read from its configuration.
+
+        Parameters:
+        -----------
+        model_name_or_path: str | PathLike - The model to get the context length of. Can be either a model name from Hugging Face Hub or a path to a local model.
+
+        Returns:
+        --------
+        `int` - The context length of the model.
+        """
+        ...
+
+    def prefill(self, history: list[dict[str, str]] | Conversation, prefix: str) -> KVCache:
+        """
+        Computes the keys and values for a conversation followed by a user prompt starting with `prefix`.
+        Pass the result to `prompt` to skip prefilling the prefix for every prompt that starts with it.
+
+        Parameters:
+        -----------
+        history: list[dict[str, str]] | Conversation - The conversation history. Must adhere to model constraints. Not modified.\n
+        prefix: str - The start of the user prompts. Must contain non-whitespace characters.
 
         Returns:
         --------
-        `Model | None` The model that was loaded. None if the specified model is being loaded.
+        `KVCache` - The cached keys and values of the conversation and the prefix.
 
         Raises:
         -------
-        `ValueError` when trying to load without `max_new_tokens`.
+        `ValueError` if `prefix` is empty or consists of only whitespace characters.
         """
         ...
 
-    def prompt(self, history: list[dict[str, str]] | Conversation, prompt: str) -> str:
+    def prompt(
+            self,
+            history: list[dict[str, str]] | Conversation,
+            prompt: str,
+            cache: KVCache | None = None,
+            grammar: OutputGrammar | None = None,
+            max_new_tokens: int | None = None,
+            stop_on_answer: bool = False,
+            usage: list[int] | None = None,
+            next_cache: list[KVCache] | None = None
+        ) -> str:
         """
         Prompts a the model and gets the response. Appends the messages to the history.
 
         Parameters:
         -----------
         history: list[dict[str, str]] | Conversation - The conversation history. Must adhere to model constraints.\n
-        prompt: str - The user prompt to send to the model. Must contain non-whitespace characters.
+        prompt: str - The user prompt to send to the model. Must contain non-whitespace characters.\n
+        cache: KVCache | None - (Optional) Cached keys and values to reuse for the matching start of the input.\n
+        grammar: OutputGrammar | None - (Optional) The grammar to restrict the response to. Generation ends once the response is complete.\n
+        max_new_tokens: int | None - (Optional) The maximum number of tokens to generate. Defaults to the `max_new_tokens` of the model.\n
+        stop_on_answer: bool - (Optional) Whether to end generation once the response contains a complete JSON answer. Defaults to ending on the end of sequence token (`False`).\n
+        usage: list[int] | None - (Optional) A list to add the number of generated tokens of the response to.\n
+        next_cache: list[KVCache] | None - (Optional) A list to add the keys and values of the input and the response to, for the next turn to reuse.
 
         Returns:
         --------
@@ -82,10 +330,87 @@ class Model:
         """
         ...
 
+    def prompt_stream(
+            self,
+            history: list[dict[str, str]] | Conversation,
+            prompt: str,
+            cache: KVCache | None = None,
+            grammar: OutputGrammar | None = None,
+            max_new_tokens: int | None = None,
+            stop_on_answer: bool = False,
+            usage: list[int] | None = None,
+            next_cache: list[KVCache] | None = None
+        ) -> Iterator[str]:
+        """
+        Prompts a the model and yields the response as it is generated, in increments of decoded text.
+        Once the stream ends, the messages are appended to the history exactly like `prompt` appends them.
+        The increments make up the response, except for whitespace at its end.
+
+        Tokens are generated in a background thread. If the stream is closed before it ends, generation stops
+        and the history is left as it was.
+
+        Parameters:
+        -----------
+        history: list[dict[str, str]] | Conversation - The conversation history. Must adhere to model constraints.\n
+        prompt: str - The user prompt to send to the model. Must contain non-whitespace characters.\n
+        cache: KVCache | None - (Optional) Cached keys and values to reuse for the matching start of the input.\n
+        grammar: OutputGrammar | None - (Optional) The grammar to restrict the response to. Generation ends once the response is complete.\n
+        max_new_tokens: int | None - (Optional) The maximum number of tokens to generate. Defaults to the `max_new_tokens` of the model.\n
+        stop_on_answer: bool - (Optional) Whether to end generation once the response contains a complete JSON answer. Defaults to ending on the end of sequence token (`False`).\n
+        usage: list[int] | None - (Optional) A list to add the number of generated tokens of the response to, once the stream ends.\n
+        next_cache: list[KVCache] | None - (Optional) A list to add the keys and values of the input and the response to, once the stream ends.
+
+        Returns:
+        --------
+        `Iterator[str]` - The increments of the response.
+
+        Raises:
+        -------
+        `ValueError` if `user_prompt` is empty, `None`, or consists of only whitespace characters.\n
+        Any exception raised while generating, once the stream reaches it.
+        """
+        ...
+
+    def prompt_batch(
+            self,
+            history: list[dict[str, str]] | Conversation,
+            prompts: list[str],
+            grammars: list[OutputGrammar | None] | None = None,
+            max_new_tokens: list[int] | None = None,
+            stop_on_answer: bool = False,
+            usage: list[int] | None = None
+        ) -> list[str]:
+        """
+        Prompts the model with several prompts in a single call and gets the responses.
+        Each prompt is appended to its own copy of the history, and the inputs are left-padded into one batch.
+        The history is not modified.
+
+        Parameters:
+        -----------
+        history: list[dict[str, str]] | Conversation - The conversation history shared by the prompts. Must adhere to model constraints.\n
+        prompts: list[str] - The user prompts to send to the model. Must contain non-whitespace characters.\n
+        grammars: list[OutputGrammar | None] | None - (Optional) The grammar to restrict the response to for each prompt, `None` for unconstrained prompts.\n
+        max_new_tokens: list[int] | None - (Optional) The maximum number of tokens to generate for each prompt. Defaults to the `max_new_tokens` of the model.\n
+        stop_on_answer: bool - (Optional) Whether to end generation for each prompt once its response contains a complete JSON answer.
+        The batch ends once every response has ended. Defaults to ending on the end of sequence token (`False`).\n
+        usage: list[int] | None - (Optional) A list to add the number of generated tokens of each response to, in the order of the prompts.
+
+        Returns:
+        --------
+        `list[str]` - The responses from the model in the order of the prompts.
+
+        Raises:
+        -------
+        `ValueError` if any prompt is empty, `None`, or consists of only whitespace characters.
+        """
+        ...
+
 
 class Session:
     """
     Sessions retain interaction data from models, such as history and system prompts.
+    The keys and values computed for each kept turn are retained too, so the next turn only prefills the new messages.
+    They are dropped when the history is cleared or the system prompt changes.
 
     Properties:
     -----------
@@ -96,7 +421,10 @@ class Session:
     --------
     `static create -> Session` - Creates a new prompting session.\n
     `static get -> Session | None` - Retrieves an existing prompting session if it exists, else `None`.\n
-    `prompt -> str` - Prompts the model.
+    `prefill -> KVCache` - Computes the keys and values for a prompt prefix.\n
+    `prompt -> str` - Prompts the model.\n
+    `prompt_stream -> Iterator[str]` - Prompts the model, yielding the response as it is generated.\n
+    `prompt_batch -> list[str]` - Prompts the model with several ephemeral prompts in a single call.
     """
 
     @staticmethod
@@ -104,17 +432,19 @@ class Session:
         name: str,
         model_name_or_path: str | PathLike,
         max_new_tokens: int,
-        system_prompt: str = Model._SYSTEM_PROMPT
+        system_prompt: str = Model._SYSTEM_PROMPT,
+        timeout: float | None = None
     ) -> Session:
         """
-        Creates a prompting session using a specified model.
+        Creates a prompting session using a specified model, loading the model or waiting for it to load if needed.
 
         Parameters:
         -----------
         name: str - The name to give the session.\n
         model_name_or_path: str | PathLike - The model to use. Can be either a model name from Hugging Face Hub or a path to a local model.\n
         max_new_tokens: int - The `max_new_tokens` parameter used when generating.\n
-        system_prompt: str - (Optional) The system prompt to use when prompting.
+        system_prompt: str - (Optional) The system prompt to use when prompting.\n
+        timeout: float | None - (Optional) The number of seconds to wait for the model if another caller is loading it. Waits indefinitely if `None`.
 
         Returns:
         --------
@@ -122,7 +452,7 @@ class Session:
 
         Raises:
         -------
-        `ModelLoadingException` if the specified model is currently being loaded.
+        `TimeoutError` if the model is being loaded by another caller and doesn't finish loading within `timeout`.
         """
         ...
 
@@ -159,14 +489,78 @@ class Session:
         """
         ...
 
-    def prompt(self, prompt: str, ephemeral: bool = False) -> str:
+    def prefill(self, prefix: str) -> KVCache:
+        """
+        Computes the keys and values for the session history followed by a user prompt starting with `prefix`.
+
+        Parameters:
+        -----------
+        prefix: str - The start of the user prompts. Must contain non-whitespace characters.
+
+        Returns:
+        --------
+        `KVCache` - The cached keys and values. Only valid while the history is unchanged.
+
+        Raises:
+        -------
+        `ValueError` if `prefix` is empty or consists of only whitespace characters.
+        """
+        ...
+
+    def prompt_batch(
+            self,
+            prompts: list[str],
+            grammars: list[OutputGrammar | None] | None = None,
+            max_new_tokens: list[int] | None = None,
+            stop_on_answer: bool = False,
+            usage: list[int] | None = None
+        ) -> list[str]:
+        """
+        Prompts the model with several prompts in a single call and gets the responses.
+        The prompts are always ephemeral, so the history is not modified.
+
+        Parameters:
+        -----------
+        prompts: list[str] - The user prompts to send to the model. Must contain non-whitespace characters.\n
+        grammars: list[OutputGrammar | None] | None - (Optional) The grammar to restrict the response to for each prompt, `None` for unconstrained prompts.\n
+        max_new_tokens: list[int] | None - (Optional) The maximum number of tokens to generate for each prompt. Defaults to the `max_new_tokens` of the model.\n
+        stop_on_answer: bool - (Optional) Whether to end generation for each prompt once its response contains a complete JSON answer.
+        The batch ends once every response has ended. Defaults to ending on the end of sequence token (`False`).\n
+        usage: list[int] | None - (Optional) A list to add the number of generated tokens of each response to, in the order of the prompts.
+
+        Returns:
+        --------
+        `list[str]` - The responses from the model in the order of the prompts.
+
+        Raises:
+        -------
+        `ValueError` if any prompt is empty, `None`, or consists of only whitespace characters.
+        """
+        ...
+
+    def prompt(
+            self,
+            prompt: str,
+            ephemeral: bool = False,
+            cache: KVCache | None = None,
+            grammar: OutputGrammar | None = None,
+            max_new_tokens: int | None = None,
+            stop_on_answer: bool = False,
+            usage: list[int] | None = None
+        ) -> str:
         """
-        Prompts a the model and gets the response.
+        Prompts a the model and gets the response, reusing the keys and values of the previous turn.
 
         Parameters:
         -----------
         prompt: str - The user prompt to send to the model. Must contain non-whitespace characters.\n
         ephemeral: bool - Whether the prompt and response should be saved. Defaults to saving (`False`).
+        The keys and values of an ephemeral turn are discarded along with its messages.\n
+        cache: KVCache | None - (Optional) Cached keys and values to reuse for the matching start of the input, instead of those of the previous turn.\n
+        grammar: OutputGrammar | None - (Optional) The grammar to restrict the response to. Generation ends once the response is complete.\n
+        max_new_tokens: int | None - (Optional) The maximum number of tokens to generate. Defaults to the `max_new_tokens` of the model.\n
+        stop_on_answer: bool - (Optional) Whether to end generation once the response contains a complete JSON answer. Defaults to ending on the end of sequence token (`False`).\n
+        usage: list[int] | None - (Optional) A list to add the number of generated tokens of the response to.
 
         Returns:
         --------
@@ -178,9 +572,44 @@ class Session:
         """
         ...
 
+    def prompt_stream(
+            self,
+            prompt: str,
+            ephemeral: bool = False,
+            cache: KVCache | None = None,
+            grammar: OutputGrammar | None = None,
+            max_new_tokens: int | None = None,
+            stop_on_answer: bool = False,
+            usage: list[int] | None = None
+        ) -> Iterator[str]:
+        """
+        Prompts a the model and yields the response as it is generated, reusing the keys and values of the previous turn.
+        The history is updated once the stream ends, exactly like `prompt` updates it. A stream closed before it ends leaves the history as it was.
+
+        Parameters:
+        -----------
+        prompt: str - The user prompt to send to the model. Must contain non-whitespace characters.\n
+        ephemeral: bool - Whether the prompt and response should be saved. Defaults to saving (`False`).
+        The keys and values of an ephemeral turn are discarded along with its messages.\n
+        cache: KVCache | None - (Optional) Cached keys and values to reuse for the matching start of the input, instead of those of the previous turn.\n
+        grammar: OutputGrammar | None - (Optional) The grammar to restrict the response to. Generation ends once the response is complete.\n
+        max_new_tokens: int | None - (Optional) The maximum number of tokens to generate. Defaults to the `max_new_tokens` of the model.\n
+        stop_on_answer: bool - (Optional) Whether to end generation once the response contains a complete JSON answer. Defaults to ending on the end of sequence token (`False`).\n
+        usage: list[int] | None - (Optional) A list to add the number of generated tokens of the response to, once the stream ends.
+
+        Returns:
+        --------
+        `Iterator[str]` - The increments of the response.
+
+        Raises:
+        -------
+        `ValueError` if `user_prompt` is empty, `None`, or consists of only whitespace characters.
+        """
+        ...
+
     def clear(self) -> None:
         """
-        Empties the conversation history.
+        Empties the conversation history and drops the cached keys and values.
         """
         ...
 
@@ -0,0 +1,129 @@
+"""
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from __future__ import annotations
+import json
+import re
+from typing import Any, Generator, Iterator
+
+
+_OPENERS: dict[str, str] = {"{": "}", "[": "]"}
+_CLOSERS: frozenset[str] = frozenset(_OPENERS.values())
+_STRUCTURE: re.Pattern = re.compile(r"[{}\[\]\"\\]")
+_ID: re.Pattern = re.compile(r"[A-Za-z]+-\d+")
+
+
+def iter_json(text: str) -> Iterator[Any]:
+    pos: int | None = 0
+    while pos is not None:
+        # Scan again after a bracket that is never closed, since it may hide the JSON following it
+        unclosed: int | None = yield from _iter_json_from(text, pos)
+        pos = None if unclosed is None else unclosed + 1
+
+
+def _iter_json_from(text: str, pos: int) -> Generator[Any, None, int | None]:
+    """
+    Yields the JSON objects and arrays embedded in a text from a position on, in order.
+
+    Parameters:
+    -----------
+    text: str - The text to scan.\n
+    pos: int - The position to start scanning at.
+
+    Yields:
+    -------
+    `Any` - The parsed value of each valid JSON object or array.
+
+    Returns:
+    --------
+    `int | None` - The position of the outermost bracket left open at the end of the text, if any.
+    """
+    # Open brackets as (position, expected closer)
+    stack: list[tuple[int, str]] = []
+    # Spans closed inside the current outermost bracket
+    spans: list[tuple[int, int]] = []
+    in_string: bool = False
+    # Position of the character escaped by the last backslash in a string
+    escaped: int = -1
+
+    # Only visit the characters that change the structure
+    for match in _STRUCTURE.finditer(text, pos):
+        i: int = match.start()
+        char: str = match.group()
+
+        # Strings only matter inside brackets, so quotes in chatter are ignored
+        if in_string:
+            if i == escaped:
+                continue
+            elif char == "\\":
+                escaped = i + 1
+            elif char == "\"":
+                in_string = False
+            continue
+
+        if char in _OPENERS:
+            stack.append((i, _OPENERS[char]))
+        elif not stack:
+            continue
+        elif char == "\"":
+            in_string = True
+        elif char in _CLOSERS:
+            start: int
+            closer: str
+            start, closer = stack.pop()
+
+            # Drop the whole candidate on mismatched brackets
+            if char != closer:
+                stack.clear()
+                spans.clear()
+                continue
+
+            spans.append((start, i + 1))
+            if stack:
+                continue
+
+            # Try the outermost span first, then the spans nested in it in order
+            end: int = -1
+            for curr_start, curr_end in sorted(spans):
+                if curr_start < end:
+                    continue
+
+                try:
+                    yield json.loads(text[curr_start:curr_end])
+                    end = curr_end
+                except json.JSONDecodeError:
+                    pass
+
+            spans.clear()
+
+    return stack[0][0] if stack else None
+
+
+def is_answer(value: Any) -> bool:
+    if isinstance(value, dict):
+        # An answer object with its tests
+        if "tests" in value:
+            return isinstance(value["tests"], (str, list))
+
+        # The tests of a pack of requirements, by requirement ID
+        return bool(value) and all(
+            _ID.fullmatch(key) and isinstance(tests, (str, list))
+            for key, tests in value.items()
+        )
+
+    if not isinstance(value, list):
+        return False
+
+    # A list of test IDs, or of answer objects
+    return all(isinstance(element, str) for element in value) \
+        or all(isinstance(element, dict) and is_answer(element) for element in value)
+
+
+def find_tokens(text: str, prefix: str) -> list[str]:
+    return re.findall(rf"(?<![\w-]){re.escape(prefix)}\d+(?!\w)", text)
@@ -0,0 +1,69 @@
+"""
+Core module for tolerant parsing of model output.
+
+Includes:
+---------
+`iter_json -> Iterator[Any]` - A function that yields the balanced JSON objects and arrays embedded in a text.\n
+`is_answer -> bool` - A function that checks if a parsed JSON value has the shape of an answer.\n
+`find_tokens -> list[str]` - A function that finds bare ID tokens in a text.
+
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from typing import Any, Iterator
+
+
+def iter_json(text: str) -> Iterator[Any]:
+    """
+    Yields the JSON objects and arrays embedded in a text, such as a model response with chatter or code fences, in order.
+    Balanced brackets are matched in a single pass over the text, skipping brackets within JSON strings.
+    If the outermost brackets don't hold valid JSON, the valid JSON nested within them is yielded instead.
+    A bracket that is never closed, such as one opened in chatter, is skipped and the text after it is scanned again.
+
+    Parameters:
+    -----------
+    text: str - The text to scan.
+
+    Yields:
+    -------
+    `Any` - The parsed value of each valid JSON object or array.
+    """
+    ...
+
+
+def is_answer(value: Any) -> bool:
+    """
+    Checks if a parsed JSON value has the shape of an answer accepted by the parsers:
+    a list of test IDs, an object with a `tests` field, a list of such objects,
+    or an object mapping requirement IDs, such as `R-3`, to their tests.
+
+    Parameters:
+    -----------
+    value: Any - The parsed JSON value.
+
+    Returns:
+    --------
+    `bool` - Whether the value is an answer.
+    """
+    ...
+
+
+def find_tokens(text: str, prefix: str) -> list[str]:
+    """
+    Finds bare ID tokens, such as `T-3`, in a text.
+
+    Parameters:
+    -----------
+    text: str - The text to scan.\n
+    prefix: str - The prefix of the IDs, followed by a number.
+
+    Returns:
+    --------
+    `list[str]` - The tokens in order of appearance, including duplicates.
+    """
+    ...
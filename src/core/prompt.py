@@ -7,11 +7,20 @@ License:
 --------
 MIT (see LICENSE for more information)
 """
+from __future__ import annotations
+from collections import OrderedDict
+from functools import lru_cache
 import json
+import re
+import threading
+from typing import Callable, Final, Mapping, Sequence
 
 
 _insert_req: str = r"{req}"
 _insert_tests: str = r"{tests}"
+_insert_reqs: str = r"{reqs}"
+
+_PLACEHOLDER_PATTERN: re.Pattern = re.compile(f"({re.escape(_insert_reqs)}|{re.escape(_insert_req)}|{re.escape(_insert_tests)})")
 
 # Fallback prompt for when the default prompt fails to load from the file
 _default_prompt: str = f"""I have this requirement:
@@ -32,15 +41,214 @@ The contents of "tests.json" are:
 
 I am going to parse your input in my Python program, therefore, ONLY ANSWER IN THE FORM I GAVE YOU."""
 
+# Fallback prompt for packing several requirements into a single prompt
+_default_packed_prompt: str = f"""I have these requirements:
+
+{_insert_reqs}
+
+Which of the test cases in the file "tests.json" are testing each of the requirements? Answer ONLY with a JSON object mapping the ID of EVERY requirement to a list of the test case ID(s) that are testing it in the following form:
+
+{{"<insert requirement id 1>": ["<insert test id 1>", "<insert test id 2>", ...], "<insert requirement id 2>": [], ...}}
+
+Use an empty list for requirements that no test case is testing. DO NOT ADD ANY TEXT BEFORE OR AFTER THE BRACES.
+
+The contents of "tests.json" are:
+
+{_insert_tests}
+
+I am going to parse your input in my Python program, therefore, ONLY ANSWER IN THE FORM I GAVE YOU."""
+
+
+class PromptTemplate:
+    # Maximum number of memoized serialized tests
+    _MAX_CHUNKS: Final[int] = 4096
+
+    def __init__(self, prompt: str) -> None:
+        self._prompt: str = prompt
+
+        # Alternating static segments and placeholders, starting and ending with a static segment
+        parts: list[str] = _PLACEHOLDER_PATTERN.split(prompt)
+        self._static: list[str] = parts[::2]
+        self._placeholders: list[str] = parts[1::2]
+
+        # Serialized tests mapped from their fields and values, least recently used first
+        self._chunks: OrderedDict[tuple[tuple[str, str], ...], str] = OrderedDict()
+        # The fields and values of the last serialized list of tests and its serialization
+        self._block: tuple[tuple[tuple[tuple[str, str], ...], ...], str] | None = None
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def prompt(self) -> str:
+        return self._prompt
+
+    @property
+    def placeholders(self) -> list[str]:
+        return list(self._placeholders)
+
+    def segments(
+            self,
+            req: Mapping[str, str] | None = None,
+            reqs: Sequence[Mapping[str, str]] | None = None,
+            tests: Sequence[Mapping[str, str]] | None = None
+        ) -> list[str]:
+        values: dict[str, str | None] = {
+            _insert_req: None if req is None else json.dumps(req, default=dict),
+            _insert_reqs: None if reqs is None else json.dumps(reqs, indent=2, default=dict),
+            _insert_tests: None if tests is None else self._serialize_tests(tests)
+        }
+
+        segments: list[str] = [self._static[0]]
+        for placeholder, static in zip(self._placeholders, self._static[1:]):
+            # Placeholders without a value are kept as is
+            value: str | None = values[placeholder]
+            segments += [placeholder if value is None else value, static]
+
+        return segments
+
+    def format(
+            self,
+            req: Mapping[str, str] | None = None,
+            reqs: Sequence[Mapping[str, str]] | None = None,
+            tests: Sequence[Mapping[str, str]] | None = None
+        ) -> str:
+        return "".join(self.segments(req, reqs, tests))
+
+    def prefix(self, tests: Sequence[Mapping[str, str]]) -> str:
+        # Everything before the requirement is shared by all requirements
+        segments: list[str] = [self._static[0]]
+        for placeholder, static in zip(self._placeholders, self._static[1:]):
+            if placeholder == _insert_req:
+                break
+
+            segments += [self._serialize_tests(tests) if placeholder == _insert_tests else placeholder, static]
+
+        return "".join(segments)
+
+    def count_tokens(
+            self,
+            count_tokens: Callable[[str], int],
+            req: Mapping[str, str] | None = None,
+            reqs: Sequence[Mapping[str, str]] | None = None,
+            tests: Sequence[Mapping[str, str]] | None = None
+        ) -> int:
+        # A memoized counter only counts the static segments and the tests once
+        return sum(count_tokens(segment) for segment in self.segments(req, reqs, tests) if segment)
+
+    def _serialize_tests(self, tests: Sequence[Mapping[str, str]]) -> str:
+        """
+        Serializes tests the same way as `json.dumps(tests, indent=2)`, reusing the serialization of each test.
+        The serializations are memoized by the content of the tests, so they never hold on to the tests themselves.
+
+        Parameters:
+        -----------
+        tests: Sequence[Mapping[str, str]] - The tests to serialize.
+
+        Returns:
+        --------
+        `str` - The serialized tests.
+        """
+        if not tests:
+            return "[]"
+
+        keys: tuple[tuple[tuple[str, str], ...], ...] = tuple(tuple(test.items()) for test in tests)
+
+        with self._lock:
+            if self._block is not None and self._block[0] == keys:
+                return self._block[1]
+
+            chunks: list[str] = []
+            for test, key in zip(tests, keys):
+                chunk: str | None = self._chunks.get(key)
+                if chunk is None:
+                    chunk = _serialize_test(test)
+                    self._chunks[key] = chunk
+                    if len(self._chunks) > PromptTemplate._MAX_CHUNKS:
+                        self._chunks.popitem(last=False)
+                else:
+                    self._chunks.move_to_end(key)
+
+                chunks.append(chunk)
+
+            self._block = (keys, "[\n" + ",\n".join(chunks) + "\n]")
+            return self._block[1]
+
+
+@lru_cache(maxsize=32)
+def compile_prompt(prompt: str) -> PromptTemplate:
+    return PromptTemplate(prompt)
+
+
+def req_is_tested_template(prompt: str | None = None) -> PromptTemplate:
+    return compile_prompt(_default_prompt if prompt is None else prompt)
+
+
+def reqs_are_tested_template(prompt: str | None = None) -> PromptTemplate:
+    return compile_prompt(_default_packed_prompt if prompt is None else prompt)
+
 
 def format_req_is_tested_prompt(
         tests: list[dict[str, str]],
         req: dict[str, str],
         prompt: str | None = None
     ) -> str:
-    if prompt is None:
-        prompt = _default_prompt
+    return req_is_tested_template(prompt).format(req=req, tests=tests)
+
+
+def format_reqs_are_tested_prompt(
+        tests: list[dict[str, str]],
+        reqs: list[dict[str, str]],
+        prompt: str | None = None
+    ) -> str:
+    return reqs_are_tested_template(prompt).format(reqs=reqs, tests=tests)
+
+
+def format_req_is_tested_prefix(
+        tests: list[dict[str, str]],
+        prompt: str | None = None
+    ) -> str:
+    return req_is_tested_template(prompt).prefix(tests)
+
+
+def window_tests(
+        tests: Sequence[dict[str, str]],
+        budget: int,
+        count_tokens: Callable[[str], int],
+        strict: bool = False
+    ) -> list[list[dict[str, str]]]:
+    windows: list[list[dict[str, str]]] = []
+    window: list[dict[str, str]] = []
+    used: int = 0
+
+    for test in tests:
+        # Count each test as it appears in the indented list of tests
+        chunk: str = _serialize_test(test) + ",\n"
+        tokens: int = count_tokens(chunk)
+        if strict and tokens > budget:
+            raise ValueError(f"Test {test['ID']} needs {tokens} tokens, but only {max(budget, 0)} tokens are left for tests.")
+
+        if window and used + tokens > budget:
+            windows.append(window)
+            window = []
+            used = 0
+
+        # Unless strict, a test exceeding the budget on its own still gets a window
+        window.append(test)
+        used += tokens
+
+    windows.append(window)
+    return windows
+
+
+def _serialize_test(test: Mapping[str, str]) -> str:
+    """
+    Serializes a test as it appears in an indented list of tests.
+
+    Parameters:
+    -----------
+    test: Mapping[str, str] - The test to serialize.
 
-    return prompt \
-        .replace(_insert_req, json.dumps(req)) \
-        .replace(_insert_tests, json.dumps(tests, indent=2))
+    Returns:
+    --------
+    `str` - The serialized test, indented by one level.
+    """
+    return "  " + json.dumps(test, indent=2, default=dict).replace("\n", "\n  ")
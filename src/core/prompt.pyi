@@ -3,8 +3,18 @@ Core module for formatting prompts for REST-at.
 
 Includes:
 ---------
+`PromptTemplate` - A class representing a compiled prompt with cached segments.\n
+`compile_prompt -> PromptTemplate` - A function that compiles a prompt, reusing recently compiled prompts.\n
+`req_is_tested_template -> PromptTemplate` - A function that compiles a prompt for checking whether a requirement is tested or not.\n
+`reqs_are_tested_template -> PromptTemplate` - A function that compiles a prompt for checking which tests test each of several
+requirements.\n
 `format_req_is_tested_prompt -> str` - A function that formats a prompt for checking whether a
-requirement is tested or not.
+requirement is tested or not.\n
+`format_reqs_are_tested_prompt -> str` - A function that formats a prompt for checking which tests test each of several
+requirements.\n
+`format_req_is_tested_prefix -> str` - A function that formats the part of such a prompt that is
+shared by all requirements.\n
+`window_tests -> list[list[dict[str, str]]]` - A function that splits tests into windows fitting a token budget.
 
 Copyright:
 ----------
@@ -14,6 +24,181 @@ License:
 --------
 MIT (see LICENSE for more information)
 """
+from typing import Callable, Mapping, Sequence
+
+
+class PromptTemplate:
+    """
+    A prompt compiled once into static segments and `{req}`, `{reqs}`, and `{tests}` placeholders.
+    The serialization of each test and the last list of tests are cached by their content, least recently used tests
+    first out, so rendering a requirement only serializes the requirement.
+
+    Properties:
+    -----------
+    `readonly prompt: str` - The prompt the template was compiled from.\n
+    `readonly placeholders: list[str]` - The placeholders of the prompt in order of appearance.
+
+    Methods:
+    --------
+    `segments -> list[str]` - Renders the static segments and the placeholder values of the prompt.\n
+    `format -> str` - Renders the prompt.\n
+    `prefix -> str` - Renders the part of the prompt preceding the first `{req}`.\n
+    `count_tokens -> int` - Counts the tokens of the rendered prompt segment by segment.
+    """
+
+    def __init__(self, prompt: str) -> None:
+        """
+        Compiles a prompt.
+
+        Parameters:
+        -----------
+        prompt: str - The prompt. Include `{req}` in place of a requirement, `{reqs}` in place of several requirements,
+        and `{tests}` in place of the tests.
+        """
+        ...
+
+    @property
+    def prompt(self) -> str:
+        """
+        The prompt the template was compiled from.
+        """
+        ...
+
+    @property
+    def placeholders(self) -> list[str]:
+        """
+        The placeholders of the prompt in order of appearance, including repeated placeholders.
+        """
+        ...
+
+    def segments(
+            self,
+            req: Mapping[str, str] | None = None,
+            reqs: Sequence[Mapping[str, str]] | None = None,
+            tests: Sequence[Mapping[str, str]] | None = None
+        ) -> list[str]:
+        """
+        Renders the static segments of the prompt and the values of its placeholders.
+        Placeholders without a value are kept as is.
+
+        Parameters:
+        -----------
+        req: Mapping[str, str] | None - (Optional) The requirement to insert in place of `{req}`.\n
+        reqs: Sequence[Mapping[str, str]] | None - (Optional) The requirements to insert in place of `{reqs}`.\n
+        tests: Sequence[Mapping[str, str]] | None - (Optional) The tests to insert in place of `{tests}`.
+
+        Returns:
+        --------
+        `list[str]` - The segments, alternating between static segments and placeholder values.
+        """
+        ...
+
+    def format(
+            self,
+            req: Mapping[str, str] | None = None,
+            reqs: Sequence[Mapping[str, str]] | None = None,
+            tests: Sequence[Mapping[str, str]] | None = None
+        ) -> str:
+        """
+        Renders the prompt. Gives the same result as replacing the placeholders with the JSON of their values.
+
+        Parameters:
+        -----------
+        req: Mapping[str, str] | None - (Optional) The requirement to insert in place of `{req}`.\n
+        reqs: Sequence[Mapping[str, str]] | None - (Optional) The requirements to insert in place of `{reqs}`.\n
+        tests: Sequence[Mapping[str, str]] | None - (Optional) The tests to insert in place of `{tests}`.
+
+        Returns:
+        --------
+        `str` - The rendered prompt.
+        """
+        ...
+
+    def prefix(self, tests: Sequence[Mapping[str, str]]) -> str:
+        """
+        Renders the part of the prompt preceding the first `{req}`, shared by all requirements.
+
+        Parameters:
+        -----------
+        tests: Sequence[Mapping[str, str]] - The tests to insert in place of `{tests}`.
+
+        Returns:
+        --------
+        `str` - The rendered prefix. The whole prompt if it has no `{req}`.
+        """
+        ...
+
+    def count_tokens(
+            self,
+            count_tokens: Callable[[str], int],
+            req: Mapping[str, str] | None = None,
+            reqs: Sequence[Mapping[str, str]] | None = None,
+            tests: Sequence[Mapping[str, str]] | None = None
+        ) -> int:
+        """
+        Counts the tokens of the rendered prompt segment by segment.
+        With a memoized counter, only the requirements are counted more than once.
+        Tokens merged across segment boundaries make the count differ slightly from counting the whole prompt.
+
+        Parameters:
+        -----------
+        count_tokens: Callable[[str], int] - A function counting the tokens of a text.\n
+        req: Mapping[str, str] | None - (Optional) The requirement to insert in place of `{req}`.\n
+        reqs: Sequence[Mapping[str, str]] | None - (Optional) The requirements to insert in place of `{reqs}`.\n
+        tests: Sequence[Mapping[str, str]] | None - (Optional) The tests to insert in place of `{tests}`.
+
+        Returns:
+        --------
+        `int` - The number of tokens.
+        """
+        ...
+
+
+def compile_prompt(prompt: str) -> PromptTemplate:
+    """
+    Compiles a prompt, reusing the templates of the 32 most recently compiled prompts.
+
+    Parameters:
+    -----------
+    prompt: str - The prompt.
+
+    Returns:
+    --------
+    `PromptTemplate` - The compiled prompt.
+    """
+    ...
+
+
+def req_is_tested_template(prompt: str | None = None) -> PromptTemplate:
+    """
+    Compiles a prompt for checking whether a requirement is tested or not.
+
+    Parameters:
+    -----------
+    prompt: str | None - (Optional) The prompt to be used. Defaults to a predefined prompt.
+    Include `{req}` in place of the requirement and `{tests}` in place of the tests.
+
+    Returns:
+    --------
+    `PromptTemplate` - The compiled prompt.
+    """
+    ...
+
+
+def reqs_are_tested_template(prompt: str | None = None) -> PromptTemplate:
+    """
+    Compiles a prompt for checking which tests test each of several requirements.
+
+    Parameters:
+    -----------
+    prompt: str | None - (Optional) The prompt to be used. Defaults to a predefined prompt.
+    Include `{reqs}` in place of the requirements and `{tests}` in place of the tests.
+
+    Returns:
+    --------
+    `PromptTemplate` - The compiled prompt.
+    """
+    ...
 
 
 def format_req_is_tested_prompt(
@@ -36,3 +221,77 @@ def format_req_is_tested_prompt(
     `str` - The formatted prompt string.
     """
     ...
+
+
+def format_reqs_are_tested_prompt(
+        tests: list[dict[str, str]],
+        reqs: list[dict[str, str]],
+        prompt: str | None = None
+    ) -> str:
+    """
+    Formats a prompt for checking which tests test each of several requirements, sharing a single copy of the tests.
+    The prompt should ask for a JSON object mapping each requirement ID to a list of test IDs.
+
+    Parameters:
+    -----------
+    tests: list[dict[str, str]] - The list of tests to check.\n
+    reqs: list[dict[str, str]] - The requirements to check.\n
+    prompt: str | None - The prompt to be used.
+    Include `{reqs}` in place of the requirements and `{tests}` in place of the tests.
+
+    Returns:
+    --------
+    `str` - The formatted prompt string.
+    """
+    ...
+
+
+def format_req_is_tested_prefix(
+        tests: list[dict[str, str]],
+        prompt: str | None = None
+    ) -> str:
+    """
+    Formats the part of a prompt for checking whether a requirement is tested or not that precedes the requirement.
+    The result is a prefix of `format_req_is_tested_prompt(tests, req, prompt)` for every requirement.
+    Place `{tests}` before `{req}` in the prompt to include the tests in the prefix.
+
+    Parameters:
+    -----------
+    tests: list[dict[str, str]] - The list of tests to check.\n
+    prompt: str | None - The prompt to be used.
+    Include `{req}` in place of the requirement and `{tests}` in place of the tests.
+
+    Returns:
+    --------
+    `str` - The formatted prompt prefix.
+    """
+    ...
+
+
+def window_tests(
+        tests: Sequence[dict[str, str]],
+        budget: int,
+        count_tokens: Callable[[str], int],
+        strict: bool = False
+    ) -> list[list[dict[str, str]]]:
+    """
+    Greedily splits a list of tests into consecutive windows whose serialized tests fit a token budget.
+    A test exceeding the budget on its own is put in a window by itself, unless `strict`.
+
+    Parameters:
+    -----------
+    tests: Sequence[dict[str, str]] - The tests to split.\n
+    budget: int - The maximum number of tokens of the tests in a window.\n
+    count_tokens: Callable[[str], int] - A function counting the tokens of a text.\n
+    strict: bool - (Optional) Whether to raise an error instead of overflowing the budget with a test. Defaults to `False`.
+
+    Returns:
+    --------
+    `list[list[dict[str, str]]]` - The tests of each window, in order. Contains a single window
+    if all tests fit the budget, or if there are no tests.
+
+    Raises:
+    -------
+    `ValueError` if `strict` and a test exceeds the budget on its own.
+    """
+    ...
@@ -0,0 +1,43 @@
+"""
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from __future__ import annotations
+from collections.abc import Iterable, Iterator, Mapping
+import sys
+
+
+class SpecRecord(Mapping):
+    __slots__ = ("_fields", "_values")
+
+    def __init__(self, fields: dict[str, int], values: tuple[str, ...]) -> None:
+        if len(fields) != len(values):
+            raise ValueError(f"Expected {len(fields)} values, got {len(values)}.")
+
+        self._fields: dict[str, int] = fields
+        self._values: tuple[str, ...] = values
+
+    @staticmethod
+    def fields(names: Iterable[str]) -> dict[str, int]:
+        # Shared by every record of a file, so the names are only stored once
+        return {sys.intern(name): i for i, name in enumerate(names)}
+
+    def __getitem__(self, key: str) -> str:
+        return self._values[self._fields[key]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"SpecRecord({dict(self)!r})"
+
+    def __reduce__(self) -> tuple:
+        return SpecRecord, (self._fields, self._values)
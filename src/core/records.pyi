@@ -0,0 +1,67 @@
+"""
+Core module for storing the requirements and tests of REST specifications.
+
+Includes:
+---------
+`SpecRecord` - A class representing a compact, immutable requirement or test.
+
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from collections.abc import Iterable, Iterator, Mapping
+
+
+class SpecRecord(Mapping):
+    """
+    A compact, immutable requirement or test, read like a `dict[str, str]`.
+    The values are stored in a tuple, and the field names are shared by every record of a file.
+    Records are not JSON serializable by themselves, pass `default=dict` to `json.dumps`.
+
+    Methods:
+    --------
+    `static fields -> dict[str, int]` - Creates the field positions shared by records.
+    """
+
+    def __init__(self, fields: dict[str, int], values: tuple[str, ...]) -> None:
+        """
+        Creates a record.
+
+        Parameters:
+        -----------
+        fields: dict[str, int] - The position of each field in `values`, shared with the other records of a file.\n
+        values: tuple[str, ...] - The value of each field.
+
+        Raises:
+        -------
+        `ValueError` if the number of values doesn't match the number of fields.
+        """
+        ...
+
+    @staticmethod
+    def fields(names: Iterable[str]) -> dict[str, int]:
+        """
+        Creates the field positions shared by records, with interned field names.
+
+        Parameters:
+        -----------
+        names: Iterable[str] - The field names, in order.
+
+        Returns:
+        --------
+        `dict[str, int]` - The position of each field.
+        """
+        ...
+
+    def __getitem__(self, key: str) -> str:
+        ...
+
+    def __iter__(self) -> Iterator[str]:
+        ...
+
+    def __len__(self) -> int:
+        ...
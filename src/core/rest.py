@@ -8,22 +8,44 @@ License:
 MIT (see LICENSE for more information)
 """
 from __future__ import annotations
+import asyncio
 from copy import deepcopy
 import datetime
+import itertools
 from os import PathLike
 import csv
 import json
+import time
 from io import StringIO
 import traceback
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Iterable, Iterator, Mapping, Sequence
 from typing_extensions import override
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from openai.types.chat import ChatCompletion
 
-from .prompt import format_req_is_tested_prompt
-from .model import Session
+from .cache import ResponseCache
+from .estimate import TokenEstimate, approximate_counter, tokenizer_counter
+from .grammar import OutputGrammar, OutputShape
+from .prompt import (
+    format_req_is_tested_prefix,
+    format_req_is_tested_prompt,
+    format_reqs_are_tested_prompt,
+    req_is_tested_template,
+    reqs_are_tested_template,
+    window_tests
+)
+from .records import SpecRecord
+from .parse import find_tokens, iter_json
+from .results import ResultRecord
+from .retrieval import BM25Index
+from .tables import TableCache
 from .rest import *
 
+# Local models are imported where used, so GPT runs and evaluations don't load torch and transformers
+if TYPE_CHECKING:
+    from .model import KVCache, Session
+
 
 class FieldMismatchError(Exception):
     def __init__(self, expected: set[str], got: set[str], *args: object) -> None:
@@ -37,6 +59,20 @@ class Response:
         self.links: dict[str, list[str]] = links
         self.err: dict[str, list[str]] = err
 
+    @staticmethod
+    def from_records(records: list[ResultRecord]) -> Response:
+        links: dict[str, list[str]] = {}
+        err: dict[str, list[str]] = {}
+
+        # Keep the order of the requirements regardless of the order of completion
+        for record in sorted(records, key=lambda record: record.index):
+            links[record.req_id] = record.links
+
+            if record.err:
+                err[record.req_id] = record.err
+
+        return Response(links, err)
+
     @property
     def as_dict(self) -> dict:
         return {
@@ -60,6 +96,56 @@ class GPTResponse(Response):
         self.output_tokens: int = tokens[1]
         self.fingerprint: str = system_fingerprint[0] + (f"\n{system_fingerprint[1]}" if system_fingerprint[1] else "")
 
+    # Expected system fingerprints of the supported GPT models
+    _SYSTEM_FINGERPRINTS: dict[str, str] = {
+        "gpt-3.5-turbo-0125": "fp_3b956da36b",
+        "gpt-4-turbo-2024-04-09": "fp_ea6eb70039"
+    }
+
+    @staticmethod
+    def from_records(model: str, records: list[ResultRecord]) -> GPTResponse:
+        input_tokens: int = 0
+        output_tokens: int = 0
+
+        # Mapped from requirement ID to the associated message history
+        raw_res: dict[str, list[dict[str, str]]] = {}
+
+        system_fingerprint: str | None = GPTResponse._SYSTEM_FINGERPRINTS.get(model)
+
+        fp_data: tuple[str, str | None]
+        if system_fingerprint is None:
+            fp_data = ("No system fingerprint", None)
+        else:
+            fp_data = (system_fingerprint, None)
+
+        # Keep the order of the requirements regardless of the order of completion
+        records = sorted(records, key=lambda record: record.index)
+
+        for record in records:
+            raw_res[record.req_id] = record.history
+
+            #######################################################
+            # Uncomment to print system fingerprint and seed used
+            #######################################################
+            #if not_printed:
+            #    print(f'system fingerprint = {system_fingerprint} and seed = {SEED}')
+            #    not_printed = False
+
+            # Check if the system fingerprint has changed
+            for curr_system_fingerprint in record.system_fingerprints:
+                if curr_system_fingerprint != system_fingerprint and fp_data[1] is None:
+                    fp_data = (
+                        f"{system_fingerprint or 'null'} -> {curr_system_fingerprint}",
+                        "Fingerprint changed, expect changes."
+                    )
+
+            input_tokens += record.input_tokens
+            output_tokens += record.output_tokens
+
+        res: Response = Response.from_records(records)
+
+        return GPTResponse(res.links, res.err, raw_res, (input_tokens, output_tokens), fp_data)
+
     @override
     @property
     def as_dict(self) -> dict:
@@ -77,6 +163,24 @@ class RESTSpecification:
 
     _GPT_SEED = 0
 
+    _TEMPERATURE: float = 0.1
+
+    # Context lengths of known GPT models
+    _GPT_CONTEXT: dict[str, int] = {
+        "gpt-3.5-turbo": 16385,
+        "gpt-3.5-turbo-0125": 16385,
+        "gpt-4-turbo": 128000,
+        "gpt-4-turbo-2024-04-09": 128000
+    }
+    # Tokens reserved for GPT responses
+    _GPT_MAX_OUTPUT_TOKENS: int = 4096
+
+    # Conservative approximation for models without a local tokenizer
+    _CHARS_PER_TOKEN: float = 3.0
+
+    # Tokens reserved for the chat template around the messages
+    _TEMPLATE_MARGIN: int = 64
+
     _DEFAULT_SYSTEM_PROMPT: str = "You are a helpful assistant."
 
     _REQ_FIELDS: set[str] = {
@@ -91,113 +195,238 @@ class RESTSpecification:
         "Test steps"
     }
 
+    # Characters of the start of a CSV file to sniff its dialect from
+    _SNIFF_SIZE: int = 8192
+    _CSV_DELIMITERS: str = ",;\t|"
+
+    # Tokens allowed on top of the longest possible answer, for whitespace and brief chatter
+    _ANSWER_SLACK: int = 32
+
     def __init__(
             self,
-            reqs: tuple[list[dict[str, str]], list[str]],
-            tests: tuple[list[dict[str, str]], list[str]],
+            reqs: tuple[Sequence[Mapping[str, str]], list[str]],
+            tests: tuple[Sequence[Mapping[str, str]], list[str]],
         ) -> None:
-        self._reqs: list[dict[str, str]]
-        self._tests: list[dict[str, str]]
+        self._reqs: tuple[Mapping[str, str], ...]
+        self._tests: tuple[Mapping[str, str], ...]
         self._reqs_index: list[str]
         self._tests_index: list[str]
 
-        self._reqs, self._reqs_index = reqs
-        self._tests, self._tests_index = tests
+        self._reqs, self._reqs_index = tuple(reqs[0]), reqs[1]
+        self._tests, self._tests_index = tuple(tests[0]), tests[1]
+
+        # The IDs never change, so the sets are only built once
+        self._req_ids: frozenset[str] = frozenset(self._reqs_index)
+        self._test_ids: frozenset[str] = frozenset(self._tests_index)
+
+        # Positions mapped from IDs, keeping the first of duplicate IDs
+        self._req_positions: dict[str, int] = {}
+        for i, id_ in enumerate(self._reqs_index):
+            self._req_positions.setdefault(id_, i)
+
+        self._test_positions: dict[str, int] = {}
+        for i, id_ in enumerate(self._tests_index):
+            self._test_positions.setdefault(id_, i)
+
+        # Test IDs mapped from the indices used in prompts
+        self._test_keys: dict[str, str] = {
+            test["ID"]: id_ for test, id_ in zip(self._tests, self._tests_index)
+        }
 
         self._system_prompt: str = RESTSpecification._DEFAULT_SYSTEM_PROMPT
         self._prompt: str | None = None
 
+        # Number of candidate tests to include per requirement, all tests if None
+        self._top_k: int | None = None
+        # Built on first use
+        self._test_index: BM25Index | None = None
+
+        # Number of requirements to prompt together, and the prompt used for them
+        self._pack_size: int = 1
+        self._packed_prompt: str | None = None
+
     @staticmethod
     def load_specs_from_str(reqs: str, tests: str) -> RESTSpecification:
-        # Load requirements and filter the desired fields
+        # Wrap the data with StringIO to make it act like a file
+        return RESTSpecification.load_specs_from_files(StringIO(reqs), StringIO(tests))
 
-        # Wrap req data with StringIO to make it act like a file
-        req_data: StringIO = StringIO(reqs)
+    @staticmethod
+    def load_specs(
+            reqs_path: str | PathLike,
+            tests_path: str | PathLike,
+            cache: TableCache | None = None
+        ) -> RESTSpecification:
+        return RESTSpecification(
+            RESTSpecification._rows_from_columns(
+                RESTSpecification._load_columns(reqs_path, RESTSpecification._REQ_FIELDS, cache),
+                RESTSpecification._REQ_INDEX_PREFIX
+            ),
+            RESTSpecification._rows_from_columns(
+                RESTSpecification._load_columns(tests_path, RESTSpecification._TEST_FIELDS, cache),
+                RESTSpecification._TEST_INDEX_PREFIX
+            )
+        )
 
-        req_list: list[dict[str, str]] = []
-        req_index: list[str] = []
-        req_fields: set[str] = RESTSpecification._REQ_FIELDS
-        req_reader: csv.DictReader = csv.DictReader(req_data)
+    @staticmethod
+    def load_specs_from_files(reqs: Iterable[str], tests: Iterable[str]) -> RESTSpecification:
+        return RESTSpecification(
+            RESTSpecification._read_rows(reqs, RESTSpecification._REQ_FIELDS, RESTSpecification._REQ_INDEX_PREFIX),
+            RESTSpecification._read_rows(tests, RESTSpecification._TEST_FIELDS, RESTSpecification._TEST_INDEX_PREFIX)
+        )
 
-        csv_req_fields: set[str] = set(req_reader.fieldnames)
-        # Validate fields
-        if req_fields - csv_req_fields != set():
-            raise FieldMismatchError(req_fields, req_fields & csv_req_fields)
+    @staticmethod
+    def _load_columns(path: str | PathLike, fields: set[str], cache: TableCache | None) -> dict[str, list[str]]:
+        """
+        Loads the desired fields of a CSV file as columns, reusing the columns cached by a previous parse of the same content.
 
-        for i, row in enumerate(req_reader):
-            r: dict[str, str] = {k: row[k] for k in row.keys() if k in req_fields}
+        Parameters:
+        -----------
+        path: str | PathLike - The path to the CSV file.\n
+        fields: set[str] - The fields to keep. Must be in the header.\n
+        cache: TableCache | None - The cache of parsed files. The file is always parsed if `None`.
 
-            # Substitute the requirement ID with an index
-            id_: str = r["ID"]
-            r["ID"] = f"{RESTSpecification._REQ_INDEX_PREFIX}{i}"
+        Returns:
+        --------
+        `dict[str, list[str]]` - The values of each field, in the order of the file.
 
-            req_list.append(r)
-            req_index.append(id_)
+        Raises:
+        -------
+        `FieldMismatchError` - If the header is missing any of the fields.
+        """
+        def parse(path: str | PathLike) -> dict[str, list[str]]:
+            # Exports often start with a byte order mark
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                return RESTSpecification._read_columns(f, fields)
 
-        # Load tests and filter the desired fields
+        if cache is None:
+            return parse(path)
 
-        # Wrap test data with StringIO to make it act like a file
-        test_data: StringIO = StringIO(tests)
+        # Parses with other fields are cached separately
+        return cache.load(path, f"specs:{','.join(sorted(fields))}", parse)
 
-        test_list: list[dict[str, str]] = []
-        test_index: list[str] = []
-        test_fields: set[str] = RESTSpecification._TEST_FIELDS
-        test_reader: csv.DictReader = csv.DictReader(test_data)
+    @staticmethod
+    def _read_rows(lines: Iterable[str], fields: set[str], prefix: str) -> tuple[tuple[SpecRecord, ...], list[str]]:
+        """
+        Reads the rows of CSV data, keeping only the desired fields and substituting the IDs with indices.
 
-        csv_test_fields: set[str] = set(test_reader.fieldnames)
-        # Validate fields
-        if test_fields - csv_test_fields != set():
-            raise FieldMismatchError(test_fields, test_fields & csv_test_fields)
+        Parameters:
+        -----------
+        lines: Iterable[str] - The lines of the CSV data, such as a file handle.\n
+        fields: set[str] - The fields to keep. Must be in the header.\n
+        prefix: str - The prefix of the substituted IDs.
+
+        Returns:
+        --------
+        `tuple[tuple[SpecRecord, ...], list[str]]` - The rows and their original IDs, in order.
+
+        Raises:
+        -------
+        `FieldMismatchError` - If the header is missing any of the fields.
+        """
+        return RESTSpecification._rows_from_columns(RESTSpecification._read_columns(lines, fields), prefix)
+
+    @staticmethod
+    def _read_columns(lines: Iterable[str], fields: set[str]) -> dict[str, list[str]]:
+        """
+        Reads the rows of a CSV file one at a time into columns, keeping only the desired fields.
+        The delimiter is sniffed from the first lines, falling back on a comma. Quoting follows the default dialect.
+
+        Parameters:
+        -----------
+        lines: Iterable[str] - The lines of the CSV data, such as a file handle.\n
+        fields: set[str] - The fields to keep. Must be in the header.
+
+        Returns:
+        --------
+        `dict[str, list[str]]` - The values of each field, in the order of the file.
+
+        Raises:
+        -------
+        `FieldMismatchError` - If the header is missing any of the fields.
+        """
+        it: Iterator[str] = iter(lines)
 
-        for i, row in enumerate(test_reader):
-            t: dict[str, str] = {k: row[k] for k in row.keys() if k in test_fields}
+        # Read whole lines to sniff the dialect from, without seeking
+        sample: list[str] = []
+        sample_len: int = 0
+        for line in it:
+            sample.append(line)
+            sample_len += len(line)
 
-            # Substitute the requirement ID with an index
-            id_: str = t["ID"]
-            t["ID"] = f"{RESTSpecification._TEST_INDEX_PREFIX}{i}"
+            if sample_len >= RESTSpecification._SNIFF_SIZE:
+                break
 
-            test_list.append(t)
-            test_index.append(id_)
+        # Only trust the sniffed delimiter, the sniffer misjudges quoting such as doubled quotes
+        delimiter: str
+        try:
+            delimiter = csv.Sniffer().sniff("".join(sample), RESTSpecification._CSV_DELIMITERS).delimiter
+        except csv.Error:
+            delimiter = csv.excel.delimiter
 
-        return RESTSpecification((req_list, req_index), (test_list, test_index))
+        reader: csv.DictReader = csv.DictReader(itertools.chain(sample, it), dialect=csv.excel, delimiter=delimiter)
+
+        csv_fields: set[str] = set(reader.fieldnames or [])
+        # Validate fields
+        if fields - csv_fields != set():
+            raise FieldMismatchError(fields, fields & csv_fields)
+
+        # Keep the fields in the order of the file
+        columns: dict[str, list[str]] = {k: [] for k in reader.fieldnames if k in fields}
+        for row in reader:
+            for k, column in columns.items():
+                column.append(row[k])
+
+        return columns
 
     @staticmethod
-    def load_specs(reqs_path: str | PathLike, tests_path: str | PathLike) -> RESTSpecification:
-        reqs: str
-        with open(reqs_path) as f:
-            reqs = f.read()
+    def _rows_from_columns(columns: dict[str, list[str]], prefix: str) -> tuple[tuple[SpecRecord, ...], list[str]]:
+        """
+        Builds rows from columns, substituting the IDs with indices.
 
-        tests: str
-        with open(tests_path) as f:
-            tests = f.read()
+        Parameters:
+        -----------
+        columns: dict[str, list[str]] - The values of each field, including `ID`.\n
+        prefix: str - The prefix of the substituted IDs.
 
-        return RESTSpecification.load_specs_from_str(reqs, tests)
+        Returns:
+        --------
+        `tuple[tuple[SpecRecord, ...], list[str]]` - The rows and their original IDs, in order.
+        """
+        kept_fields: dict[str, int] = SpecRecord.fields(list(columns))
+        id_pos: int = kept_fields["ID"]
+
+        # The original IDs are kept in order, and replaced by indices in the rows
+        index: list[str] = list(columns["ID"])
+        values: list[list[str]] = [list(column) for column in columns.values()]
+        values[id_pos] = [f"{prefix}{i}" for i in range(len(index))]
+
+        return tuple(SpecRecord(kept_fields, row) for row in zip(*values)), index
 
     def check_req(self, req: str) -> bool:
-        return req in self._reqs_index
+        return req in self._req_positions
 
     def check_test(self, test: str) -> bool:
-        return test in self._tests_index
+        return test in self._test_positions
 
     @property
     def n(self) -> int:
         return len(self._reqs) * len(self._tests)
 
     @property
-    def reqs(self) -> list[dict[str, str]]:
-        return deepcopy(self._reqs)
+    def reqs(self) -> tuple[Mapping[str, str], ...]:
+        return self._reqs
     
     @property
-    def req_ids(self) -> set[str]:
-        return set(self._reqs_index)
+    def req_ids(self) -> frozenset[str]:
+        return self._req_ids
 
     @property
-    def tests(self) -> list[dict[str, str]]:
-        return deepcopy(self._tests)
+    def tests(self) -> tuple[Mapping[str, str], ...]:
+        return self._tests
     
     @property
-    def test_ids(self) -> set[str]:
-        return set(self._tests_index)
+    def test_ids(self) -> frozenset[str]:
+        return self._test_ids
     
     @property
     def system_prompt(self) -> str:
@@ -214,144 +443,1212 @@ class RESTSpecification:
 
     @property
     def prompt(self) -> str | None:
-        return self.prompt
+        return self._prompt
     
     @prompt.setter
     def prompt(self, new: str | None) -> None:
         self._prompt = new
 
+    @property
+    def top_k(self) -> int | None:
+        return self._top_k
+
+    @top_k.setter
+    def top_k(self, new: int | None) -> None:
+        if new is not None and new < 1:
+            raise ValueError(f"top_k must be at least 1, got {new}.")
+
+        self._top_k = new
+
+    @property
+    def pack_size(self) -> int:
+        return self._pack_size
+
+    @pack_size.setter
+    def pack_size(self, new: int) -> None:
+        if new < 1:
+            raise ValueError(f"pack_size must be at least 1, got {new}.")
+
+        self._pack_size = new
+
+    @property
+    def packed_prompt(self) -> str | None:
+        return self._packed_prompt
+
+    @packed_prompt.setter
+    def packed_prompt(self, new: str | None) -> None:
+        self._packed_prompt = new
+
+    def candidates(self, req_id: str) -> list[str]:
+        if req_id not in self._req_positions:
+            raise ValueError(f"Requirement {req_id} not in the specification.")
+
+        req: Mapping[str, str] = self._reqs[self._req_positions[req_id]]
+
+        return [self._test_keys[test["ID"]] for test in self._req_tests(req)]
+
+    def retrieval_recall(self, mapping: dict[str, set[str]]) -> float | None:
+        found: int = 0
+        expected: int = 0
+
+        for req_id in self._reqs_index:
+            expected_tests: set[str] | None = mapping.get(req_id)
+            if not expected_tests:
+                continue
+
+            found += len(expected_tests & set(self.candidates(req_id)))
+            expected += len(expected_tests)
+
+        return found / expected if expected else None
+
+    def _req_tests(self, req: dict[str, str]) -> Sequence[dict[str, str]]:
+        """
+        Gets the tests to include in the prompt for a requirement.
+        If `top_k` is set, only the `top_k` tests most relevant to the requirement are included.
+        The tests keep their order and their `T-n` IDs, so responses parse the same.
+
+        Parameters:
+        -----------
+        req: dict[str, str] - The requirement to get tests for.
+
+        Returns:
+        --------
+        `Sequence[dict[str, str]]` - The tests to include in the prompt, all of them as the stored tuple.
+        """
+        if self._top_k is None or self._top_k >= len(self._tests):
+            return self._tests
+
+        # Index the purpose and test steps of each test once
+        if self._test_index is None:
+            self._test_index = BM25Index([
+                f"{test['Purpose']}\n{test['Test steps']}"
+                for test in self._tests
+            ])
+
+        top: list[int] = self._test_index.top_k(f"{req['Feature']}\n{req['Description']}", self._top_k)
+
+        return [self._tests[i] for i in sorted(top)]
+
     def to_gpt(
             self,
-            model: str
+            model: str,
+            concurrency: int | None = None,
+            cache: ResponseCache | None = None,
+            context_window: int | None = None,
+            chars_per_token: float | None = None
+        ) -> GPTResponse:
+        # Fan out the requirements through the async client if a concurrency bound is given
+        if concurrency is not None:
+            return asyncio.run(self.to_gpt_async(model, concurrency, cache, context_window, chars_per_token))
+
+        return GPTResponse.from_records(
+            model,
+            list(self.iter_gpt(model, cache, context_window, chars_per_token=chars_per_token))
+        )
+
+    async def to_gpt_async(
+            self,
+            model: str,
+            concurrency: int = 8,
+            cache: ResponseCache | None = None,
+            context_window: int | None = None,
+            chars_per_token: float | None = None
         ) -> GPTResponse:
+        records: list[ResultRecord] = [
+            record async for record in self.iter_gpt_async(
+                model,
+                concurrency,
+                cache,
+                context_window,
+                chars_per_token=chars_per_token
+            )
+        ]
+        return GPTResponse.from_records(model, records)
+
+    def iter_gpt(
+            self,
+            model: str,
+            cache: ResponseCache | None = None,
+            context_window: int | None = None,
+            skip: set[str] | None = None,
+            chars_per_token: float | None = None
+        ) -> Iterator[ResultRecord]:
         client: OpenAI = OpenAI()
+        max_context: int | None = context_window or RESTSpecification._GPT_CONTEXT.get(model)
+        count_tokens: Callable[[str], int] = approximate_counter(chars_per_token or RESTSpecification._CHARS_PER_TOKEN)
+
+        def complete(history: list[dict[str, str]]) -> tuple[list[dict[str, str]], dict]:
+            key: str = self._gpt_cache_key(model, history)
+
+            completion: dict | None = RESTSpecification._get_cached_gpt(cache, key)
+            if completion is None:
+                completion = RESTSpecification._gpt_completion_as_dict(
+                    client.chat.completions.create(
+                        model=model,
+                        messages=history,
+                        temperature=RESTSpecification._TEMPERATURE,
+                        seed=RESTSpecification._GPT_SEED
+                    )
+                )
 
-        input_tokens: int = 0
-        output_tokens: int = 0
+                if cache:
+                    cache.put(key, completion)
 
-        res: dict[str, list[str]] = {}
-        err: dict[str, list[str]] = {}
+            return history, completion
 
-        system_fingerprint: str | None = None
-        if model == "gpt-3.5-turbo-0125":
-            system_fingerprint = "fp_3b956da36b"
-        elif model == "gpt-4-turbo-2024-04-09":
-            system_fingerprint = "fp_ea6eb70039"
+        for pack in self._packs(skip):
+            start: float = time.perf_counter()
+            reqs: list[dict[str, str]] = [req for _, req in pack]
 
-        fp_data: tuple[str, str | None]
-        if system_fingerprint is None:
-            fp_data = ("No system fingerprint", None)
-        else:
-            fp_data = (system_fingerprint, None)
+            # Prompt packs of several requirements together
+            packed_windows: list[tuple[list[dict[str, str]], dict]] = [
+                complete(history) for history in self._gpt_packed_histories(reqs, count_tokens, max_context)
+            ] if len(pack) > 1 else []
+            packed_links: dict[str, tuple[list[str], list[str]]] = self._parse_packed_windows(packed_windows, reqs)
 
-        # All message histories across all requirements
-        # Mapped from requirement ID to the associated message history
-        all_history: dict[str, list[dict[str, str]]] = {}
+            # Prompt the remaining requirements, and those missing from the packed responses, individually
+            req_windows: dict[int, list[tuple[list[dict[str, str]], dict]]] = {
+                index: [complete(history) for history in self._gpt_histories(req, count_tokens, max_context)]
+                for index, req in pack
+                if req["ID"] not in packed_links and not self._is_skipped(index, skip)
+            }
+
+            yield from self._pack_records(
+                pack,
+                packed_windows,
+                packed_links,
+                req_windows,
+                time.perf_counter() - start,
+                cache,
+                True,
+                skip
+            )
+
+    async def iter_gpt_async(
+            self,
+            model: str,
+            concurrency: int = 8,
+            cache: ResponseCache | None = None,
+            context_window: int | None = None,
+            skip: set[str] | None = None,
+            chars_per_token: float | None = None
+        ) -> AsyncIterator[ResultRecord]:
+        if concurrency < 1:
+            raise ValueError(f"Concurrency must be at least 1, got {concurrency}.")
+
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+        max_context: int | None = context_window or RESTSpecification._GPT_CONTEXT.get(model)
+        count_tokens: Callable[[str], int] = approximate_counter(chars_per_token or RESTSpecification._CHARS_PER_TOKEN)
+
+        async with AsyncOpenAI() as client:
+            async def complete(history: list[dict[str, str]]) -> tuple[list[dict[str, str]], dict]:
+                key: str = self._gpt_cache_key(model, history)
+
+                completion: dict | None = RESTSpecification._get_cached_gpt(cache, key)
+                if completion is None:
+                    # Bound the number of in-flight requests
+                    async with semaphore:
+                        completion = RESTSpecification._gpt_completion_as_dict(
+                            await client.chat.completions.create(
+                                model=model,
+                                messages=history,
+                                temperature=RESTSpecification._TEMPERATURE,
+                                seed=RESTSpecification._GPT_SEED
+                            )
+                        )
+
+                    if cache:
+                        cache.put(key, completion)
+
+                return history, completion
+
+            async def complete_pack(pack: list[tuple[int, dict[str, str]]]) -> list[ResultRecord]:
+                start: float = time.perf_counter()
+                reqs: list[dict[str, str]] = [req for _, req in pack]
+
+                # Prompt packs of several requirements together
+                packed_windows: list[tuple[list[dict[str, str]], dict]] = list(await asyncio.gather(
+                    *(complete(history) for history in self._gpt_packed_histories(reqs, count_tokens, max_context))
+                )) if len(pack) > 1 else []
+                packed_links: dict[str, tuple[list[str], list[str]]] = self._parse_packed_windows(packed_windows, reqs)
+
+                # Prompt the remaining requirements, and those missing from the packed responses, individually
+                individual: list[tuple[int, dict[str, str]]] = [
+                    (index, req)
+                    for index, req in pack
+                    if req["ID"] not in packed_links and not self._is_skipped(index, skip)
+                ]
+                req_windows: dict[int, list[tuple[list[dict[str, str]], dict]]] = dict(zip(
+                    [index for index, _ in individual],
+                    await asyncio.gather(*(
+                        asyncio.gather(*(complete(history) for history in self._gpt_histories(req, count_tokens, max_context)))
+                        for _, req in individual
+                    ))
+                ))
+
+                return self._pack_records(
+                    pack,
+                    packed_windows,
+                    packed_links,
+                    req_windows,
+                    time.perf_counter() - start,
+                    cache,
+                    True,
+                    skip
+                )
+
+            tasks: list[asyncio.Task] = [
+                asyncio.create_task(complete_pack(pack))
+                for pack in self._packs(skip)
+            ]
+
+            try:
+                # Yield the records in order of completion
+                for next_records in asyncio.as_completed(tasks):
+                    for record in await next_records:
+                        yield record
+            finally:
+                # Stop the remaining requests if the consumer stops early
+                for task in tasks:
+                    task.cancel()
+
+    def estimate_gpt(
+            self,
+            model: str,
+            context_window: int | None = None,
+            chars_per_token: float | None = None
+        ) -> TokenEstimate:
+        max_context: int | None = context_window or RESTSpecification._GPT_CONTEXT.get(model)
+
+        return self._estimate(
+            approximate_counter(chars_per_token or RESTSpecification._CHARS_PER_TOKEN),
+            max_context,
+            RESTSpecification._GPT_MAX_OUTPUT_TOKENS
+        )
+
+    def estimate_local(
+            self,
+            model_name_or_path: str | PathLike,
+            max_new_tokens: int,
+            context_window: int | None = None
+        ) -> TokenEstimate:
+        from .model import Model
+
+        return self._estimate(
+            tokenizer_counter(model_name_or_path),
+            context_window or Model.get_max_context(model_name_or_path),
+            max_new_tokens
+        )
+
+    def _estimate(
+            self,
+            count_tokens: Callable[[str], int],
+            max_context: int | None,
+            max_new_tokens: int
+        ) -> TokenEstimate:
+        """
+        Renders the prompts of every requirement, split into the same packs and windows as when prompting, and counts their tokens
+        segment by segment, so the static segments and the tests are only counted once with a memoized counter.
+        Packed responses are assumed to parse, so no individual fallback prompts are counted.
+        Tests that don't fit in the context get a window of their own instead of failing, so their prompts show up as over the context.
 
-        for req in self._reqs:
-            history = [
+        Parameters:
+        -----------
+        count_tokens: Callable[[str], int] - A function counting the tokens of a text.\n
+        max_context: int | None - The context length of the model, if known.\n
+        max_new_tokens: int - The number of tokens reserved for the response.
+
+        Returns:
+        --------
+        `TokenEstimate` - The number of input tokens of each prompt of each requirement.
+        Packed prompts are counted on the first requirement of the pack.
+        """
+        input_tokens: dict[str, list[int]] = {}
+
+        for pack in self._packs(None):
+            reqs: list[dict[str, str]] = [req for _, req in pack]
+
+            for i, (index, req) in enumerate(pack):
+                # Count each segment of the prompts, so only the requirements are counted more than once
+                counts: list[int]
+                if len(pack) == 1:
+                    counts = [
+                        req_is_tested_template(self._prompt).count_tokens(count_tokens, req=req, tests=tests)
+                        for tests in self._windows(req, count_tokens, max_context, max_new_tokens, strict=False)
+                    ]
+                elif i == 0:
+                    counts = [
+                        reqs_are_tested_template(self._packed_prompt).count_tokens(count_tokens, reqs=reqs, tests=tests)
+                        for tests in self._packed_windows(reqs, count_tokens, max_context, max_new_tokens, strict=False)
+                    ]
+                else:
+                    counts = []
+
+                # Count the system prompt and the user prompt, excluding the chat template
+                input_tokens[self._reqs_index[index]] = [
+                    count_tokens(self._system_prompt) + count
+                    for count in counts
+                ]
+
+        return TokenEstimate(input_tokens, max_context, max_new_tokens)
+
+    def _windows(
+            self,
+            req: dict[str, str],
+            count_tokens: Callable[[str], int],
+            max_context: int | None,
+            max_new_tokens: int,
+            strict: bool = True
+        ) -> list[list[dict[str, str]]]:
+        """
+        Splits the tests of a requirement into windows that fit the context of a model along with the rest of the prompt.
+
+        Parameters:
+        -----------
+        req: dict[str, str] - The requirement to prompt for.\n
+        count_tokens: Callable[[str], int] - A function counting the tokens of a text.\n
+        max_context: int | None - The context length of the model. Returns a single window if `None`.\n
+        max_new_tokens: int - The number of tokens to reserve for the response.\n
+        strict: bool - (Optional) Whether to raise an error if a test doesn't fit in the context along with the rest of the prompt,
+        instead of giving it an overflowing window. Defaults to `True`.
+
+        Returns:
+        --------
+        `list[list[dict[str, str]]]` - The tests of each window.
+
+        Raises:
+        -------
+        `ValueError` if `strict` and a test doesn't fit in the context along with the rest of the prompt.
+        """
+        return self._fit_tests(
+            self._req_tests(req),
+            format_req_is_tested_prompt([], req, self._prompt),
+            count_tokens,
+            max_context,
+            max_new_tokens,
+            strict
+        )
+
+    def _packed_windows(
+            self,
+            reqs: list[dict[str, str]],
+            count_tokens: Callable[[str], int],
+            max_context: int | None,
+            max_new_tokens: int,
+            strict: bool = True
+        ) -> list[list[dict[str, str]]]:
+        """
+        Splits the tests of a pack of requirements into windows that fit the context of a model along with the rest of the prompt.
+        The tests of a pack are the candidate tests of any of its requirements.
+
+        Parameters:
+        -----------
+        reqs: list[dict[str, str]] - The requirements to prompt for.\n
+        count_tokens: Callable[[str], int] - A function counting the tokens of a text.\n
+        max_context: int | None - The context length of the model. Returns a single window if `None`.\n
+        max_new_tokens: int - The number of tokens to reserve for the response.\n
+        strict: bool - (Optional) Whether to raise an error if a test doesn't fit in the context along with the rest of the prompt,
+        instead of giving it an overflowing window. Defaults to `True`.
+
+        Returns:
+        --------
+        `list[list[dict[str, str]]]` - The tests of each window.
+
+        Raises:
+        -------
+        `ValueError` if `strict` and a test doesn't fit in the context along with the rest of the prompt.
+        """
+        tests: Sequence[Mapping[str, str]] = self._tests
+        if self._top_k is not None and self._top_k < len(self._tests):
+            candidates: set[str] = {test["ID"] for req in reqs for test in self._req_tests(req)}
+            tests = [test for test in self._tests if test["ID"] in candidates]
+
+        return self._fit_tests(
+            tests,
+            format_reqs_are_tested_prompt([], reqs, self._packed_prompt),
+            count_tokens,
+            max_context,
+            max_new_tokens,
+            strict
+        )
+
+    def _fit_tests(
+            self,
+            tests: Sequence[dict[str, str]],
+            prompt: str,
+            count_tokens: Callable[[str], int],
+            max_context: int | None,
+            max_new_tokens: int,
+            strict: bool = True
+        ) -> list[list[dict[str, str]]]:
+        """
+        Splits tests into windows that fit the context of a model along with the system prompt, a prompt, and the response.
+
+        Parameters:
+        -----------
+        tests: Sequence[dict[str, str]] - The tests to split.\n
+        prompt: str - The prompt formatted without any tests.\n
+        count_tokens: Callable[[str], int] - A function counting the tokens of a text.\n
+        max_context: int | None - The context length of the model. Returns a single window if `None`.\n
+        max_new_tokens: int - The number of tokens to reserve for the response.\n
+        strict: bool - (Optional) Whether to raise an error if a test doesn't fit in the context along with the rest of the prompt,
+        instead of giving it an overflowing window. Defaults to `True`.
+
+        Returns:
+        --------
+        `list[list[dict[str, str]]]` - The tests of each window.
+
+        Raises:
+        -------
+        `ValueError` if `strict` and a test doesn't fit in the context along with the rest of the prompt.
+        """
+        if max_context is None:
+            return [list(tests)]
+
+        # Tokens used by everything but the tests
+        reserved: int = count_tokens(self._system_prompt) \
+            + count_tokens(prompt) \
+            + max_new_tokens \
+            + RESTSpecification._TEMPLATE_MARGIN
+
+        try:
+            return window_tests(tests, max_context - reserved, count_tokens, strict)
+        except ValueError as e:
+            raise ValueError(
+                f"{e} The system prompt, the prompt, and the response take {reserved} of the {max_context} tokens of the context."
+            ) from e
+
+    def _packed_prompts(
+            self,
+            reqs: list[dict[str, str]],
+            count_tokens: Callable[[str], int],
+            max_context: int | None,
+            max_new_tokens: int
+        ) -> list[str]:
+        """
+        Formats the prompts for a pack of requirements, one for each window of tests.
+
+        Parameters:
+        -----------
+        reqs: list[dict[str, str]] - The requirements to prompt for.\n
+        count_tokens: Callable[[str], int] - A function counting the tokens of a text.\n
+        max_context: int | None - The context length of the model. Uses a single window if `None`.\n
+        max_new_tokens: int - The number of tokens to reserve for the response.
+
+        Returns:
+        --------
+        `list[str]` - The prompt for each window.
+        """
+        return [
+            format_reqs_are_tested_prompt(tests, reqs, self._packed_prompt)
+            for tests in self._packed_windows(reqs, count_tokens, max_context, max_new_tokens)
+        ]
+
+    def _gpt_histories(
+            self,
+            req: dict[str, str],
+            count_tokens: Callable[[str], int],
+            max_context: int | None
+        ) -> list[list[dict[str, str]]]:
+        """
+        Creates the message histories sent to a GPT model for a requirement, one for each window of tests.
+
+        Parameters:
+        -----------
+        req: dict[str, str] - The requirement to prompt for.\n
+        count_tokens: Callable[[str], int] - A function approximating the tokens of a text.\n
+        max_context: int | None - The context length of the model. Uses a single window if `None`.
+
+        Returns:
+        --------
+        `list[list[dict[str, str]]]` - The system and user messages for each window.
+        """
+        return [
+            [
                 {"role": "system", "content": self._system_prompt},
-                {"role": "user", "content": format_req_is_tested_prompt(self._tests, req, self._prompt)}
+                {"role": "user", "content": format_req_is_tested_prompt(tests, req, self._prompt)}
             ]
+            for tests in self._windows(
+                req,
+                count_tokens,
+                max_context,
+                RESTSpecification._GPT_MAX_OUTPUT_TOKENS
+            )
+        ]
 
-            completion: ChatCompletion = client.chat.completions.create(
-                model=model,
-                messages=history,
-                temperature=0.1,
-                seed=RESTSpecification._GPT_SEED
+    def _gpt_packed_histories(
+            self,
+            reqs: list[dict[str, str]],
+            count_tokens: Callable[[str], int],
+            max_context: int | None
+        ) -> list[list[dict[str, str]]]:
+        """
+        Creates the message histories sent to a GPT model for a pack of requirements, one for each window of tests.
+
+        Parameters:
+        -----------
+        reqs: list[dict[str, str]] - The requirements to prompt for.\n
+        count_tokens: Callable[[str], int] - A function approximating the tokens of a text.\n
+        max_context: int | None - The context length of the model. Uses a single window if `None`.
+
+        Returns:
+        --------
+        `list[list[dict[str, str]]]` - The system and user messages for each window.
+        """
+        return [
+            [
+                {"role": "system", "content": self._system_prompt},
+                {"role": "user", "content": prompt}
+            ]
+            for prompt in self._packed_prompts(
+                reqs,
+                count_tokens,
+                max_context,
+                RESTSpecification._GPT_MAX_OUTPUT_TOKENS
             )
+        ]
 
-            raw_res: str = completion.choices[0].message.content
-            history.append({"role": "assistant", "content": raw_res})
+    def _gpt_cache_key(self, model: str, history: list[dict[str, str]]) -> str:
+        """
+        Creates the response cache key for a GPT message history.
 
-            #######################################################
-            # Uncomment to print system fingerprint and seed used
-            #######################################################
-            curr_system_fingerprint: str | None = completion.system_fingerprint 
-            #if not_printed:
-            #    print(f'system fingerprint = {system_fingerprint} and seed = {SEED}')
-            #    not_printed = False
+        Parameters:
+        -----------
+        model: str - The GPT model to prompt.\n
+        history: list[dict[str, str]] - The system and user messages for a requirement.
 
-            # Check if the system fingerprint has changed
-            if curr_system_fingerprint != system_fingerprint and fp_data[1] is None:
-                fp_data = (
-                    f"{system_fingerprint or 'null'} -> {curr_system_fingerprint}",
-                    "Fingerprint changed, expect changes."
-                )
+        Returns:
+        --------
+        `str` - The cache key.
+        """
+        return ResponseCache.key(
+            model,
+            history[0]["content"],
+            history[1]["content"],
+            RESTSpecification._GPT_SEED,
+            RESTSpecification._TEMPERATURE,
+            None
+        )
 
-            curr_res: str
-            links: list[str]
+    @staticmethod
+    def _get_cached_gpt(cache: ResponseCache | None, key: str) -> dict | None:
+        """
+        Retrieves a cached GPT completion. Cached completions don't use any tokens.
 
-            # Use the requirement ID instead of its internal index
-            req_id: str = self \
-                ._reqs_index[int(req["ID"].replace(RESTSpecification._REQ_INDEX_PREFIX, ""))]
-            
-            # Add the message history to all histories
-            all_history[req_id] = history.copy()
+        Parameters:
+        -----------
+        cache: ResponseCache | None - The response cache, if any.\n
+        key: str - The cache key.
+
+        Returns:
+        --------
+        `dict | None` - The cached completion with its token usage zeroed if cached, else `None`.
+        """
+        if not cache:
+            return None
+
+        completion: dict | None = cache.get(key)
+        if completion is None:
+            return None
+
+        return completion | {"input_tokens": 0, "output_tokens": 0, "cached": True}
+
+    @staticmethod
+    def _gpt_completion_as_dict(completion: ChatCompletion) -> dict:
+        """
+        Extracts the data used by REST-at from a chat completion.
+
+        Parameters:
+        -----------
+        completion: ChatCompletion - The chat completion.
+
+        Returns:
+        --------
+        `dict` - The response, system fingerprint, and token usage of the completion.
+        """
+        return {
+            "content": completion.choices[0].message.content,
+            "system_fingerprint": completion.system_fingerprint,
+            "input_tokens": completion.usage.prompt_tokens,
+            "output_tokens": completion.usage.completion_tokens
+        }
+
+    def _packs(self, skip: set[str] | None) -> list[list[tuple[int, dict[str, str]]]]:
+        """
+        Splits the requirements into packs of `pack_size` requirements to prompt together.
+        Every requirement is packed before skipping any, so a resumed run prompts the same packs as an uninterrupted one.
+
+        Parameters:
+        -----------
+        skip: set[str] | None - The IDs of the requirements to skip, if any.
 
+        Returns:
+        --------
+        `list[list[tuple[int, dict[str, str]]]]` - The position and the requirement of each requirement of the packs
+        with requirements left to prompt for, in order. The packs still include their skipped requirements.
+        """
+        reqs: list[tuple[int, dict[str, str]]] = list(enumerate(self._reqs))
+        packs: list[list[tuple[int, dict[str, str]]]] = [
+            reqs[i:i + self._pack_size] for i in range(0, len(reqs), self._pack_size)
+        ]
+
+        return [pack for pack in packs if not all(self._is_skipped(index, skip) for index, _ in pack)]
+
+    def _parse_packed_windows(
+            self,
+            windows: list[tuple[list[dict[str, str]] | None, dict]],
+            reqs: list[dict[str, str]]
+        ) -> dict[str, tuple[list[str], list[str]]]:
+        """
+        Parses and merges the responses for each window of tests of a pack of requirements.
+
+        Parameters:
+        -----------
+        windows: list[tuple[list[dict[str, str]] | None, dict]] - The message history, if kept, and completion data of each window.\n
+        reqs: list[dict[str, str]] - The requirements of the pack.
+
+        Returns:
+        --------
+        `dict[str, tuple[list[str], list[str]]]` - The test IDs found for each requirement and the errors
+        for the test IDs dropped from its responses (`[err, res, err, res, ...]`), mapped from its `R-n` ID.
+        Requirements missing or malformed in the response for any window are left out.
+        """
+        if not windows:
+            return {}
+
+        links: dict[str, dict[str, None]] = {req["ID"]: {} for req in reqs}
+        errors: dict[str, list[str]] = {req["ID"]: [] for req in reqs}
+
+        for _, completion in windows:
+            parsed: dict[str, list[str]]
+            dropped: dict[str, list[str]] = {}
             try:
-                # Parse the output of the LLM
-                links = self._parse_intermediary_output(raw_res)
-            except:
-                links = []
-                # Log error in response
-                err[req_id] = [traceback.format_exc(), raw_res]
+                parsed = self._parse_packed_output(completion["content"], list(links), dropped)
+            except Exception:
+                parsed = {}
+
+            for req_id in list(links):
+                if req_id in parsed:
+                    links[req_id] |= dict.fromkeys(parsed[req_id])
+
+                    if req_id in dropped:
+                        errors[req_id] += [RESTSpecification._dropped_message(dropped[req_id]), completion["content"]]
+                else:
+                    del links[req_id]
+
+        return {req_id: (list(tests), errors[req_id]) for req_id, tests in links.items()}
+
+    def _pack_records(
+            self,
+            pack: list[tuple[int, dict[str, str]]],
+            packed_windows: list[tuple[list[dict[str, str]] | None, dict]],
+            packed_links: dict[str, tuple[list[str], list[str]]],
+            req_windows: dict[int, list[tuple[list[dict[str, str]] | None, dict]]],
+            latency: float,
+            cache: ResponseCache | None,
+            gpt: bool,
+            skip: set[str] | None
+        ) -> list[ResultRecord]:
+        """
+        Creates the result records of a pack of requirements, except the skipped ones.
+        The usage of a packed prompt is counted on the first requirement of the pack.
+
+        Parameters:
+        -----------
+        pack: list[tuple[int, dict[str, str]]] - The position and the requirement of each requirement of the pack.\n
+        packed_windows: list[tuple[list[dict[str, str]] | None, dict]] - The message history and completion data
+        of each window of the packed prompt, if the requirements were packed.\n
+        packed_links: dict[str, tuple[list[str], list[str]]] - The test IDs parsed from the packed responses
+        and the errors for dropped test IDs, mapped from `R-n` ID.\n
+        req_windows: dict[int, list[tuple[list[dict[str, str]] | None, dict]]] - The message history and completion data
+        of each window of the individual prompts, mapped from the position of the requirement.\n
+        latency: float - The wall-clock time spent on the pack in seconds.\n
+        cache: ResponseCache | None - The response cache used, if any.\n
+        gpt: bool - Whether to keep the message histories and system fingerprints of the completions.\n
+        skip: set[str] | None - The IDs of the requirements to skip, if any. Their records were created by an interrupted run.
+
+        Returns:
+        --------
+        `list[ResultRecord]` - The result record of each requirement of the pack not skipped.
+        """
+        # Add the responses to the message histories of the packed prompt once
+        packed_history: list[dict[str, str]] = []
+        if gpt:
+            for history, completion in packed_windows:
+                history.append({"role": "assistant", "content": completion["content"]})
+                packed_history += history
 
-            res[req_id] = links
+        records: list[ResultRecord] = []
 
-            input_tokens += completion.usage.prompt_tokens
-            output_tokens += completion.usage.completion_tokens
+        for i, (index, req) in enumerate(pack):
+            if self._is_skipped(index, skip):
+                continue
 
-        return GPTResponse(res, err, all_history, (input_tokens, output_tokens), fp_data)
+            curr_windows: list[tuple[list[dict[str, str]] | None, dict]] = req_windows.get(index, [])
+
+            links: list[str]
+            errors: list[str] = []
+            if index in req_windows:
+                links, errors = self._parse_windows([completion["content"] for _, completion in curr_windows])
+            else:
+                links, errors = packed_links[req["ID"]]
+
+            # The windows whose usage is counted on this requirement
+            usage: list[tuple[list[dict[str, str]] | None, dict]] = (packed_windows if i == 0 else []) + curr_windows
+            hits: int = sum(1 for _, completion in usage if completion.get("cached"))
+
+            # The message histories of the packed prompt and the individual prompts
+            history: list[dict[str, str]] | None = None
+            system_fingerprints: list[str | None] | None = None
+            if gpt:
+                history = list(packed_history)
+                for curr_history, completion in curr_windows:
+                    curr_history.append({"role": "assistant", "content": completion["content"]})
+                    history += curr_history
+
+                system_fingerprints = [completion["system_fingerprint"] for _, completion in usage]
+
+            records.append(ResultRecord(
+                index,
+                # Use the requirement ID instead of its internal index
+                self._reqs_index[index],
+                links,
+                errors or None,
+                (
+                    sum(completion["input_tokens"] for _, completion in usage),
+                    sum(completion["output_tokens"] for _, completion in usage)
+                ),
+                latency,
+                history,
+                system_fingerprints,
+                (hits, len(usage) - hits) if cache else None
+            ))
+
+        return records
+
+    def _parse_windows(self, raw_res: list[str]) -> tuple[list[str], list[str]]:
+        """
+        Parses and merges the responses for each window of tests of a requirement.
+
+        Parameters:
+        -----------
+        raw_res: list[str] - The raw response for each window.
+
+        Returns:
+        --------
+        `tuple[list[str], list[str]]` - The test IDs found in any of the responses without duplicates,
+        and the error and response of each response parsed with low confidence (`[err, res, err, res, ...]`).
+        Unknown or malformed test IDs are dropped and reported the same way.
+        """
+        links: dict[str, None] = {}
+        errors: list[str] = []
+
+        for curr_res in raw_res:
+            dropped: list[str] = []
+
+            # Parse the output of the LLM
+            curr_links: list[str]
+            confident: bool
+            curr_links, confident = self._parse_output(curr_res, dropped)
+            links |= dict.fromkeys(curr_links)
+
+            if not confident:
+                errors += [
+                    f"No JSON answer found, used {len(curr_links) + len(dropped)} bare test IDs",
+                    curr_res
+                ]
+
+            if dropped:
+                errors += [RESTSpecification._dropped_message(dropped), curr_res]
+
+        return list(links), errors
 
     def to_local(
             self,
             model_name_or_path: str | PathLike,
-            max_new_tokens: int
+            max_new_tokens: int,
+            cache: ResponseCache | None = None,
+            prefix_cache: bool = False,
+            batch_size: int = 1,
+            context_window: int | None = None,
+            output_shape: OutputShape | None = None
         ) -> Response:
-        id_: str = f"{id(self)}-{datetime.datetime.now().timestamp()}"
-        session: Session = Session.create(
-            id_,
+        return Response.from_records(list(self.iter_local(
             model_name_or_path,
             max_new_tokens,
-            self._system_prompt
-        )
+            cache,
+            prefix_cache,
+            batch_size,
+            context_window,
+            output_shape=output_shape
+        )))
+
+    def _is_skipped(self, index: int, skip: set[str] | None) -> bool:
+        """
+        Checks whether a requirement is skipped.
 
-        res: dict[str, list[str]] = {}
-        err: dict[str, list[str]] = {}
+        Parameters:
+        -----------
+        index: int - The position of the requirement.\n
+        skip: set[str] | None - The IDs of the requirements to skip, if any.
 
-        for req in self._reqs:
-            raw_res: str = session.prompt(format_req_is_tested_prompt(self._tests, req, self._prompt), True)
+        Returns:
+        --------
+        `bool` - Whether the requirement is skipped.
+        """
+        return bool(skip) and self._reqs_index[index] in skip
 
-            curr_res: str
-            links: list[str]
+    def iter_local(
+            self,
+            model_name_or_path: str | PathLike,
+            max_new_tokens: int,
+            cache: ResponseCache | None = None,
+            prefix_cache: bool = False,
+            batch_size: int = 1,
+            context_window: int | None = None,
+            skip: set[str] | None = None,
+            output_shape: OutputShape | None = None
+        ) -> Iterator[ResultRecord]:
+        if batch_size < 1:
+            raise ValueError(f"Batch size must be at least 1, got {batch_size}.")
+        if prefix_cache and batch_size > 1:
+            raise ValueError("Prefix caching is only supported with a batch size of 1.")
+        # The tests of each requirement differ, so there is no prefix to share
+        if prefix_cache and self._top_k is not None and self._top_k < len(self._tests):
+            raise ValueError("Prefix caching is not supported with top_k, the prompt of each requirement has its own tests.")
+
+        from .model import Model, Session
+
+        # Only load the model once a prompt misses the cache
+        session: Session | None = None
+        # Keys and values of the system prompt and the part of the prompt preceding the requirement of each window, by the IDs of its tests
+        prefixes: dict[tuple[str, ...], KVCache | None] = {}
+
+        # The tokenizer is enough to fit the prompts to the context
+        count_tokens: Callable[[str], int] = tokenizer_counter(model_name_or_path)
+        max_context: int = context_window or Model.get_max_context(model_name_or_path)
+
+        def generate(
+                prompts: list[str],
+                budgets: list[int],
+                grammars: list[OutputGrammar | None] | None = None,
+                windows: list[list[dict[str, str]]] | None = None
+            ) -> list[tuple[None, dict]]:
+            nonlocal session
+
+            if grammars is None:
+                grammars = [None] * len(prompts)
+
+            # Constrained responses differ from free ones
+            keys: list[str] = [
+                ResponseCache.key(
+                    model_name_or_path,
+                    self._system_prompt,
+                    prompt,
+                    None,
+                    Model._TEMPERATURE,
+                    budget,
+                    None if grammar is None else grammar.shape.value
+                )
+                for prompt, budget, grammar in zip(prompts, budgets, grammars)
+            ]
 
-            # Use the requirement ID instead of its internal index
-            req_id: str = self \
-                ._reqs_index[int(req["ID"].replace(RESTSpecification._REQ_INDEX_PREFIX, ""))]
+            # Cached responses don't use any tokens
+            completions: list[dict | None] = [None] * len(prompts)
+            if cache:
+                for i, key in enumerate(keys):
+                    cached: dict | None = cache.get(key)
+                    if cached is not None:
+                        completions[i] = {
+                            "content": cached["content"],
+                            "input_tokens": 0,
+                            "output_tokens": 0,
+                            "cached": True
+                        }
+
+            # Indices of the prompts that missed the cache
+            missing: list[int] = [i for i, completion in enumerate(completions) if completion is None]
+
+            if missing and session is None:
+                id_: str = f"{id(self)}-{datetime.datetime.now().timestamp()}"
+                session = Session.create(
+                    id_,
+                    model_name_or_path,
+                    max_new_tokens,
+                    self._system_prompt
+                )
 
-            try:
-                # Parse the output of the LLM
-                links = self._parse_intermediary_output(raw_res)
-            except:
-                links = []
-                # Log error in response
-                err[req_id] = [traceback.format_exc(), raw_res]
+            # The tests of each window identify the prefix of its prompt
+            window_ids: list[tuple[str, ...] | None] = [None] * len(prompts)
+            if prefix_cache and windows is not None:
+                window_ids = [tuple(test["ID"] for test in tests) for tests in windows]
+
+            # Generate at most batch_size responses per call
+            for chunk_start in range(0, len(missing), batch_size):
+                chunk: list[int] = missing[chunk_start:chunk_start + batch_size]
+
+                # Generation ends once the answer is complete
+                generated: list[str]
+                usage: list[int] = []
+                if len(chunk) == 1:
+                    # Prefill the prefix shared by the prompts with the tests of the window once, packed prompts have none
+                    ids: tuple[str, ...] | None = window_ids[chunk[0]]
+                    if ids is not None and ids not in prefixes:
+                        prompt_prefix: str = format_req_is_tested_prefix(windows[chunk[0]], self._prompt)
+                        prefixes[ids] = session.prefill(prompt_prefix) if prompt_prefix.strip() else None
+
+                    # The prefix only precedes the requirement of individual prompts
+                    generated = [session.prompt(
+                        prompts[chunk[0]],
+                        ephemeral=True,
+                        cache=None if ids is None else prefixes[ids],
+                        grammar=grammars[chunk[0]],
+                        max_new_tokens=budgets[chunk[0]],
+                        stop_on_answer=True,
+                        usage=usage
+                    )]
+                else:
+                    generated = session.prompt_batch(
+                        [prompts[i] for i in chunk],
+                        [grammars[i] for i in chunk],
+                        [budgets[i] for i in chunk],
+                        stop_on_answer=True,
+                        usage=usage
+                    )
+
+                for i, curr_res, output_tokens in zip(chunk, generated, usage):
+                    # Count the tokens of the prompt excluding the chat template, and the tokens generated for the response
+                    completions[i] = {
+                        "content": curr_res,
+                        "input_tokens": count_tokens(self._system_prompt) + count_tokens(prompts[i]),
+                        "output_tokens": output_tokens
+                    }
+
+                    if cache:
+                        cache.put(keys[i], {"content": curr_res})
+
+            return [(None, completion) for completion in completions]
+
+        packs: list[list[tuple[int, dict[str, str]]]] = self._packs(skip)
+
+        # Split the tests the same way for every requirement to share the prefixes, leaving room for the longest requirement
+        shared_windows: list[list[dict[str, str]]] | None = None
+        if prefix_cache:
+            shared_windows = self._fit_tests(
+                self._tests,
+                max((format_req_is_tested_prompt([], req, self._prompt) for req in self._reqs), key=count_tokens, default=""),
+                count_tokens,
+                max_context,
+                max_new_tokens
+            )
+
+        try:
+            for start in range(0, len(packs), batch_size):
+                batch_start: float = time.perf_counter()
+                batch: list[list[tuple[int, dict[str, str]]]] = packs[start:start + batch_size]
+
+                # Prompt packs of several requirements together
+                pack_tests: list[tuple[list[dict[str, str]], list[list[dict[str, str]]]]] = [
+                    (reqs, self._packed_windows(reqs, count_tokens, max_context, max_new_tokens) if len(reqs) > 1 else [])
+                    for reqs in ([req for _, req in pack] for pack in batch)
+                ]
+                packed_prompts: list[list[str]] = [
+                    [format_reqs_are_tested_prompt(tests, reqs, self._packed_prompt) for tests in windows]
+                    for reqs, windows in pack_tests
+                ]
+                packed_windows: list[list[tuple[None, dict]]] = RESTSpecification._regroup(
+                    generate(
+                        [prompt for prompts in packed_prompts for prompt in prompts],
+                        [
+                            self._answer_budget(reqs, tests, count_tokens, max_new_tokens)
+                            for reqs, windows in pack_tests
+                            for tests in windows
+                        ]
+                    ),
+                    packed_prompts
+                )
+                packed_links: list[dict[str, tuple[list[str], list[str]]]] = [
+                    self._parse_packed_windows(windows, [req for _, req in pack])
+                    for pack, windows in zip(batch, packed_windows)
+                ]
+
+                # Prompt the remaining requirements, and those missing from the packed responses, individually
+                req_tests: dict[int, tuple[dict[str, str], list[list[dict[str, str]]]]] = {
+                    index: (req, shared_windows or self._windows(req, count_tokens, max_context, max_new_tokens))
+                    for pack, links in zip(batch, packed_links)
+                    for index, req in pack
+                    if req["ID"] not in links and not self._is_skipped(index, skip)
+                }
+                req_prompts: dict[int, list[str]] = {
+                    index: [format_req_is_tested_prompt(tests, req, self._prompt) for tests in windows]
+                    for index, (req, windows) in req_tests.items()
+                }
+
+                # Restrict the answer for each window to its tests
+                req_grammars: list[OutputGrammar | None] = [
+                    None if output_shape is None else OutputGrammar(output_shape, [test["ID"] for test in tests], req["ID"])
+                    for req, windows in req_tests.values()
+                    for tests in windows
+                ]
+
+                req_windows: dict[int, list[tuple[None, dict]]] = dict(zip(
+                    req_prompts,
+                    RESTSpecification._regroup(
+                        generate(
+                            [prompt for prompts in req_prompts.values() for prompt in prompts],
+                            [
+                                self._answer_budget([req], tests, count_tokens, max_new_tokens)
+                                for req, windows in req_tests.values()
+                                for tests in windows
+                            ],
+                            req_grammars,
+                            [tests for _, windows in req_tests.values() for tests in windows]
+                        ),
+                        list(req_prompts.values())
+                    )
+                ))
+
+                # Requirements of the same batch share its latency
+                latency: float = time.perf_counter() - batch_start
+
+                for pack, windows, links in zip(batch, packed_windows, packed_links):
+                    yield from self._pack_records(pack, windows, links, req_windows, latency, cache, False, skip)
+        finally:
+            if session is not None:
+                session.delete()
+
+    @staticmethod
+    def _answer_budget(
+            reqs: list[dict[str, str]],
+            tests: list[dict[str, str]],
+            count_tokens: Callable[[str], int],
+            max_new_tokens: int
+        ) -> int:
+        """
+        Derives the number of tokens to generate for a prompt from its candidate tests.
+        Allows the tokens of the longest possible answer, listing every test for every requirement, and some slack.
+
+        Parameters:
+        -----------
+        reqs: list[dict[str, str]] - The requirements of the prompt, a single one for individual prompts.\n
+        tests: list[dict[str, str]] - The tests of the prompt.\n
+        count_tokens: Callable[[str], int] - A function counting the tokens of a text.\n
+        max_new_tokens: int - The upper limit of the budget.
+
+        Returns:
+        --------
+        `int` - The number of tokens to generate at most.
+        """
+        test_ids: list[str] = [test["ID"] for test in tests]
+
+        # The list and JSON object formats for individual prompts, and the JSON object format for packed prompts
+        answers: list[str]
+        if len(reqs) == 1:
+            answers = [
+                json.dumps(test_ids),
+                json.dumps({"requirementID": reqs[0]["ID"], "tests": ", ".join(test_ids)})
+            ]
+        else:
+            answers = [json.dumps({req["ID"]: test_ids for req in reqs})]
+
+        return min(max_new_tokens, max(count_tokens(answer) for answer in answers) + RESTSpecification._ANSWER_SLACK)
 
-            res[req_id] = links
+    @staticmethod
+    def _regroup(items: list, groups: list[list]) -> list[list]:
+        """
+        Splits a flat list into consecutive groups with the same sizes as a list of groups.
 
-        session.delete()
-        return Response(res, err)
+        Parameters:
+        -----------
+        items: list - The flat list.\n
+        groups: list[list] - The groups whose sizes to use.
+
+        Returns:
+        --------
+        `list[list]` - The items split into groups.
+        """
+        regrouped: list[list] = []
+
+        pos: int = 0
+        for group in groups:
+            regrouped.append(items[pos:pos + len(group)])
+            pos += len(group)
+
+        return regrouped
 
     def __str__(self) -> str:
         return f"{self.__class__.__name__} {{\n" \
-             + f"reqs: {json.dumps(self._reqs, indent=2)}\n" \
+             + f"reqs: {json.dumps(self._reqs, indent=2, default=dict)}\n" \
              + f"reqs_index: {self._reqs_index}\n" \
-             + f"tests: {json.dumps(self._tests, indent=2)}\n" \
+             + f"tests: {json.dumps(self._tests, indent=2, default=dict)}\n" \
              + f"tests_index: {self._tests_index}\n" \
              + "}"
     
-    def _parse_intermediary_output(self, res: str) -> list[str]:
+    def _parse_output(self, res: str, dropped: list[str] | None = None) -> tuple[list[str], bool]:
+        """
+        Parses the response of a model to a list of test IDs in a single pass, tolerating chatter and code fences.
+        Uses the first JSON object or array in the response in either format accepted by `_parse_intermediary_output`,
+        or a list of such objects. Falls back on the bare test indices in the response if there is none.
+
+        Parameters:
+        -----------
+        res: str - The raw response string from the model.\n
+        dropped: list[str] | None - (Optional) A list to add unknown or malformed test IDs to.
+
+        Returns:
+        --------
+        `tuple[list[str], bool]` - A list with the test IDs found in the response, and whether they were parsed with confidence,
+        i.e. from a JSON answer rather than from bare test indices. Unknown or malformed test IDs are dropped.
+        """
+        for obj in iter_json(res):
+            keys: list | None = RESTSpecification._json_test_keys(obj)
+
+            if keys is not None:
+                return self._map_test_keys(keys, dropped), True
+
+        # Fall back on the test indices mentioned anywhere in the response
+        return self._map_test_keys(find_tokens(res, RESTSpecification._TEST_INDEX_PREFIX), dropped), False
+
+    @staticmethod
+    def _json_test_keys(obj: Any) -> list | None:
+        """
+        Gets the test indices of a parsed JSON answer.
+
+        Parameters:
+        -----------
+        obj: Any - The parsed JSON object or array.
+
+        Returns:
+        --------
+        `list | None` - The test indices of the answer, or `None` if the JSON doesn't have the shape of an answer.
+        """
+        if isinstance(obj, dict):
+            tests: Any = obj.get("tests")
+
+            # Comma separated test indices
+            if isinstance(tests, str):
+                return [test.strip() for test in tests.split(",") if test.strip()]
+
+            return tests if isinstance(tests, list) else None
+
+        if not isinstance(obj, list):
+            return None
+
+        # A list of answer objects
+        if obj and all(isinstance(element, dict) for element in obj):
+            keys: list = []
+            for element in obj:
+                curr_keys: list | None = RESTSpecification._json_test_keys(element)
+                if curr_keys is None:
+                    return None
+
+                keys += curr_keys
+
+            return keys
+
+        return obj
+
+    def _parse_intermediary_output(self, res: str, dropped: list[str] | None = None) -> list[str]:
         """
         Parses the response of a model to a list of test IDs.
         The raw response must include a string representation of either a
@@ -368,22 +1665,23 @@ class RESTSpecification:
 
         Parameters:
         -----------
-        res: str - The raw response string from the model.
+        res: str - The raw response string from the model.\n
+        dropped: list[str] | None - (Optional) A list to add unknown or malformed test IDs to.
 
         Returns:
         --------
-        `list[str]` - A list with the test IDs found in the response.
+        `list[str]` - A list with the test IDs found in the response. Unknown or malformed test IDs are dropped.
 
         Raises:
         -------
         `TypeError` - If the type of the parsed string mismatches the expected type.
         """
         if "{" in res and "}" in res:
-            return self._parse_json_output(res)
-        
-        return self._parse_list_output(res)
+            return self._parse_json_output(res, dropped)
+
+        return self._parse_list_output(res, dropped)
 
-    def _parse_json_output(self, res: str) -> list[str]:
+    def _parse_json_output(self, res: str, dropped: list[str] | None = None) -> list[str]:
         """
         Parses the response of a model to a list of test IDs.
         The raw response must include a string representation of a
@@ -396,11 +1694,12 @@ class RESTSpecification:
 
         Parameters:
         -----------
-        res: str - The raw response string from the model.
+        res: str - The raw response string from the model.\n
+        dropped: list[str] | None - (Optional) A list to add unknown or malformed test IDs to.
 
         Returns:
         --------
-        `list[str]` - A list with the test IDs found in the response.
+        `list[str]` - A list with the test IDs found in the response. Unknown or malformed test IDs are dropped.
 
         Raises:
         -------
@@ -427,15 +1726,132 @@ class RESTSpecification:
             .replace(" ", "") \
             .split(",") \
             if res_obj["tests"] else []
-        
-        links = [
-            self._tests_index[int(test.replace(RESTSpecification._TEST_INDEX_PREFIX, ""))]
-            for test in links
-        ]
+
+        return self._map_test_keys(links, dropped)
+
+    def _parse_packed_output(
+            self,
+            res: str,
+            req_ids: list[str],
+            dropped: dict[str, list[str]] | None = None
+        ) -> dict[str, list[str]]:
+        """
+        Parses the response of a model for a pack of requirements to lists of test IDs.
+        The raw response must include a string representation of a
+        JSON object mapping requirement IDs to lists of test IDs:
+        ```json
+        {
+          "<requirement ID>": ["<test ID>", "<test ID>"],
+          "<requirement ID>": []
+        }
+        ```
+        Comma separated strings of test IDs are also accepted as values.
+
+        Parameters:
+        -----------
+        res: str - The raw response string from the model.\n
+        req_ids: list[str] - The `R-n` IDs of the requirements of the pack.\n
+        dropped: dict[str, list[str]] | None - (Optional) A dict to add the unknown or malformed test IDs of each requirement to.
+
+        Returns:
+        --------
+        `dict[str, list[str]]` - The test IDs found for each requirement, mapped from its `R-n` ID.
+        Requirements missing from the response or with a malformed value are left out.
+        Unknown or malformed test IDs are dropped.
+
+        Raises:
+        -------
+        `TypeError` - If the response has no JSON object with any of the requirements.
+        """
+        # Use the first JSON object with any of the requirements
+        res_obj: dict | None = next(
+            (
+                obj for obj in iter_json(res)
+                if isinstance(obj, dict) and any(req_id in obj for req_id in req_ids)
+            ),
+            None
+        )
+
+        # Assert that the response has a valid object
+        if res_obj is None:
+            raise TypeError("Response has no JSON object with the requirements.")
+
+        links: dict[str, list[str]] = {}
+
+        for req_id in req_ids:
+            tests: list[str] | str | None = res_obj.get(req_id)
+
+            if isinstance(tests, str):
+                tests = [test for test in tests.replace(" ", "").split(",") if test]
+
+            # Leave malformed requirements out
+            if not isinstance(tests, list):
+                continue
+
+            # Substitute the test indices back to the test IDs
+            curr_dropped: list[str] = []
+            links[req_id] = self._map_test_keys(tests, curr_dropped)
+
+            if dropped is not None and curr_dropped:
+                dropped.setdefault(req_id, []).extend(curr_dropped)
 
         return links
 
-    def _parse_list_output(self, res: str) -> list[str]:
+    def _map_test_keys(self, keys: list, dropped: list[str] | None) -> list[str]:
+        """
+        Substitutes the test indices used in prompts back to the test IDs.
+        Indices are matched exactly first, then by their number, so `T-03` and `3` both match `T-3`.
+
+        Parameters:
+        -----------
+        keys: list - The test indices from a response.\n
+        dropped: list[str] | None - A list to add unknown or malformed test indices to, if any.
+
+        Returns:
+        --------
+        `list[str]` - The test IDs of the known test indices, in order.
+        """
+        links: list[str] = []
+
+        for key in keys:
+            id_: str | None = None
+
+            if isinstance(key, str):
+                id_ = self._test_keys.get(key.strip())
+
+                if id_ is None:
+                    try:
+                        pos: int = int(key.strip().replace(RESTSpecification._TEST_INDEX_PREFIX, ""))
+                        if 0 <= pos < len(self._tests_index):
+                            id_ = self._tests_index[pos]
+                    except ValueError:
+                        pass
+
+            if id_ is None:
+                if dropped is not None:
+                    dropped.append(key if isinstance(key, str) else json.dumps(key))
+                continue
+
+            links.append(id_)
+
+        return links
+
+    @staticmethod
+    def _dropped_message(dropped: list[str]) -> str:
+        """
+        Formats the error reported for unknown or malformed test IDs in a response.
+
+        Parameters:
+        -----------
+        dropped: list[str] - The dropped test IDs.
+
+        Returns:
+        --------
+        `str` - The error message.
+        """
+        return f"Dropped {len(dropped)} unknown or malformed test IDs: {', '.join(dropped)}"
+
+    def _parse_list_output(self, res: str, dropped: list[str] | None = None) -> list[str]:
         """
         Parses the response of a model to a list of test IDs.
         The raw response must include a string representation of a
@@ -446,11 +1862,12 @@ class RESTSpecification:
 
         Parameters:
         -----------
-        res: str - The raw response string from the model.
+        res: str - The raw response string from the model.\n
+        dropped: list[str] | None - (Optional) A list to add unknown or malformed test IDs to.
 
         Returns:
         --------
-        `list[str]` - A list with the test IDs found in the response.
+        `list[str]` - A list with the test IDs found in the response. Unknown or malformed test IDs are dropped.
 
         Raises:
         -------
@@ -465,14 +1882,6 @@ class RESTSpecification:
         # Assert that the response is a valid list
         if not isinstance(links, list):
             raise TypeError("Response not a list.")
-        
-        for id_ in links:
-            if not isinstance(id_, str):
-                raise TypeError(f"Element ({id_}) not a string.")
 
-        links = [
-            self._tests_index[int(test.replace(RESTSpecification._TEST_INDEX_PREFIX, ""))]
-            for test in links
-        ]
-
-        return links
+        # Substitute the test indices back to the test IDs
+        return self._map_test_keys(links, dropped)
@@ -16,8 +16,15 @@ MIT (see LICENSE for more information)
 """
 
 from os import PathLike
+from typing import AsyncIterator, Iterable, Iterator, Mapping
 from typing_extensions import Never, override
 
+from .cache import ResponseCache
+from .estimate import TokenEstimate
+from .grammar import OutputShape
+from .results import ResultRecord
+from .tables import TableCache
+
 
 class FieldMismatchError(Exception):
     """
@@ -38,6 +45,10 @@ class Response:
     Properties:
     -----------
     `as_dict: dict` - A dict representation of the response object.
+
+    Methods:
+    --------
+    `static from_records -> Response` - Collects the result records of a run into a response object.
     """
     def __init__(self, *args) -> Never:
         self.links: dict[str, list[str]]
@@ -49,6 +60,21 @@ class Response:
         """
         ...
 
+    @staticmethod
+    def from_records(records: list[ResultRecord]) -> Response:
+        """
+        Collects the result records of a run into a response object.
+
+        Parameters:
+        -----------
+        records: list[ResultRecord] - The result records of each requirement, in any order.
+
+        Returns:
+        --------
+        `Response` - A response object with the requirements in the order of the specification.
+        """
+        ...
+
     @property
     def as_dict(self) -> dict:
         """
@@ -71,6 +97,10 @@ class GPTResponse(Response):
     Properties:
     -----------
     `as_dict: dict` - A dict representation of the response object.
+
+    Methods:
+    --------
+    `static from_records -> GPTResponse` - Collects the result records of a run into a response object.
     """
     def __init__(self, *args) -> Never:
         self.raw_res: list[dict[str, str]]
@@ -83,6 +113,22 @@ class GPTResponse(Response):
         """The system fingerprint of the model"""
         ...
 
+    @staticmethod
+    def from_records(model: str, records: list[ResultRecord]) -> GPTResponse:
+        """
+        Collects the result records of a run into a response object.
+
+        Parameters:
+        -----------
+        model: str - The GPT model that was prompted.\n
+        records: list[ResultRecord] - The result records of each requirement, in any order.
+
+        Returns:
+        --------
+        `GPTResponse` - A response object with the requirements in the order of the specification.
+        """
+        ...
+
     @override
     @property
     def to_dict(self) -> dict:
@@ -99,21 +145,33 @@ class RESTSpecification:
     Properties:
     -----------
     `readonly n: int` - The number of requirement-test pairs in the specification.\n
-    `readonly reqs: list[dict[str, str]]` - A copy of the requirements of the specification.\n
-    `readonly req_ids: set[str]` - A set with all requirement IDs in the specification.\n
-    `readonly tests: list[dict[str, str]]` - A copy of the tests of the specification.\n
-    `readonly test_ids: set[str]` - A set with all test IDs in the specification.\n
+    `readonly reqs: tuple[Mapping[str, str], ...]` - A read-only view of the requirements of the specification.\n
+    `readonly req_ids: frozenset[str]` - A set with all requirement IDs in the specification.\n
+    `readonly tests: tuple[Mapping[str, str], ...]` - A read-only view of the tests of the specification.\n
+    `readonly test_ids: frozenset[str]` - A set with all test IDs in the specification.\n
     `system_prompt: str` - The system prompt to use when prompting a model.\n
-    `prompt: str | None` - The prompt to use when prompting a model. Defaults to a predefined prompt.
+    `prompt: str | None` - The prompt to use when prompting a model. Defaults to a predefined prompt.\n
+    `top_k: int | None` - The number of candidate tests to include in the prompt for each requirement. Defaults to all tests (`None`).\n
+    `pack_size: int` - The number of requirements to prompt together with a single copy of the tests. Defaults to 1.\n
+    `packed_prompt: str | None` - The prompt to use when prompting a model with a pack of requirements. Defaults to a predefined prompt.
 
     Methods:
     --------
     `static load_specs_from_str -> RESTSpecification` - Loads specifications from REST strings. MUST USE CSV FORMAT!\n
     `static load_specs -> RESTSpecification` - Loads specifications from REST files. MUST USE CSV FORMAT!\n
+    `static load_specs_from_files -> RESTSpecification` - Loads specifications from open REST files, one row at a time. MUST USE CSV FORMAT!\n
     `check_req -> bool` - Check if a requirement ID exists within a specification.\n
     `check_test -> bool` - Check if a test ID exists within a specification.\n
+    `candidates -> list[str]` - Gets the IDs of the tests included in the prompt for a requirement.\n
+    `retrieval_recall -> float | None` - Gets the share of the expected trace links kept by the candidate tests.\n
     `to_gpt -> GPTResponse` - Sends REST data to an OpenAI model and returns a response object containing REST mapping, error data, and token usage.\n
-    `to_local -> Response` - Sends REST data to a local model and returns A response object containing REST mapping and error data.
+    `async to_gpt_async -> GPTResponse` - Concurrently sends REST data to an OpenAI model and returns the same response as `to_gpt`.\n
+    `iter_gpt -> Iterator[ResultRecord]` - Sends REST data to an OpenAI model and yields a result record for each requirement as it completes.\n
+    `async iter_gpt_async -> AsyncIterator[ResultRecord]` - Concurrently sends REST data to an OpenAI model and yields a result record for each requirement as it completes.\n
+    `to_local -> Response` - Sends REST data to a local model and returns A response object containing REST mapping and error data.\n
+    `iter_local -> Iterator[ResultRecord]` - Sends REST data to a local model and yields a result record for each requirement as it completes.\n
+    `estimate_gpt -> TokenEstimate` - Counts the approximate input tokens of a run on an OpenAI model without sending anything.\n
+    `estimate_local -> TokenEstimate` - Counts the input tokens of a run on a local model without loading the model.
     """
 
     @staticmethod
@@ -138,15 +196,21 @@ class RESTSpecification:
         ...
 
     @staticmethod
-    def load_specs(reqs_path: str | PathLike, tests_path: str | PathLike) -> RESTSpecification:
+    def load_specs(
+            reqs_path: str | PathLike,
+            tests_path: str | PathLike,
+            cache: TableCache | None = None
+        ) -> RESTSpecification:
         """
         Load REST specifications from `.csv` files.
-        The files must follow specific formats.
+        The files must follow specific formats. The files are read one row at a time, see `load_specs_from_files`.
+        If a cache is passed, the parsed files are stored in it and loaded from it until their content changes.
 
         Parameters:
         -----------
         reqs_path: str | PathLike - The path to the requiremnts file.\n
-        tests_path: str | PathLike - The path to the tests file.
+        tests_path: str | PathLike - The path to the tests file.\n
+        cache: TableCache | None - (Optional) The cache of parsed files. The files are always parsed if not provided.
 
         Returns:
         --------
@@ -158,6 +222,29 @@ class RESTSpecification:
         """
         ...
 
+    @staticmethod
+    def load_specs_from_files(reqs: Iterable[str], tests: Iterable[str]) -> RESTSpecification:
+        """
+        Load REST specifications from open csv files, or any other iterables of lines.
+        The files must follow specific formats.
+        The rows are read one at a time, so the raw data is never held in memory.
+        The dialect of each file, such as semicolon delimiters, is sniffed from its first lines.
+
+        Parameters:
+        -----------
+        reqs: Iterable[str] - The requirements file. Open files with `newline=""` to keep line breaks within quoted fields.\n
+        tests: Iterable[str] - The tests file. Open files with `newline=""` to keep line breaks within quoted fields.
+
+        Returns:
+        --------
+        `RESTSpecification` - A REST specification for the provided files.
+
+        Raises:
+        -------
+        `FieldMismatchError` - If the required fields are missing in the header of a file.
+        """
+        ...
+
     def check_req(self, req: str) -> bool:
         """
         Check if a requirement ID exists within the specification.
@@ -195,30 +282,32 @@ class RESTSpecification:
         ...
     
     @property
-    def reqs(self) -> list[dict[str, str]]:
+    def reqs(self) -> tuple[Mapping[str, str], ...]:
         """
-        A copy of the requirements of the specification.
+        A read-only view of the requirements of the specification, without copying.
+        Loaded requirements are immutable `SpecRecord`s.
         """
         ...
 
     @property
-    def req_ids(self) -> set[str]:
+    def req_ids(self) -> frozenset[str]:
         """
-        A set with all requirement IDs in the specification.
+        A set with all requirement IDs in the specification, built once.
         """
         ...
 
     @property
-    def tests(self) -> list[dict[str, str]]:
+    def tests(self) -> tuple[Mapping[str, str], ...]:
         """
-        A copy the tests of the specification.
+        A read-only view of the tests of the specification, without copying.
+        Loaded tests are immutable `SpecRecord`s.
         """
         ...
 
     @property
-    def test_ids(self) -> set[str]:
+    def test_ids(self) -> frozenset[str]:
         """
-        A set with all test IDs in the specification.
+        A set with all test IDs in the specification, built once.
         """
         ...
 
@@ -244,32 +333,372 @@ class RESTSpecification:
     def prompt(self, new) -> None:
         ...
 
-    def to_gpt(self, model: str) -> GPTResponse:
+    @property
+    def top_k(self) -> int | None:
+        """
+        The number of candidate tests to include in the prompt for each requirement.
+        The candidates are the tests whose purpose and test steps are most relevant to the requirement according to BM25.
+        Defaults to including all tests (`None`).
+        """
+        ...
+
+    @top_k.setter
+    def top_k(self, new: int | None) -> None:
+        """
+        Raises:
+        -------
+        `ValueError` if `new` is less than 1.
+        """
+        ...
+
+    @property
+    def pack_size(self) -> int:
+        """
+        The number of requirements to prompt together with a single copy of the tests.
+        The model is asked for a JSON object mapping each requirement to its test IDs.
+        Requirements missing or malformed in a packed response are prompted again individually.
+        Defaults to prompting every requirement individually (1).
+        """
+        ...
+
+    @pack_size.setter
+    def pack_size(self, new: int) -> None:
+        """
+        Raises:
+        -------
+        `ValueError` if `new` is less than 1.
+        """
+        ...
+
+    @property
+    def packed_prompt(self) -> str | None:
+        """
+        The prompt to use when prompting a model with a pack of requirements.
+        Include `{reqs}` in place of the requirements and `{tests}` in place of the tests.
+        Defaults to a predefined prompt (`None`).
+        """
+        ...
+
+    @packed_prompt.setter
+    def packed_prompt(self, new: str | None) -> None:
+        ...
+
+    def candidates(self, req_id: str) -> list[str]:
+        """
+        Gets the IDs of the tests included in the prompt for a requirement.
+
+        Parameters:
+        -----------
+        req_id: str - The requirement ID.
+
+        Returns:
+        --------
+        `list[str]` - The IDs of the candidate tests in the order of the specification. All tests if `top_k` is `None`.
+
+        Raises:
+        -------
+        `ValueError` if the requirement doesn't exist in the specification.
+        """
+        ...
+
+    def retrieval_recall(self, mapping: dict[str, set[str]]) -> float | None:
+        """
+        Gets the share of the expected trace links whose test is among the candidates of its requirement (recall@k).
+
+        Parameters:
+        -----------
+        mapping: dict[str, set[str]] - The expected trace links mapped from requirement IDs to sets of test IDs.
+
+        Returns:
+        --------
+        `float | None` - The recall of the candidate retrieval, or `None` if no trace links are expected.
+        """
+        ...
+
+    def to_gpt(
+            self,
+            model: str,
+            concurrency: int | None = None,
+            cache: ResponseCache | None = None,
+            context_window: int | None = None,
+            chars_per_token: float | None = None
+        ) -> GPTResponse:
         """
         Sends REST data to a specified GPT model for REST alignment analysis.
 
         Parameters:
         -----------
-        model: str - The GPT model to prompt.
+        model: str - The GPT model to prompt.\n
+        concurrency: int | None - (Optional) The maximum number of concurrent requests.
+        Prompts the requirements concurrently through `to_gpt_async` if set, else one at a time.\n
+        cache: ResponseCache | None - (Optional) A cache to look responses up in before prompting, and to store new responses in.
+        Cached responses don't count towards the token usage.\n
+        context_window: int | None - (Optional) The context length of the model. Defaults to the known context length of `model`.
+        Tests that don't fit in the context along with the prompt are split into windows that are prompted separately,
+        and the test IDs found for each window are merged. Token counts are approximated from the number of characters.
+        Prompts every requirement with all tests at once for unknown models.\n
+        chars_per_token: float | None - (Optional) The average number of characters per token used to approximate the tokens of the prompts
+        when splitting the tests into windows. Defaults to a conservative 3. Use the value given to `estimate_gpt` to prompt the estimated windows.
+
+        Returns:
+        --------
+        `GPTResponse` - A response object containing REST mapping, error data, and token usage.
+
+        Raises:
+        -------
+        `ValueError` if `concurrency` is less than 1, if `chars_per_token` is not positive, or if a test doesn't fit in the context along with the rest of the prompt.
+        """
+        ...
+
+    async def to_gpt_async(
+            self,
+            model: str,
+            concurrency: int = 8,
+            cache: ResponseCache | None = None,
+            context_window: int | None = None,
+            chars_per_token: float | None = None
+        ) -> GPTResponse:
+        """
+        Sends REST data to a specified GPT model for REST alignment analysis using the async OpenAI client.
+        The requirements are prompted concurrently, but the response is identical in layout and order
+        to the one returned by a sequential run.
+
+        Parameters:
+        -----------
+        model: str - The GPT model to prompt.\n
+        concurrency: int - The maximum number of concurrent requests. Defaults to 8.\n
+        cache: ResponseCache | None - (Optional) A cache to look responses up in before prompting, and to store new responses in.
+        Cached responses don't count towards the token usage.\n
+        context_window: int | None - (Optional) The context length of the model. Defaults to the known context length of `model`.
+        Tests that don't fit in the context along with the prompt are split into windows that are prompted separately,
+        and the test IDs found for each window are merged. Token counts are approximated from the number of characters.
+        Prompts every requirement with all tests at once for unknown models.\n
+        chars_per_token: float | None - (Optional) The average number of characters per token used to approximate the tokens of the prompts
+        when splitting the tests into windows. Defaults to a conservative 3. Use the value given to `estimate_gpt` to prompt the estimated windows.
 
         Returns:
         --------
         `GPTResponse` - A response object containing REST mapping, error data, and token usage.
+
+        Raises:
+        -------
+        `ValueError` if `concurrency` is less than 1, if `chars_per_token` is not positive, or if a test doesn't fit in the context along with the rest of the prompt.
         """
         ...
 
+    def iter_gpt(
+            self,
+            model: str,
+            cache: ResponseCache | None = None,
+            context_window: int | None = None,
+            skip: set[str] | None = None,
+            chars_per_token: float | None = None
+        ) -> Iterator[ResultRecord]:
+        """
+        Sends REST data to a specified GPT model for REST alignment analysis, one pack of `pack_size` requirements at a time.
+        Yields a result record for each requirement as soon as its pack is done, in the order of the specification.
+
+        Parameters:
+        -----------
+        model: str - The GPT model to prompt.\n
+        cache: ResponseCache | None - (Optional) A cache to look responses up in before prompting, and to store new responses in.
+        Cached responses don't count towards the token usage.\n
+        context_window: int | None - (Optional) The context length of the model. Defaults to the known context length of `model`.
+        Tests that don't fit in the context along with the prompt are split into windows that are prompted separately.\n
+        skip: set[str] | None - (Optional) The IDs of requirements to skip, such as the ones completed by an interrupted run.
+        The requirements are packed as if none were skipped, and packs with requirements left are prompted in full.\n
+        chars_per_token: float | None - (Optional) The average number of characters per token used to approximate the tokens of the prompts
+        when splitting the tests into windows. Defaults to a conservative 3. Use the value given to `estimate_gpt` to prompt the estimated windows.
+
+        Yields:
+        -------
+        `ResultRecord` - The result record of a requirement, including its message history and system fingerprints.
+        The usage of a packed prompt is counted on the first requirement of the pack.
+
+        Raises:
+        -------
+        `ValueError` if `chars_per_token` is not positive, or if a test doesn't fit in the context along with the rest of the prompt.
+        """
+        ...
 
-    def to_local(self, model_name_or_path: str | PathLike, max_new_tokens: int) -> Response:
+    async def iter_gpt_async(
+            self,
+            model: str,
+            concurrency: int = 8,
+            cache: ResponseCache | None = None,
+            context_window: int | None = None,
+            skip: set[str] | None = None,
+            chars_per_token: float | None = None
+        ) -> AsyncIterator[ResultRecord]:
+        """
+        Sends REST data to a specified GPT model for REST alignment analysis using the async OpenAI client.
+        Yields a result record for each requirement as soon as its pack is done, in the order of completion.
+        Requests still in flight are cancelled if the iteration stops early.
+
+        Parameters:
+        -----------
+        model: str - The GPT model to prompt.\n
+        concurrency: int - The maximum number of concurrent requests. Defaults to 8.\n
+        cache: ResponseCache | None - (Optional) A cache to look responses up in before prompting, and to store new responses in.
+        Cached responses don't count towards the token usage.\n
+        context_window: int | None - (Optional) The context length of the model. Defaults to the known context length of `model`.
+        Tests that don't fit in the context along with the prompt are split into windows that are prompted separately.\n
+        skip: set[str] | None - (Optional) The IDs of requirements to skip, such as the ones completed by an interrupted run.
+        The requirements are packed as if none were skipped, and packs with requirements left are prompted in full.\n
+        chars_per_token: float | None - (Optional) The average number of characters per token used to approximate the tokens of the prompts
+        when splitting the tests into windows. Defaults to a conservative 3. Use the value given to `estimate_gpt` to prompt the estimated windows.
+
+        Yields:
+        -------
+        `ResultRecord` - The result record of a requirement, including its message history and system fingerprints.
+        The usage of a packed prompt is counted on the first requirement of the pack.
+
+        Raises:
+        -------
+        `ValueError` if `concurrency` is less than 1, if `chars_per_token` is not positive, or if a test doesn't fit in the context along with the rest of the prompt.
+        """
+        ...
+
+    def to_local(
+            self,
+            model_name_or_path: str | PathLike,
+            max_new_tokens: int,
+            cache: ResponseCache | None = None,
+            prefix_cache: bool = False,
+            batch_size: int = 1,
+            context_window: int | None = None,
+            output_shape: OutputShape | None = None
+        ) -> Response:
         """
         Sends REST data to a specified local model for REST alignment analysis.
+        The model is only loaded if a prompt misses the cache.
 
         Parameters:
         -----------
         model_name_or_path: str | PathLike - The model to prompt.\n
-        max_new_tokens: int - The `max_new_tokens` parameter used when generating.
+        max_new_tokens: int - The upper limit of the number of tokens to generate for a prompt. The limit of each prompt is derived from its tests,
+        allowing the longest possible answer and some slack. Generation ends once the response contains a complete JSON answer.\n
+        cache: ResponseCache | None - (Optional) A cache to look responses up in before prompting, and to store new responses in.\n
+        prefix_cache: bool - (Optional) Whether to prefill the system prompt and the part of the prompt preceding `{req}` once
+        and reuse its keys and values for every requirement. Place `{tests}` before `{req}` in the prompt to share the tests.
+        Defaults to prefilling every prompt in full (`False`). Packed prompts are always prefilled in full.
+        Not supported with `top_k`, which gives every requirement its own tests. Tests that don't fit in the context are split into the same windows
+        for every requirement, leaving room for the longest requirement, and the prefix of each window is prefilled once.\n
+        batch_size: int - (Optional) The number of prompts to generate responses for in a single call.
+        Packs of requirements are prompted one batch of packs at a time. Defaults to 1.\n
+        context_window: int | None - (Optional) The context length of the model. Defaults to the context length in the model configuration.
+        Tests that don't fit in the context along with the system prompt, the requirement, and `max_new_tokens` are split
+        into windows that are prompted separately, and the test IDs found for each window are merged.
+        Tokens are counted with the tokenizer of the model.\n
+        output_shape: OutputShape | None - (Optional) The shape to restrict the answer for each window of tests to, either a list of test IDs
+        or a JSON object, using only the IDs of the tests in the window. Match the shape to the prompt. Packed prompts are never restricted.
+        Defaults to generating freely.
 
         Returns:
         --------
         `Response` - A response object containing REST mapping and error data.
+
+        Raises:
+        -------
+        `ValueError` if `batch_size` is less than 1, if `prefix_cache` is used with a `batch_size` above 1 or with `top_k`, or if a test doesn't fit in the context along with the rest of the prompt.
+        """
+        ...
+
+    def iter_local(
+            self,
+            model_name_or_path: str | PathLike,
+            max_new_tokens: int,
+            cache: ResponseCache | None = None,
+            prefix_cache: bool = False,
+            batch_size: int = 1,
+            context_window: int | None = None,
+            skip: set[str] | None = None,
+            output_shape: OutputShape | None = None
+        ) -> Iterator[ResultRecord]:
+        """
+        Sends REST data to a specified local model for REST alignment analysis.
+        Yields a result record for each requirement as soon as its batch is done, in the order of the specification.
+        The model is only loaded if a prompt misses the cache.
+
+        Parameters:
+        -----------
+        model_name_or_path: str | PathLike - The model to prompt.\n
+        max_new_tokens: int - The upper limit of the number of tokens to generate for a prompt. The limit of each prompt is derived from its tests,
+        allowing the longest possible answer and some slack. Generation ends once the response contains a complete JSON answer.\n
+        cache: ResponseCache | None - (Optional) A cache to look responses up in before prompting, and to store new responses in.\n
+        prefix_cache: bool - (Optional) Whether to prefill the system prompt and the part of the prompt preceding `{req}` once
+        and reuse its keys and values for every requirement. Place `{tests}` before `{req}` in the prompt to share the tests.
+        Defaults to prefilling every prompt in full (`False`). Packed prompts are always prefilled in full.
+        Not supported with `top_k`, which gives every requirement its own tests. Tests that don't fit in the context are split into the same windows
+        for every requirement, leaving room for the longest requirement, and the prefix of each window is prefilled once.\n
+        batch_size: int - (Optional) The number of prompts to generate responses for in a single call.
+        Packs of requirements are prompted one batch of packs at a time. Defaults to 1.\n
+        context_window: int | None - (Optional) The context length of the model. Defaults to the context length in the model configuration.
+        Tests that don't fit in the context along with the system prompt, the requirement, and `max_new_tokens` are split
+        into windows that are prompted separately, and the test IDs found for each window are merged.
+        Tokens are counted with the tokenizer of the model.\n
+        skip: set[str] | None - (Optional) The IDs of requirements to skip, such as the ones completed by an interrupted run.
+        The requirements are packed as if none were skipped, and packs with requirements left are prompted in full.\n
+        output_shape: OutputShape | None - (Optional) The shape to restrict the answer for each window of tests to, either a list of test IDs
+        or a JSON object, using only the IDs of the tests in the window. Match the shape to the prompt. Packed prompts are never restricted.
+        Defaults to generating freely.
+
+        Yields:
+        -------
+        `ResultRecord` - The result record of a requirement. Input token counts exclude the chat template, output token counts
+        are the number of tokens generated for the responses, and requirements prompted in the same batch share its latency.
+        The usage of a packed prompt is counted on the first requirement of the pack.
+
+        Raises:
+        -------
+        `ValueError` if `batch_size` is less than 1, if `prefix_cache` is used with a `batch_size` above 1 or with `top_k`, or if a test doesn't fit in the context along with the rest of the prompt.
+        """
+        ...
+
+    def estimate_gpt(
+            self,
+            model: str,
+            context_window: int | None = None,
+            chars_per_token: float | None = None
+        ) -> TokenEstimate:
+        """
+        Renders every prompt of a run on a specified GPT model and approximates its input tokens.
+        The prompts are split into the same windows of tests as in `to_gpt` given the same `chars_per_token`. Nothing is sent to the model.
+
+        Parameters:
+        -----------
+        model: str - The GPT model to plan for.\n
+        context_window: int | None - (Optional) The context length of the model. Defaults to the known context length of `model`.\n
+        chars_per_token: float | None - (Optional) The average number of characters per token. Defaults to a conservative 3.
+
+        Returns:
+        --------
+        `TokenEstimate` - The approximate input tokens of each prompt of each requirement.
+
+        Raises:
+        -------
+        `ValueError` if `chars_per_token` is not positive.
+        """
+        ...
+
+    def estimate_local(
+            self,
+            model_name_or_path: str | PathLike,
+            max_new_tokens: int,
+            context_window: int | None = None
+        ) -> TokenEstimate:
+        """
+        Renders every prompt of a run on a specified local model and counts its input tokens with the tokenizer of the model.
+        The prompts are split into the same windows of tests as in `to_local`. The model itself is not loaded.
+
+        Parameters:
+        -----------
+        model_name_or_path: str | PathLike - The model to plan for.\n
+        max_new_tokens: int - The `max_new_tokens` parameter used when generating.\n
+        context_window: int | None - (Optional) The context length of the model. Defaults to the context length in the model configuration.
+
+        Returns:
+        --------
+        `TokenEstimate` - The input tokens of each prompt of each requirement.
         """
         ...
@@ -0,0 +1,131 @@
+"""
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from __future__ import annotations
+import json
+import os
+from os import PathLike
+from typing import TextIO
+
+
+class ResultRecord:
+    def __init__(
+            self,
+            index: int,
+            req_id: str,
+            links: list[str],
+            err: list[str] | None,
+            tokens: tuple[int, int],
+            latency: float,
+            history: list[dict[str, str]] | None = None,
+            system_fingerprints: list[str | None] | None = None,
+            cache_usage: tuple[int, int] | None = None
+        ) -> None:
+        self.index: int = index
+        self.req_id: str = req_id
+        self.links: list[str] = links
+        self.err: list[str] | None = err
+        self.input_tokens: int = tokens[0]
+        self.output_tokens: int = tokens[1]
+        self.latency: float = latency
+        self.history: list[dict[str, str]] | None = history
+        self.system_fingerprints: list[str | None] | None = system_fingerprints
+        self.cache_usage: tuple[int, int] | None = cache_usage
+
+    @staticmethod
+    def from_dict(data: dict) -> ResultRecord:
+        return ResultRecord(
+            data["index"],
+            data["req_id"],
+            data["links"],
+            data["err"],
+            (data["input_tokens"], data["output_tokens"]),
+            data["latency"],
+            data.get("history"),
+            data.get("system_fingerprints"),
+            tuple(data["cache_usage"]) if data.get("cache_usage") is not None else None
+        )
+
+    @property
+    def as_dict(self) -> dict:
+        data: dict = {
+            "index": self.index,
+            "req_id": self.req_id,
+            "links": self.links,
+            "err": self.err,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "latency": self.latency
+        }
+
+        # Only GPT runs keep the message history and fingerprints
+        if self.history is not None:
+            data["history"] = self.history
+        if self.system_fingerprints is not None:
+            data["system_fingerprints"] = self.system_fingerprints
+        if self.cache_usage is not None:
+            data["cache_usage"] = list(self.cache_usage)
+
+        return data
+
+
+class RecordWriter:
+    def __init__(self, path: str | PathLike) -> None:
+        self._path: str | PathLike = path
+
+        # Drop a record left half-written by an interrupted run
+        if os.path.exists(path):
+            with open(path, "rb+") as f:
+                data: bytes = f.read()
+                if data and not data.endswith(b"\n"):
+                    f.truncate(data.rfind(b"\n") + 1)
+
+        self._file: TextIO = open(path, "a")
+
+    def write(self, record: ResultRecord) -> None:
+        # One record per line, synced to disk so that completed requirements survive a crash
+        self._file.write(json.dumps(record.as_dict) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+    @property
+    def path(self) -> str | PathLike:
+        return self._path
+
+    def __enter__(self) -> RecordWriter:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def load_records(path: str | PathLike) -> list[ResultRecord]:
+    records: list[ResultRecord] = []
+
+    with open(path) as f:
+        for line in f:
+            # Skip a record left half-written by an interrupted run
+            if not line.endswith("\n"):
+                break
+
+            if line.strip():
+                records.append(ResultRecord.from_dict(json.loads(line)))
+
+    return records
+
+
+def cache_usage(records: list[ResultRecord]) -> tuple[int, int] | None:
+    usages: list[tuple[int, int]] = [record.cache_usage for record in records if record.cache_usage is not None]
+    if not usages:
+        return None
+
+    return sum(hits for hits, _ in usages), sum(misses for _, misses in usages)
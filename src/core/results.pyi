@@ -0,0 +1,176 @@
+"""
+Core module for streaming per-requirement results.
+
+Includes:
+---------
+`ResultRecord` - A class representing the result of prompting for a single requirement.\n
+`RecordWriter` - A class appending result records to a JSONL file.\n
+`load_records -> list[ResultRecord]` - A function that loads the result records of a JSONL file.\n
+`cache_usage -> tuple[int, int] | None` - A function that sums the response cache usage of result records.
+
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from os import PathLike
+
+
+class ResultRecord:
+    """
+    The result of prompting for a single requirement, yielded as soon as the requirement is done.
+
+    Properties:
+    -----------
+    `index: int` - The position of the requirement in the REST specification.\n
+    `req_id: str` - The ID of the requirement.\n
+    `links: list[str]` - The IDs of the tests linked to the requirement.\n
+    `err: list[str] | None` - The traceback and response of each response that failed to parse (`[err, res, err, res, ...]`), if any.\n
+    `input_tokens: int` - The number of input tokens used. Cached responses use no tokens.\n
+    `output_tokens: int` - The number of output tokens used. Cached responses use no tokens.\n
+    `latency: float` - The wall-clock time spent on the requirement in seconds.\n
+    `history: list[dict[str, str]] | None` - The message history of each window of tests, if kept.\n
+    `system_fingerprints: list[str | None] | None` - The system fingerprint of each completion, if any.\n
+    `cache_usage: tuple[int, int] | None` - The number of responses found and not found in the response cache, if one was used.\n
+    `readonly as_dict: dict` - A JSON serializable dict representation of the record.
+
+    Methods:
+    --------
+    `static from_dict -> ResultRecord` - Creates a record from its dict representation.
+    """
+
+    def __init__(
+            self,
+            index: int,
+            req_id: str,
+            links: list[str],
+            err: list[str] | None,
+            tokens: tuple[int, int],
+            latency: float,
+            history: list[dict[str, str]] | None = None,
+            system_fingerprints: list[str | None] | None = None,
+            cache_usage: tuple[int, int] | None = None
+        ) -> None:
+        """
+        Creates a result record.
+
+        Parameters:
+        -----------
+        index: int - The position of the requirement in the REST specification.\n
+        req_id: str - The ID of the requirement.\n
+        links: list[str] - The IDs of the tests linked to the requirement.\n
+        err: list[str] | None - The traceback and response of each response that failed to parse, if any.\n
+        tokens: tuple[int, int] - The number of input and output tokens used.\n
+        latency: float - The wall-clock time spent on the requirement in seconds.\n
+        history: list[dict[str, str]] | None - (Optional) The message history of each window of tests.\n
+        system_fingerprints: list[str | None] | None - (Optional) The system fingerprint of each completion.\n
+        cache_usage: tuple[int, int] | None - (Optional) The number of responses found and not found in the response cache.
+        """
+        ...
+
+    @staticmethod
+    def from_dict(data: dict) -> ResultRecord:
+        """
+        Creates a record from its dict representation.
+
+        Parameters:
+        -----------
+        data: dict - The dict representation of a record, as given by `as_dict`.
+
+        Returns:
+        --------
+        `ResultRecord` - The record.
+        """
+        ...
+
+    @property
+    def as_dict(self) -> dict:
+        """
+        A JSON serializable dict representation of the record.
+        """
+        ...
+
+
+class RecordWriter:
+    """
+    Appends result records to a JSONL file, one record per line.
+    Each record is synced to disk as it is written, so the file can be followed while a run is in progress
+    and serves as a checkpoint if the run is interrupted.
+
+    Properties:
+    -----------
+    `readonly path: str | PathLike` - The path to the JSONL file.
+
+    Methods:
+    --------
+    `write -> None` - Appends a record to the file.\n
+    `close -> None` - Closes the file.
+    """
+
+    def __init__(self, path: str | PathLike) -> None:
+        """
+        Opens a JSONL file for appending, creating it if needed.
+        A record left half-written by an interrupted run is removed.
+
+        Parameters:
+        -----------
+        path: str | PathLike - The path to the JSONL file.
+        """
+        ...
+
+    def write(self, record: ResultRecord) -> None:
+        """
+        Appends a record to the file.
+
+        Parameters:
+        -----------
+        record: ResultRecord - The record to append.
+        """
+        ...
+
+    def close(self) -> None:
+        """
+        Closes the file.
+        """
+        ...
+
+    @property
+    def path(self) -> str | PathLike:
+        """
+        The path to the JSONL file.
+        """
+        ...
+
+
+def load_records(path: str | PathLike) -> list[ResultRecord]:
+    """
+    Loads the result records of a JSONL file.
+    A record left half-written by an interrupted run is ignored.
+
+    Parameters:
+    -----------
+    path: str | PathLike - The path to the JSONL file.
+
+    Returns:
+    --------
+    `list[ResultRecord]` - The records in the order they were written.
+    """
+    ...
+
+
+def cache_usage(records: list[ResultRecord]) -> tuple[int, int] | None:
+    """
+    Sums the response cache usage of result records.
+
+    Parameters:
+    -----------
+    records: list[ResultRecord] - The result records.
+
+    Returns:
+    --------
+    `tuple[int, int] | None` - The total number of cache hits and misses, or `None` if no record used a cache.
+    """
+    ...
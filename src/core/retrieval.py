@@ -0,0 +1,74 @@
+"""
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from __future__ import annotations
+import math
+import re
+
+
+_TOKEN_PATTERN: re.Pattern = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    def __init__(self, documents: list[str], k1: float = 1.5, b: float = 0.75) -> None:
+        self._k1: float = k1
+        self._b: float = b
+        self._size: int = len(documents)
+
+        # Term -> list of (document index, term frequency)
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._doc_lens: list[int] = []
+
+        for i, document in enumerate(documents):
+            terms: list[str] = tokenize(document)
+            self._doc_lens.append(len(terms))
+
+            frequencies: dict[str, int] = {}
+            for term in terms:
+                frequencies[term] = frequencies.get(term, 0) + 1
+
+            for term, frequency in frequencies.items():
+                self._postings.setdefault(term, []).append((i, frequency))
+
+        self._avg_doc_len: float = sum(self._doc_lens) / self._size if self._size else 0.0
+
+        # Inverse document frequency of each term, smoothed to stay positive
+        self._idf: dict[str, float] = {
+            term: math.log(1 + (self._size - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return self._size
+
+    def scores(self, query: str) -> list[float]:
+        scores: list[float] = [0.0] * self._size
+
+        # Only score the documents containing a query term
+        for term in set(tokenize(query)):
+            postings: list[tuple[int, int]] | None = self._postings.get(term)
+            if not postings:
+                continue
+
+            idf: float = self._idf[term]
+            for i, frequency in postings:
+                norm: float = self._k1 * (1 - self._b + self._b * self._doc_lens[i] / self._avg_doc_len)
+                scores[i] += idf * frequency * (self._k1 + 1) / (frequency + norm)
+
+        return scores
+
+    def top_k(self, query: str, k: int) -> list[int]:
+        scores: list[float] = self.scores(query)
+
+        # Highest score first, ties broken by document order
+        return sorted(range(self._size), key=lambda i: (-scores[i], i))[:k]
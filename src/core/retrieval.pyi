@@ -0,0 +1,83 @@
+"""
+Core module for lexical retrieval of candidate tests.
+
+Includes:
+---------
+`tokenize -> list[str]` - A function that splits a text into lowercase word tokens.\n
+`BM25Index` - A class ranking documents by their BM25 relevance to a query.
+
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits a text into lowercase word tokens.
+
+    Parameters:
+    -----------
+    text: str - The text to tokenize.
+
+    Returns:
+    --------
+    `list[str]` - The tokens of the text in order of appearance.
+    """
+    ...
+
+
+class BM25Index:
+    """
+    An inverted index ranking documents by their Okapi BM25 relevance to a query.
+    The index is built once, and queries only touch the documents containing a query term.
+
+    Methods:
+    --------
+    `scores -> list[float]` - Scores every document against a query.\n
+    `top_k -> list[int]` - Gets the indices of the most relevant documents for a query.
+    """
+    def __init__(self, documents: list[str], k1: float = 1.5, b: float = 0.75) -> None:
+        """
+        Builds an index over a list of documents.
+
+        Parameters:
+        -----------
+        documents: list[str] - The documents to index.\n
+        k1: float - (Optional) The term frequency saturation. Defaults to 1.5.\n
+        b: float - (Optional) The document length normalization. Defaults to 0.75.
+        """
+        ...
+
+    def scores(self, query: str) -> list[float]:
+        """
+        Scores every document against a query.
+
+        Parameters:
+        -----------
+        query: str - The query text.
+
+        Returns:
+        --------
+        `list[float]` - The score of each document, in the order of the indexed documents.
+        """
+        ...
+
+    def top_k(self, query: str, k: int) -> list[int]:
+        """
+        Gets the indices of the most relevant documents for a query.
+
+        Parameters:
+        -----------
+        query: str - The query text.\n
+        k: int - The maximum number of documents to get.
+
+        Returns:
+        --------
+        `list[int]` - The indices of the documents, highest score first. Ties are broken by document order.
+        """
+        ...
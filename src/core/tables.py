@@ -0,0 +1,186 @@
+"""
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from __future__ import annotations
+import csv
+import hashlib
+import os
+from os import PathLike
+from typing import Callable, Final
+
+import pyarrow as pa
+import pyarrow.ipc
+
+
+class TableCache:
+    # Default location of the cache, relative to the project root
+    _DEFAULT_DIR: Final[str] = "./.cache/tables"
+
+    # Bump to invalidate every cached table when the layout changes
+    _FORMAT_VERSION: Final[int] = 1
+
+    # Bytes to hash at a time
+    _CHUNK_SIZE: Final[int] = 1024 * 1024
+
+    def __init__(self, dir_: str | PathLike = _DEFAULT_DIR) -> None:
+        self._dir: str | PathLike = dir_
+
+        self._hits: int = 0
+        self._misses: int = 0
+
+    @property
+    def dir(self) -> str | PathLike:
+        return self._dir
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def as_dict(self) -> dict:
+        return {
+            "dir": str(self._dir),
+            "hits": self._hits,
+            "misses": self._misses
+        }
+
+    @staticmethod
+    def digest(path: str | PathLike) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(TableCache._CHUNK_SIZE):
+                h.update(chunk)
+
+        return h.hexdigest()
+
+    def table_path(self, path: str | PathLike, kind: str) -> str:
+        # One table per source file and kind of parse, replaced when the source changes
+        name: str = hashlib.sha256(
+            f"{TableCache._FORMAT_VERSION}\0{kind}\0{os.path.abspath(path)}".encode()
+        ).hexdigest()
+
+        return os.path.join(self._dir, f"{name}.arrow")
+
+    def load(
+            self,
+            path: str | PathLike,
+            kind: str,
+            parse: Callable[[str | PathLike], dict[str, list]]
+        ) -> dict[str, list]:
+        table_path: str = self.table_path(path, kind)
+        stat: os.stat_result = os.stat(path)
+
+        columns: dict[str, list] | None = self._read(table_path, path, stat)
+        if columns is not None:
+            self._hits += 1
+            return columns
+
+        self._misses += 1
+        columns = parse(path)
+        self._write(table_path, columns, path, stat)
+
+        return columns
+
+    def _read(self, table_path: str, path: str | PathLike, stat: os.stat_result) -> dict[str, list] | None:
+        """
+        Reads a cached table through a memory map if it is still valid for the source file.
+        The size and modification time of the source are checked first, and the content hash only if they changed.
+
+        Parameters:
+        -----------
+        table_path: str - The path to the cached table.\n
+        path: str | PathLike - The path to the source file.\n
+        stat: os.stat_result - The current status of the source file.
+
+        Returns:
+        --------
+        `dict[str, list] | None` - The cached columns, or `None` if the table is missing, stale, or unreadable.
+        """
+        if not os.path.exists(table_path):
+            return None
+
+        try:
+            with pa.memory_map(table_path) as source:
+                table: pa.Table = pa.ipc.open_file(source).read_all()
+                meta: dict[bytes, bytes] = table.schema.metadata or {}
+
+                unchanged: bool = meta.get(b"size") == str(stat.st_size).encode() \
+                    and meta.get(b"mtime") == str(stat.st_mtime_ns).encode()
+
+                # A touched file with the same content is still valid
+                if not unchanged and meta.get(b"sha256") != TableCache.digest(path).encode():
+                    return None
+
+                # Convert while the map is open
+                return {name: table.column(name).to_pylist() for name in table.column_names}
+        except (OSError, pa.ArrowInvalid):
+            # Treat corrupt tables as missing, they are replaced on write
+            return None
+
+    def _write(self, table_path: str, columns: dict[str, list], path: str | PathLike, stat: os.stat_result) -> None:
+        """
+        Writes parsed columns as an Arrow IPC file, stamped with the size, modification time, and content hash of the source.
+        The file is written next to its destination and moved in place to never expose a partial table.
+
+        Parameters:
+        -----------
+        table_path: str - The path to the cached table.\n
+        columns: dict[str, list] - The parsed columns.\n
+        path: str | PathLike - The path to the source file.\n
+        stat: os.stat_result - The status of the source file when it was parsed.
+        """
+        os.makedirs(self._dir, exist_ok=True)
+
+        table: pa.Table = pa.table(columns).replace_schema_metadata({
+            "size": str(stat.st_size),
+            "mtime": str(stat.st_mtime_ns),
+            "sha256": TableCache.digest(path)
+        })
+
+        tmp_path: str = f"{table_path}.{os.getpid()}.tmp"
+        try:
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+            os.replace(tmp_path, table_path)
+        except OSError:
+            # Caching is best effort, the parsed columns are still returned
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def read_mapping(mapping_path: str | PathLike) -> dict[str, list]:
+    with open(mapping_path, "r") as f:
+        reader: csv.DictReader = csv.DictReader(f)
+
+        # The requirement IDs and the list of test IDs of each row
+        columns: dict[str, list] = {
+            "Req ID": [],
+            "Test IDs": []
+        }
+        for row in reader:
+            columns["Req ID"].append(row["Req ID"])
+            columns["Test IDs"].append(row["Test IDs"].replace(" ", "").split(",") if row["Test IDs"] else [])
+
+        return columns
+
+
+def load_mapping(mapping_path: str | PathLike, cache: TableCache | None = None) -> dict[str, set[str]]:
+    columns: dict[str, list] = read_mapping(mapping_path) if cache is None \
+        else cache.load(mapping_path, "mapping", read_mapping)
+
+    return {
+        req_id: (set(test_ids) if test_ids else set())
+        for req_id, test_ids in zip(columns["Req ID"], columns["Test IDs"])
+    }
@@ -0,0 +1,157 @@
+"""
+Core module for caching parsed data files on disk.
+
+Includes:
+---------
+`TableCache` - A cache of parsed files stored as memory-mapped Arrow tables.\n
+`read_mapping -> dict[str, list]` - A function that parses a trace link mapping file into columns.\n
+`load_mapping -> dict[str, set[str]]` - A function that loads the expected trace links of a mapping file.
+
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+from os import PathLike
+from typing import Callable
+
+
+class TableCache:
+    """
+    A cache of parsed files stored as Arrow IPC files, loaded through memory maps.
+    Each source file and kind of parse has one table, stamped with the size, modification time, and content hash of the source.
+
+    A table is valid while the size and modification time of its source are unchanged. Otherwise, the content
+    of the source is hashed, and the table is only replaced if the content changed.
+
+    Properties:
+    -----------
+    `readonly dir: str | PathLike` - The directory of the cached tables.\n
+    `readonly hits: int` - The number of loads that used a cached table.\n
+    `readonly misses: int` - The number of loads that parsed the source file.\n
+    `readonly as_dict: dict` - A dict representation of the cache usage.
+
+    Methods:
+    --------
+    `static digest -> str` - Hashes the content of a file.\n
+    `table_path -> str` - Gets the path to the cached table of a file.\n
+    `load -> dict[str, list]` - Loads the parsed columns of a file, parsing it if needed.
+    """
+
+    def __init__(self, dir_: str | PathLike = "./.cache/tables") -> None:
+        """
+        Creates a table cache. The directory is created on the first write.
+
+        Parameters:
+        -----------
+        dir_: str | PathLike - (Optional) The directory of the cached tables. Defaults to `./.cache/tables`.
+        """
+        ...
+
+    @property
+    def dir(self) -> str | PathLike:
+        ...
+
+    @property
+    def hits(self) -> int:
+        ...
+
+    @property
+    def misses(self) -> int:
+        ...
+
+    @property
+    def as_dict(self) -> dict:
+        ...
+
+    @staticmethod
+    def digest(path: str | PathLike) -> str:
+        """
+        Hashes the content of a file, one chunk at a time.
+
+        Parameters:
+        -----------
+        path: str | PathLike - The path to the file.
+
+        Returns:
+        --------
+        `str` - The SHA-256 hex digest of the content.
+        """
+        ...
+
+    def table_path(self, path: str | PathLike, kind: str) -> str:
+        """
+        Gets the path to the cached table of a file.
+
+        Parameters:
+        -----------
+        path: str | PathLike - The path to the source file.\n
+        kind: str - The kind of parse, separating tables parsed differently from the same file.
+
+        Returns:
+        --------
+        `str` - The path to the cached table.
+        """
+        ...
+
+    def load(
+            self,
+            path: str | PathLike,
+            kind: str,
+            parse: Callable[[str | PathLike], dict[str, list]]
+        ) -> dict[str, list]:
+        """
+        Loads the parsed columns of a file from its cached table.
+        If the table is missing or stale, the file is parsed and the table is replaced.
+
+        Parameters:
+        -----------
+        path: str | PathLike - The path to the source file.\n
+        kind: str - The kind of parse, separating tables parsed differently from the same file.\n
+        parse: Callable[[str | PathLike], dict[str, list]] - Parses the file into columns of equal length.
+        Values must be strings or lists of strings.
+
+        Returns:
+        --------
+        `dict[str, list]` - The parsed columns.
+
+        Raises:
+        -------
+        Anything raised by `parse`. Nothing is cached if the parse fails.
+        """
+        ...
+
+
+def read_mapping(mapping_path: str | PathLike) -> dict[str, list]:
+    """
+    Parses a CSV file mapping requirements to their tests into columns, which can be stored in a `TableCache`.
+    The file has a `Req ID` column and a `Test IDs` column of comma separated test IDs.
+
+    Parameters:
+    -----------
+    mapping_path: str | PathLike - The path to the mapping file.
+
+    Returns:
+    --------
+    `dict[str, list]` - The requirement ID of each row under `Req ID`, and its list of test IDs under `Test IDs`.
+    """
+    ...
+
+
+def load_mapping(mapping_path: str | PathLike, cache: TableCache | None = None) -> dict[str, set[str]]:
+    """
+    Loads the expected trace links of a mapping file.
+
+    Parameters:
+    -----------
+    mapping_path: str | PathLike - The path to the mapping file.\n
+    cache: TableCache | None - (Optional) A cache of parsed files to reuse the parsed mapping from.
+
+    Returns:
+    --------
+    `dict[str, set[str]]` - The IDs of the tests of each requirement, mapped from the requirement ID.
+    """
+    ...
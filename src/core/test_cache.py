@@ -0,0 +1,74 @@
+import json
+import os
+from tempfile import TemporaryDirectory
+import time
+from unittest import TestCase
+
+from .cache import *
+
+
+class TestResponseCache(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir: TemporaryDirectory = TemporaryDirectory()
+        self.path: str = os.path.join(self.tmp_dir.name, "responses.sqlite")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_key_depends_on_all_parameters(self):
+        base: tuple = ("model", "system", "prompt", 0, 0.1, 100)
+        key: str = ResponseCache.key(*base)
+
+        for i in range(len(base)):
+            changed: list = list(base)
+            changed[i] = None
+            self.assertNotEqual(key, ResponseCache.key(*changed), f"Parameter {i} doesn't affect the key.")
+
+    def test_hits_and_misses(self):
+        with ResponseCache(self.path) as cache:
+            key: str = ResponseCache.key("model", "system", "prompt", None, 0.1, 100)
+
+            self.assertIsNone(cache.get(key))
+            cache.put(key, {"content": "[]"})
+
+            self.assertDictEqual(cache.get(key), {"content": "[]"})
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_persistent(self):
+        key: str = ResponseCache.key("model", "system", "prompt", None, 0.1, 100)
+
+        with ResponseCache(self.path) as cache:
+            cache.put(key, {"content": "[]"})
+
+        with ResponseCache(self.path) as cache:
+            self.assertDictEqual(cache.get(key), {"content": "[]"})
+
+    def test_age_eviction(self):
+        with ResponseCache(self.path, max_age=-1) as cache:
+            cache.put("key", {"content": "[]"})
+
+            self.assertIsNone(cache.get("key"))
+            self.assertEqual(cache.evict(), 1)
+
+    def test_size_eviction(self):
+        value: dict = {"content": "[]"}
+        size: int = len(json.dumps(value))
+
+        with ResponseCache(self.path, max_size=2 * size) as cache:
+            for key in ("a", "b"):
+                cache.put(key, value)
+                time.sleep(0.01)
+            # Access "a" to make "b" the least recently used entry
+            cache.get("a")
+            time.sleep(0.01)
+
+            # Caching beyond the budget evicts right away
+            cache.put("c", value)
+            self.assertIsNone(cache.get("b"))
+            self.assertIsNotNone(cache.get("a"))
+            self.assertIsNotNone(cache.get("c"))
+
+            # Replacing an entry doesn't grow the cache
+            cache.put("c", value)
+            self.assertIsNotNone(cache.get("a"))
+            self.assertEqual(cache.evict(), 0)
@@ -0,0 +1,118 @@
+from unittest import TestCase
+
+import torch
+
+from .decoding import *
+from .decoding import _VOCABULARIES
+from .grammar import OutputGrammar, OutputShape
+
+
+class _Tokenizer:
+    # A tokenizer with a handful of single and multi-character tokens
+    _VOCAB: list[str] = ["</s>", "a", "[", "]", "\"", "T", "-", "0", "1", ",", " ", "[\"T-", "\"]", "hello"]
+
+    all_special_ids: list[int] = [0]
+
+    def __len__(self) -> int:
+        return len(_Tokenizer._VOCAB)
+
+    def encode(self, text: str, add_special_tokens: bool = True) -> list[int]:
+        return [_Tokenizer._VOCAB.index(text)]
+
+    def decode(self, token_ids: list[int], clean_up_tokenization_spaces: bool = True, skip_special_tokens: bool = False) -> str:
+        return "".join(_Tokenizer._VOCAB[int(token_id)] for token_id in token_ids)
+
+    def batch_decode(self, sequences: list[list[int]], clean_up_tokenization_spaces: bool = True) -> list[str]:
+        return [self.decode(token_ids) for token_ids in sequences]
+
+
+class TestGrammarLogitsProcessor(TestCase):
+    def test_constrained_generation(self):
+        tokenizer: _Tokenizer = _Tokenizer()
+        processor: GrammarLogitsProcessor = GrammarLogitsProcessor(
+            tokenizer,
+            [OutputGrammar(OutputShape.LIST, ["T-1"]), None],
+            [0]
+        )
+
+        # Greedy decoding preferring the prose token, which is never allowed for the constrained sequence
+        preference: torch.Tensor = torch.arange(len(tokenizer), dtype=torch.float)
+        input_ids: torch.Tensor = torch.ones((2, 1), dtype=torch.long)
+        for _ in range(8):
+            scores: torch.Tensor = processor(input_ids, preference.repeat(2, 1))
+            input_ids = torch.cat((input_ids, scores.argmax(-1, keepdim=True)), -1)
+
+        # Only the end of sequence token follows a complete answer
+        constrained: list[int] = input_ids[0, 1:].tolist()
+        self.assertIn(0, constrained)
+        self.assertEqual(tokenizer.decode(constrained[:constrained.index(0)]), "[\"T-1\"]")
+        # Unconstrained sequences are left as is
+        self.assertTrue(all(token_id == len(tokenizer) - 1 for token_id in input_ids[1, 1:].tolist()))
+
+    def test_closing(self):
+        tokenizer: _Tokenizer = _Tokenizer()
+        grammar: OutputGrammar = OutputGrammar(OutputShape.LIST, ["T-0", "T-1"])
+        processor: GrammarLogitsProcessor = GrammarLogitsProcessor(tokenizer, [grammar, grammar], [0], [20, 6])
+
+        # Greedy decoding preferring to list one more ID, and the IDs already listed
+        preference: torch.Tensor = torch.zeros(len(tokenizer))
+        preference[[9, 11, 8, 7, 4, 10]] = torch.tensor([6.0, 5.0, 4.0, 3.0, 2.0, 1.0])
+        input_ids: torch.Tensor = torch.ones((2, 1), dtype=torch.long)
+        for _ in range(20):
+            scores: torch.Tensor = processor(input_ids, preference.repeat(2, 1))
+            input_ids = torch.cat((input_ids, scores.argmax(-1, keepdim=True)), -1)
+
+        answers: list[str] = [
+            tokenizer.decode(row[:row.index(0)])
+            for row in input_ids[:, 1:].tolist()
+        ]
+
+        # Each ID is listed once and the answer ends once all are listed, or once the budget might not fit another ID
+        self.assertEqual(answers[0], "[\"T-1\",\"T-0\"]")
+        self.assertEqual(answers[1], "[\"T-1\"]")
+
+
+    def test_vocabulary_dropped_with_tokenizer(self):
+        vocabularies: int = len(_VOCABULARIES)
+        tokenizer: _Tokenizer = _Tokenizer()
+        processor: GrammarLogitsProcessor = GrammarLogitsProcessor(tokenizer, [OutputGrammar(OutputShape.LIST, ["T-1"])], [0])
+
+        # The vocabulary is decoded once per tokenizer
+        self.assertIs(GrammarLogitsProcessor(tokenizer, [None], [0])._vocabulary, processor._vocabulary)
+        self.assertIn(tokenizer, _VOCABULARIES)
+
+        del tokenizer, processor
+        self.assertEqual(len(_VOCABULARIES), vocabularies)
+
+
+class TestAnswerStoppingCriteria(TestCase):
+    def test_ends(self):
+        tokenizer: _Tokenizer = _Tokenizer()
+        criteria: AnswerStoppingCriteria = AnswerStoppingCriteria(tokenizer, 1, [8, 3], [0])
+
+        # "hello [\"T-1\"] hello" and endless prose
+        tokens: list[list[int]] = [[13, 10, 11, 8, 12, 13], [13, 13, 13, 13, 13, 13]]
+        input_ids: torch.Tensor = torch.ones((2, 1), dtype=torch.long)
+        stopped: list[bool] = []
+        for step in range(6):
+            input_ids = torch.cat((input_ids, torch.tensor([[row[step]] for row in tokens])), -1)
+            stopped.append(criteria(input_ids, torch.zeros((2, len(tokenizer)))))
+
+        # The answer ends with its closing bracket, and the prose at its maximum number of tokens
+        self.assertListEqual(criteria.ends, [5, 3])
+        self.assertListEqual(stopped, [False, False, False, False, True, True])
+
+    def test_other_json(self):
+        tokenizer: _Tokenizer = _Tokenizer()
+        criteria: AnswerStoppingCriteria = AnswerStoppingCriteria(tokenizer, 1, [20], [0])
+
+        # "hello [1] [\"T-1\"]", a list of numbers isn't an answer
+        tokens: list[int] = [13, 10, 2, 8, 3, 10, 11, 8, 12]
+        input_ids: torch.Tensor = torch.ones((1, 1), dtype=torch.long)
+        stopped: list[bool] = []
+        for token_id in tokens:
+            input_ids = torch.cat((input_ids, torch.tensor([[token_id]])), -1)
+            stopped.append(criteria(input_ids, torch.zeros((1, len(tokenizer)))))
+
+        self.assertListEqual(criteria.ends, [9])
+        self.assertListEqual(stopped, [False] * 8 + [True])
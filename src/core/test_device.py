@@ -0,0 +1,45 @@
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+import torch
+
+from .device import *
+
+
+class TestDevicePolicy(TestCase):
+    def test_auto_without_cuda(self):
+        with patch.object(torch.cuda, "is_available", return_value=False):
+            policy: DevicePolicy = DevicePolicy()
+
+            self.assertIs(policy.device, Device.CPU)
+            self.assertIs(policy.dtype, torch.float32)
+            self.assertNotIn("device_map", policy.load_kwargs())
+            self.assertRaises(ValueError, DevicePolicy, Device.CUDA)
+
+    def test_cuda_defaults(self):
+        with patch.object(torch.cuda, "is_available", return_value=True):
+            policy: DevicePolicy = DevicePolicy()
+
+            self.assertIs(policy.device, Device.CUDA)
+            self.assertDictEqual(policy.load_kwargs(), {"torch_dtype": torch.float16, "device_map": "auto"})
+
+    def test_from_env(self):
+        env: dict[str, str] = {"MODEL_DEVICE": "CPU", "MODEL_DTYPE": "bfloat16", "MODEL_THREADS": "2"}
+        with patch.dict(os.environ, env):
+            policy: DevicePolicy = DevicePolicy.from_env()
+
+        self.assertDictEqual(policy.as_dict, {"device": "cpu", "dtype": "bfloat16", "num_threads": 2})
+
+        with patch.dict(os.environ, {"MODEL_DTYPE": "int8"}):
+            self.assertRaises(ValueError, DevicePolicy.from_env)
+
+    def test_threads(self):
+        self.assertRaises(ValueError, DevicePolicy, Device.CPU, None, 0)
+
+        threads: int = torch.get_num_threads()
+        try:
+            DevicePolicy(Device.CPU, num_threads=1).apply()
+            self.assertEqual(torch.get_num_threads(), 1)
+        finally:
+            torch.set_num_threads(threads)
@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+from .estimate import *
+from .rest import RESTSpecification
+
+
+class TestTokenEstimate(TestCase):
+    def test_approximate_counter(self):
+        count_tokens = approximate_counter(4)
+
+        self.assertEqual(count_tokens(""), 0)
+        self.assertEqual(count_tokens("abcde"), 2)
+        self.assertRaises(ValueError, approximate_counter, 0)
+
+    def test_summary(self):
+        estimate: TokenEstimate = TokenEstimate({"a": [10, 30], "b": [20]}, 40, 15)
+
+        self.assertDictEqual(estimate.input_tokens, {"a": 40, "b": 20})
+        self.assertEqual(estimate.prompts, 3)
+        self.assertEqual(estimate.total_input_tokens, 60)
+        self.assertTupleEqual(estimate.worst_case, ("a", 30))
+        self.assertListEqual(estimate.over_context, ["a"])
+        self.assertAlmostEqual(estimate.cost(1_000_000, 2_000_000), 60 + 3 * 15 * 2)
+
+    def test_estimate_gpt(self):
+        reqs: str = "ID,Feature,\"Description\"\n" \
+                  + "1,test,test\n" \
+                  + "2,test,test"
+        tests: str = "ID,Purpose,\"Test steps\"\n" \
+                   + "1,test,test"
+        specs: RESTSpecification = RESTSpecification.load_specs_from_str(reqs, tests)
+        estimate: TokenEstimate = specs.estimate_gpt("unknown-model", chars_per_token=1)
+
+        self.assertEqual(estimate.prompts, 2)
+        self.assertIsNone(estimate.as_dict["max_context"])
+        self.assertListEqual(estimate.over_context, [])
@@ -0,0 +1,49 @@
+from unittest import TestCase
+
+from .grammar import *
+
+
+class TestOutputGrammar(TestCase):
+    def test_list(self):
+        grammar: OutputGrammar = OutputGrammar(OutputShape.LIST, ["T-0", "T-1", "T-12"])
+
+        self.assertTrue(grammar.matches("[]"))
+        self.assertTrue(grammar.matches(" [\"T-1\", \"T-12\"]"))
+        self.assertTrue(grammar.matches("[\"T-0\",\"T-1\"]"))
+        self.assertFalse(grammar.matches("[\"T-2\"]"))
+        self.assertFalse(grammar.matches("[\"T-1\"] and more"))
+        self.assertFalse(grammar.matches("[\"T-1\""))
+
+    def test_no_repeated_ids(self):
+        grammar: OutputGrammar = OutputGrammar(OutputShape.LIST, ["T-1", "T-12"])
+
+        self.assertTrue(grammar.matches("[\"T-12\", \"T-1\"]"))
+        self.assertFalse(grammar.matches("[\"T-1\", \"T-1\"]"))
+        # Every ID is in the answer, so it can only end
+        state: tuple | None = grammar.start()
+        for char in "[\"T-1\", \"T-12\"":
+            state = grammar.advance(state, char)
+        self.assertIsNone(grammar.advance(state, ","))
+        self.assertIsNotNone(grammar.advance(state, "]"))
+
+    def test_close(self):
+        grammar: OutputGrammar = OutputGrammar(OutputShape.LIST, ["T-1", "T-12"])
+
+        state: tuple | None = grammar.start()
+        for char in "[\"T-1\"":
+            state = grammar.advance(state, char)
+
+        closing: tuple | None = grammar.close(state)
+        self.assertIsNone(grammar.advance(closing, ","))
+        self.assertTrue(grammar.accepts(grammar.advance(closing, "]")))
+        # No answer ends within an ID
+        self.assertIsNone(grammar.close(grammar.advance(state, ",")))
+
+    def test_json(self):
+        grammar: OutputGrammar = OutputGrammar(OutputShape.JSON, ["T-0", "T-1"], "R-3")
+
+        self.assertTrue(grammar.matches("{\"requirementID\": \"R-3\", \"tests\": \"T-0, T-1\"}"))
+        self.assertTrue(grammar.matches("{\"requirementID\": \"R-3\", \"tests\": \"\"}"))
+        self.assertFalse(grammar.matches("{\"requirementID\": \"R-4\", \"tests\": \"\"}"))
+        self.assertFalse(grammar.matches("{\"requirementID\": \"R-3\", \"tests\": \"T-0,\"}"))
+        self.assertRaises(ValueError, OutputGrammar, OutputShape.JSON, ["T-0"])
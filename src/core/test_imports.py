@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+
+class TestLazyImports(TestCase):
+    def _loaded_modules(self, *modules: str) -> set[str]:
+        # Import in a fresh interpreter, since this process may already have loaded anything
+        code: str = "\n".join([
+            "import importlib, sys",
+            *(f"importlib.import_module({f'{__package__}.{module}'!r})" for module in modules),
+            "print(*sys.modules)"
+        ])
+        env: dict[str, str] = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+        result: subprocess.CompletedProcess = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            check=True,
+            env=env,
+            text=True
+        )
+
+        return set(result.stdout.split())
+
+    def test_rest_and_stats_skip_torch(self):
+        loaded: set[str] = self._loaded_modules("rest", "stats")
+
+        self.assertNotIn("torch", loaded)
+        self.assertNotIn("transformers", loaded)
+
+    def test_model_loads_torch(self):
+        self.assertIn("torch", self._loaded_modules("model"))
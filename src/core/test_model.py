@@ -0,0 +1,395 @@
+from concurrent.futures import ThreadPoolExecutor
+import re
+from tempfile import TemporaryDirectory
+from threading import Event
+from types import SimpleNamespace
+from typing import Iterator
+from unittest import TestCase
+from unittest.mock import patch
+
+import torch
+
+from .model import *
+from .model import _ChatEncoder, _ModelType
+
+
+class _Tokenizer:
+    # A character-level tokenizer with beginning and end of sequence tokens
+    class _AddedToken:
+        lstrip: bool = False
+        rstrip: bool = False
+        single_word: bool = False
+        normalized: bool = False
+
+    _ADDED: dict[str, int] = {"<s>": 0, "</s>": 1}
+
+    is_fast: bool = True
+    added_tokens_decoder: dict = {0: _AddedToken(), 1: _AddedToken()}
+
+    bos_token: str = "<s>"
+    eos_token: str = "</s>"
+    eos_token_id: int = 1
+    pad_token_id: int | None = None
+    unk_token_id: int | None = None
+
+    def __init__(self) -> None:
+        self.tokenized: list[str] = []
+        self.padding_side: str = "right"
+
+    def get_added_vocab(self) -> dict[str, int]:
+        return dict(_Tokenizer._ADDED)
+
+    def __call__(self, text: str, add_special_tokens: bool = True) -> dict[str, list[int]]:
+        self.tokenized.append(text)
+
+        input_ids: list[int] = [0] if add_special_tokens else []
+        for piece in re.split("(</s>|<s>)", text):
+            input_ids += [_Tokenizer._ADDED[piece]] if piece in _Tokenizer._ADDED else [ord(char) for char in piece]
+
+        return {"input_ids": input_ids}
+
+    def decode(self, input_ids: torch.Tensor | list[int], skip_special_tokens: bool = False, **kwargs) -> str:
+        added: dict[int, str] = {token_id: token for token, token_id in _Tokenizer._ADDED.items()}
+        ids: list[int] = input_ids.tolist() if isinstance(input_ids, torch.Tensor) else list(input_ids)
+
+        return "".join(
+            ("" if skip_special_tokens else added[token_id]) if token_id in added else chr(token_id)
+            for token_id in ids
+        )
+
+
+class _LanguageModel:
+    # Answers each prompt with the number of tokens of the prompt without its padding
+    device: torch.device = torch.device("cpu")
+    generation_config: SimpleNamespace = SimpleNamespace(eos_token_id=1)
+
+    def __init__(self) -> None:
+        # The cached keys and values passed to each call
+        self.past_key_values: list = []
+
+    def generate(
+            self,
+            input_ids: torch.Tensor,
+            attention_mask: torch.Tensor,
+            past_key_values: tuple | None = None,
+            stopping_criteria: list | None = None,
+            streamer=None,
+            return_dict_in_generate: bool = False,
+            **kwargs
+        ):
+        self.past_key_values.append(past_key_values)
+
+        answers: list[list[int]] = []
+        for mask in attention_mask:
+            # The padding must precede the prompt and be masked out
+            start: int = len(mask) - int(mask.sum())
+            if mask[:start].any() or not mask[start:].all():
+                raise ValueError("Prompt not left-padded.")
+
+            answers.append([ord(char) for char in f"[\"T-{len(mask) - start}\", \"T-0\"]"] + [1])
+
+        # Pad the shorter answers with end of sequence tokens
+        width: int = max(len(answer) for answer in answers)
+        generated: torch.Tensor = torch.tensor([answer + [1] * (width - len(answer)) for answer in answers])
+        sequences: torch.Tensor = torch.cat((input_ids, generated), dim=1)
+
+        if streamer is not None:
+            streamer.put(input_ids[0])
+            for i, token_id in enumerate(generated[0]):
+                streamer.put(token_id[None])
+                if any(criteria(sequences[:, :input_ids.shape[1] + i + 1], None) for criteria in stopping_criteria or []):
+                    break
+            streamer.end()
+
+        if not return_dict_in_generate:
+            return sequences
+
+        # The last token is never fed back, so it has no keys and values
+        cache: torch.Tensor = torch.zeros((1, 1, sequences.shape[1] - 1, 1))
+        return SimpleNamespace(sequences=sequences, past_key_values=((cache, cache),))
+
+
+def _model() -> Model:
+    # A Mistral model generating with the character-level tokenizer
+    m: Model = Model.__new__(Model)
+    m.tokenizer = _Tokenizer()
+    m.model = _LanguageModel()
+    m.max_new_tokens = 64
+    m.memory_footprint = 0
+    m._chat_encoder = None
+    m.type = _ModelType.MISTRAL
+
+    return m
+
+
+class TestModelRegistry(TestCase):
+    def setUp(self) -> None:
+        self.models: dict = dict(Model._MODELS)
+        Model._MODELS.clear()
+
+    def tearDown(self) -> None:
+        Model.set_memory_budget(None)
+        Model._MODELS.clear()
+        Model._UNLOADED.clear()
+        Model._MODELS.update(self.models)
+
+    def _add(self, name: str, footprint: int) -> Model:
+        # An empty model standing in for a loaded one
+        m: Model = Model.__new__(Model)
+        m.memory_footprint = footprint
+        Model._MODELS[name] = m
+
+        return m
+
+    def test_evicts_least_recently_used(self):
+        a: Model = self._add("a", 4)
+        self._add("b", 4)
+        self._add("c", 4)
+
+        # Using a model makes it the most recently used
+        self.assertIs(Model.get("a"), a)
+
+        Model.set_memory_budget(8)
+        self.assertListEqual(list(Model._MODELS), ["c", "a"])
+        self.assertEqual(Model.memory_in_use(), 8)
+
+        # The most recently used model is kept even if too large on its own
+        Model.set_memory_budget(1)
+        self.assertListEqual(list(Model._MODELS), ["a"])
+
+    def test_unload(self):
+        self._add("a", 4)
+
+        self.assertTrue(Model.unload("a"))
+        self.assertFalse(Model.unload("a"))
+        self.assertEqual(Model.memory_in_use(), 0)
+
+    def test_referenced_models_count(self):
+        # A model kept by a session stays in memory after being unloaded
+        a: Model = self._add("a", 4)
+        self._add("b", 4)
+        self._add("c", 4)
+
+        Model.set_memory_budget(8)
+        self.assertListEqual(list(Model._MODELS), ["c"])
+        self.assertEqual(Model.memory_in_use(), 8)
+
+        # Getting the model again takes it back instead of loading it
+        self.assertIs(Model.get("a"), a)
+        self.assertListEqual(list(Model._MODELS), ["c", "a"])
+        self.assertEqual(Model.memory_in_use(), 8)
+
+    def test_failed_load_is_retried(self):
+        with TemporaryDirectory() as path:
+            # Nothing to load from an empty directory
+            for _ in range(2):
+                self.assertRaises(OSError, Model.get, path, 1)
+                self.assertNotIn(path, Model._MODELS)
+
+    def test_concurrent_callers_share_load(self):
+        started: Event = Event()
+        loading: Event = Event()
+        loads: list[str] = []
+
+        def load(model_name_or_path: str, max_new_tokens: int) -> Model:
+            loads.append(model_name_or_path)
+            started.set()
+            loading.wait(5)
+
+            m: Model = Model.__new__(Model)
+            m.memory_footprint = 0
+            return m
+
+        with patch.object(Model, "_load", side_effect=load), ThreadPoolExecutor(4) as executor:
+            getting: list = [executor.submit(Model.get, "a", 1) for _ in range(4)]
+            started.wait(5)
+
+            # Waiting callers give up after their timeout
+            self.assertRaises(TimeoutError, Model.get, "a", 1, 0.01)
+
+            loading.set()
+            models: list[Model] = [future.result(5) for future in getting]
+
+        self.assertListEqual(loads, ["a"])
+        self.assertTrue(all(m is Model._MODELS["a"] for m in models))
+
+    def test_waiting_callers_get_load_error(self):
+        loading: Event = Event()
+
+        def load(model_name_or_path: str, max_new_tokens: int) -> Model:
+            loading.wait(5)
+            raise OSError(model_name_or_path)
+
+        with patch.object(Model, "_load", side_effect=load), ThreadPoolExecutor(2) as executor:
+            getting: list = [executor.submit(Model.get, "a", 1) for _ in range(2)]
+            loading.set()
+
+            for future in getting:
+                self.assertRaises(OSError, future.result, 5)
+
+        self.assertNotIn("a", Model._LOADS)
+
+
+class TestChatEncoder(TestCase):
+    def test_encode(self):
+        tokenizer: _Tokenizer = _Tokenizer()
+        encoder: _ChatEncoder = _ChatEncoder(tokenizer)
+        chat: str = "<s>[INST]hi[/INST]hello</s>[INST]more[/INST]"
+
+        self.assertTrue(encoder.verify(chat))
+        self.assertListEqual(encoder.encode(chat), tokenizer(chat)["input_ids"])
+
+    def test_memoizes_pieces(self):
+        tokenizer: _Tokenizer = _Tokenizer()
+        encoder: _ChatEncoder = _ChatEncoder(tokenizer)
+
+        encoder.encode("<s>[INST]hi[/INST]hello</s>")
+        tokenizer.tokenized.clear()
+
+        # Only the new turn is tokenized
+        encoder.encode("<s>[INST]hi[/INST]hello</s>[INST]more[/INST]")
+        self.assertListEqual(tokenizer.tokenized, ["[INST]more[/INST]"])
+
+
+class TestKVCache(TestCase):
+    def setUp(self) -> None:
+        self.keys: torch.Tensor = torch.rand((1, 2, 6, 4))
+        self.values: torch.Tensor = torch.rand((1, 2, 6, 4))
+        self.cache: KVCache = KVCache(torch.arange(6), ((self.keys, self.values),))
+
+    def test_drops_uncached_tokens(self):
+        # The last generated token has no keys and values
+        self.assertEqual(len(KVCache(torch.arange(7), ((self.keys, self.values),))), 6)
+
+    def test_match(self):
+        self.assertEqual(self.cache.match(torch.arange(10)), 6)
+        self.assertEqual(self.cache.match(torch.tensor([0, 1, 9, 3, 4, 5, 6])), 2)
+        self.assertEqual(self.cache.match(torch.tensor([9, 1, 2])), 0)
+
+        # At least one token is left for the model to process
+        self.assertEqual(self.cache.match(torch.arange(6)), 5)
+        self.assertEqual(self.cache.match(torch.arange(1)), 0)
+
+    def test_past_key_values_for(self):
+        self.assertIs(self.cache.past_key_values_for(torch.arange(8)), self.cache.past_key_values)
+        self.assertIsNone(self.cache.past_key_values_for(torch.tensor([9, 1, 2])))
+
+        # A partial match is truncated without changing the cache
+        (keys, values), = self.cache.past_key_values_for(torch.tensor([0, 1, 9]))
+        self.assertTrue(torch.equal(keys, self.keys[:, :, :2]))
+        self.assertTrue(torch.equal(values, self.values[:, :, :2]))
+        self.assertEqual(self.cache.past_key_values[0][0].shape[-2], 6)
+
+
+class TestSessionCache(TestCase):
+    def setUp(self) -> None:
+        self.model: Model = _model()
+        with patch.object(Model, "get", return_value=self.model):
+            self.session: Session = Session("test", "model", 64, "You are a test.")
+
+    def test_reuses_previous_turn(self):
+        self.session.prompt("first")
+        cache: KVCache = self.session._kv_cache
+        self.session.prompt("second")
+
+        # The second turn continues from the whole first turn
+        passed: list = self.model.model.past_key_values
+        self.assertIsNone(passed[0])
+        self.assertIs(passed[1], cache.past_key_values)
+        self.assertIsNot(self.session._kv_cache, cache)
+
+    def test_explicit_cache_first(self):
+        self.session.prompt("first")
+
+        # Keys and values of the start of the next input, shorter than the previous turn
+        input_ids: torch.Tensor = self.model._apply_chat_template(
+            self.session.history + [{"role": "user", "content": "second"}]
+        )["input_ids"][0]
+        keys: torch.Tensor = torch.zeros((1, 1, 8, 1))
+        prefix: KVCache = KVCache(input_ids[:8], ((keys, keys),))
+
+        # A given cache is used instead of the one of the previous turn, and the turn is still kept
+        self.session.prompt("second", cache=prefix)
+        self.assertIs(self.model.model.past_key_values[-1], prefix.past_key_values)
+        self.assertEqual(len(self.session.history), 5)
+        self.assertGreater(len(self.session._kv_cache), len(input_ids))
+
+    def test_ephemeral_keeps_cache(self):
+        self.session.prompt("first")
+        cache: KVCache = self.session._kv_cache
+
+        self.session.prompt("second", ephemeral=True)
+        self.assertIs(self.session._kv_cache, cache)
+        self.assertEqual(len(self.session.history), 3)
+
+    def test_invalidated_on_system_prompt(self):
+        self.session.prompt("first")
+        self.session.system_prompt = "You are another test."
+        self.assertIsNone(self.session._kv_cache)
+
+        self.session.prompt("second")
+        self.assertIsNone(self.model.model.past_key_values[-1])
+
+    def test_invalidated_on_clear(self):
+        self.session.prompt("first")
+        self.session.clear()
+        self.assertIsNone(self.session._kv_cache)
+
+        self.session.prompt("second")
+        self.assertIsNone(self.model.model.past_key_values[-1])
+
+
+class TestPromptBatch(TestCase):
+    def test_matches_single_prompts(self):
+        model: Model = _model()
+        history: list[dict[str, str]] = [{"role": "system", "content": "You are a test."}]
+        prompts: list[str] = ["short", "a much longer prompt", "medium prompt"]
+
+        single: list[str] = [model.prompt(list(history), prompt) for prompt in prompts]
+        usage: list[int] = []
+        batched: list[str] = model.prompt_batch(history, prompts, usage=usage)
+
+        # The prompts of different lengths are left-padded and masked, so each answer is the one of its prompt alone
+        self.assertListEqual(batched, single)
+        self.assertEqual(len(set(batched)), len(prompts))
+        self.assertListEqual(usage, [len(res) + 1 for res in batched])
+
+        # The history and the padding side of the tokenizer are left as they were
+        self.assertEqual(len(history), 1)
+        self.assertEqual(model.tokenizer.padding_side, "right")
+
+
+class TestPromptStream(TestCase):
+    def setUp(self) -> None:
+        self.model: Model = _model()
+        with patch.object(Model, "get", return_value=self.model):
+            self.session: Session = Session("test", "model", 64, "You are a test.")
+
+    def test_stream_matches_prompt(self):
+        expected: str = self.model.prompt([{"role": "system", "content": "You are a test."}], "first")
+        streamed: list[str] = list(self.session.prompt_stream("first"))
+
+        # The reply arrives in pieces and is kept like a prompted one
+        self.assertGreater(len(streamed), 1)
+        self.assertEqual("".join(streamed), expected)
+        self.assertDictEqual(self.session.history[-1], {"role": "assistant", "content": expected})
+        self.assertEqual(len(self.session.history), 3)
+        self.assertIsNotNone(self.session._kv_cache)
+
+    def test_cancel_leaves_history(self):
+        self.session.prompt("first")
+        history: list[dict[str, str]] = self.session.history
+        cache: KVCache = self.session._kv_cache
+
+        stream: Iterator[str] = self.session.prompt_stream("second")
+        next(stream)
+        stream.close()
+
+        self.assertListEqual(self.session.history, history)
+        self.assertIs(self.session._kv_cache, cache)
+
+    def test_ephemeral_stream(self):
+        list(self.session.prompt_stream("first", ephemeral=True))
+
+        self.assertEqual(len(self.session.history), 1)
+        self.assertIsNone(self.session._kv_cache)
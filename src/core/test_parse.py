@@ -0,0 +1,46 @@
+import json
+import os
+from unittest import TestCase
+
+from .parse import *
+from .rest import RESTSpecification
+
+
+class TestTolerantParser(TestCase):
+    def setUp(self) -> None:
+        reqs: str = "ID,Feature,\"Description\"\n" \
+                  + "1,test,test"
+        tests: str = "ID,Purpose,\"Test steps\"\n" \
+                   + "\n".join(f"{i + 1},test,test" for i in range(10))
+        self.specs: RESTSpecification = RESTSpecification.load_specs_from_str(reqs, tests)
+
+        with open(os.path.join(os.path.dirname(__file__), "fixtures", "raw_outputs.json")) as f:
+            self.corpus: list[dict] = json.load(f)
+
+    def test_iter_json(self):
+        raw_res: str = "x ] {not json} {\"a\": \"}\"} [1]"
+
+        self.assertListEqual(list(iter_json(raw_res)), [{"a": "}"}, [1]])
+
+        # Brackets that are never closed don't hide the answer after them, even with a quote in between
+        self.assertListEqual(list(iter_json("Note [see below. Answer: {\"tests\": [\"T-1\"]}")), [{"tests": ["T-1"]}])
+        self.assertListEqual(list(iter_json("[1] Note [\"see [below. [\"T-1\"]")), [[1], ["T-1"]])
+        self.assertListEqual(find_tokens("T-1, XT-2 and T-3.", "T-"), ["T-1", "T-3"])
+
+    def test_is_answer(self):
+        self.assertTrue(is_answer(["T-1", "T-2"]))
+        self.assertTrue(is_answer([]))
+        self.assertTrue(is_answer({"requirementID": "R-0", "tests": "T-1, T-2"}))
+        self.assertTrue(is_answer([{"requirementID": "R-0", "tests": ["T-1"]}]))
+        self.assertTrue(is_answer({"R-0": ["T-1"], "R-1": "T-2"}))
+        self.assertFalse(is_answer([1]))
+        self.assertFalse(is_answer({"a": "}"}))
+        self.assertFalse(is_answer({}))
+
+    def test_corpus(self):
+        for entry in self.corpus:
+            with self.subTest(entry["name"]):
+                links, confident = self.specs._parse_output(entry["raw"])
+
+                self.assertListEqual(links, self.specs._map_test_keys(entry["tests"], None))
+                self.assertEqual(confident, entry["confident"])
@@ -0,0 +1,80 @@
+import json
+from unittest import TestCase
+from unittest.mock import patch
+import weakref
+
+from .prompt import *
+from .records import SpecRecord
+
+
+class TestWindowTests(TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+        self.tests: list[dict[str, str]] = [
+            {"ID": f"T-{i}", "Purpose": "test", "Test steps": "test"}
+            for i in range(5)
+        ]
+
+    def test_single_window(self):
+        windows: list[list[dict[str, str]]] = window_tests(self.tests, 1_000_000, len)
+
+        self.assertListEqual(windows, [self.tests])
+
+    def test_windows_fit_budget(self):
+        # Fits two tests per window
+        budget: int = 2 * len(json.dumps(self.tests[0], indent=2)) + 32
+        windows: list[list[dict[str, str]]] = window_tests(self.tests, budget, len)
+
+        self.assertListEqual([len(window) for window in windows], [2, 2, 1])
+        self.assertListEqual([test for window in windows for test in window], self.tests)
+
+    def test_oversized_tests(self):
+        windows: list[list[dict[str, str]]] = window_tests(self.tests, 1, len)
+
+        self.assertListEqual(windows, [[test] for test in self.tests])
+        self.assertRaises(ValueError, window_tests, self.tests, 1, len, True)
+
+    def test_no_tests(self):
+        self.assertListEqual(window_tests([], 1, len), [[]])
+
+
+class TestPromptTemplate(TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+        fields: dict[str, int] = SpecRecord.fields(["ID", "Purpose", "Test steps"])
+        self.tests: list[SpecRecord] = [SpecRecord(fields, (f"T-{i}", "test", "a\nb")) for i in range(3)]
+        self.req: dict[str, str] = {"ID": "R-0", "Feature": "test", "Description": "test"}
+        self.template: PromptTemplate = PromptTemplate("Tests:\n{tests}\nRequirement: {req} {reqs}")
+
+    def test_format(self):
+        for tests in (self.tests, self.tests[1:], []):
+            self.assertEqual(
+                self.template.format(req=self.req, tests=tests),
+                f"Tests:\n{json.dumps(tests, indent=2, default=dict)}\nRequirement: {json.dumps(self.req)} {{reqs}}"
+            )
+
+        self.assertEqual(self.template.prefix(self.tests), f"Tests:\n{json.dumps(self.tests, indent=2, default=dict)}\nRequirement: ")
+        self.assertListEqual(self.template.placeholders, ["{tests}", "{req}", "{reqs}"])
+
+    def test_cached_by_content(self):
+        class Test(dict):
+            pass
+
+        template: PromptTemplate = PromptTemplate("{tests}")
+        test: Test = Test(ID="T-0", Purpose="test", **{"Test steps": "test"})
+        test_ref: weakref.ref = weakref.ref(test)
+        template.format(tests=[test])
+
+        # Changed tests are serialized again, and the template doesn't keep them alive
+        test["Purpose"] = "changed"
+        self.assertEqual(template.format(tests=[test]), json.dumps([test], indent=2))
+        del test
+        self.assertIsNone(test_ref())
+
+    def test_cache_bounded(self):
+        template: PromptTemplate = PromptTemplate("{tests}")
+        with patch.object(PromptTemplate, "_MAX_CHUNKS", 2):
+            for test in self.tests:
+                template.format(tests=[test])
+
+        self.assertListEqual(list(template._chunks), [tuple(test.items()) for test in self.tests[1:]])
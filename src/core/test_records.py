@@ -0,0 +1,26 @@
+import json
+from unittest import TestCase
+
+from .records import *
+
+
+class TestSpecRecord(TestCase):
+    def setUp(self) -> None:
+        self.fields: dict[str, int] = SpecRecord.fields(["ID", "Purpose", "Test steps"])
+        self.record: SpecRecord = SpecRecord(self.fields, ("T-0", "purpose", "steps"))
+
+    def test_mapping(self):
+        self.assertEqual(self.record["Purpose"], "purpose")
+        self.assertEqual(self.record, {"ID": "T-0", "Purpose": "purpose", "Test steps": "steps"})
+        self.assertEqual(
+            json.dumps(self.record, default=dict),
+            json.dumps({"ID": "T-0", "Purpose": "purpose", "Test steps": "steps"})
+        )
+
+    def test_immutable(self):
+        with self.assertRaises(TypeError):
+            self.record["ID"] = "T-1"
+        with self.assertRaises(AttributeError):
+            self.record.extra = None
+
+        self.assertRaises(ValueError, SpecRecord, self.fields, ("T-0",))
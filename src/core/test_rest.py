@@ -1,8 +1,72 @@
+from __future__ import annotations
+import asyncio
+from io import StringIO
+import json
+import random
+import re
+from types import SimpleNamespace
+from typing import Iterator
 from unittest import TestCase
+from unittest.mock import patch
 
+from . import rest
 from .rest import *
 
 
+class _Completions:
+    # Links every requirement of a prompt to a test depending on all requirements of the prompt
+    def __init__(self, tests: int) -> None:
+        self.tests: int = tests
+        self.prompts: list[str] = []
+
+    def _complete(self, messages: list[dict[str, str]]) -> SimpleNamespace:
+        prompt: str = messages[-1]["content"]
+        self.prompts.append(prompt)
+
+        req_ids: list[str] = re.findall(r"R-\d+", prompt)
+        test_id: str = f"T-{sum(int(req_id[2:]) for req_id in req_ids) % self.tests}"
+        content: str = json.dumps({req_id: [test_id] for req_id in req_ids} if len(req_ids) > 1 else [test_id])
+
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            system_fingerprint="fp",
+            usage=SimpleNamespace(prompt_tokens=len(prompt), completion_tokens=len(content))
+        )
+
+    def create(self, model: str, messages: list[dict[str, str]], temperature: float, seed: int) -> SimpleNamespace:
+        return self._complete(messages)
+
+
+class _AsyncCompletions(_Completions):
+    # Completes each request after its delay, tracking the requests in flight
+    def __init__(self, tests: int, delays: list[float]) -> None:
+        super().__init__(tests)
+        self.delays: Iterator[float] = iter(delays)
+        self.in_flight: int = 0
+        self.max_in_flight: int = 0
+
+    async def create(self, model: str, messages: list[dict[str, str]], temperature: float, seed: int) -> SimpleNamespace:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            await asyncio.sleep(next(self.delays, 0))
+            return self._complete(messages)
+        finally:
+            self.in_flight -= 1
+
+
+class _Client:
+    def __init__(self, completions: _Completions) -> None:
+        self.chat: SimpleNamespace = SimpleNamespace(completions=completions)
+
+    async def __aenter__(self) -> _Client:
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        return None
+
+
 class TestIntermediateOutputParser(TestCase):
     def __init__(self, methodName: str = "runTest") -> None:
         super().__init__(methodName)
@@ -32,3 +96,175 @@ class TestIntermediateOutputParser(TestCase):
             res,
             ["1"]
         )
+
+    def test_drop_unknown_ids(self):
+        raw_res: str = "[\"T-0\", \"T-9999\", \"T-x\", 3]"
+        links, errors = self.specs._parse_windows([raw_res])
+
+        # The valid links are kept and the dropped IDs reported
+        self.assertListEqual(links, ["1"])
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(errors[0].startswith("Dropped 3 "))
+
+
+class TestPackedOutputParser(TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+        reqs: str = "ID,Feature,\"Description\"\n" \
+                  + "1,test,test\n" \
+                  + "2,test,test\n" \
+                  + "3,test,test"
+        tests: str = "ID,Purpose,\"Test steps\"\n" \
+                   + "1,test,test\n" \
+                   + "2,test,test"
+        self.specs: RESTSpecification = RESTSpecification.load_specs_from_str(reqs, tests)
+
+    def test_parse_packed(self):
+        raw_res: str = "Sure:\n" \
+                 + "{\n" \
+                 + "  \"R-0\": [\"T-0\", \"T-1\"],\n" \
+                 + "  \"R-1\": \"T-1\",\n" \
+                 + "  \"R-2\": []\n" \
+                 + "}"
+        res: dict[str, list[str]] = self.specs._parse_packed_output(raw_res, ["R-0", "R-1", "R-2"])
+
+        self.assertDictEqual(
+            res,
+            {"R-0": ["1", "2"], "R-1": ["2"], "R-2": []}
+        )
+
+    def test_parse_packed_partial(self):
+        raw_res: str = "{\"R-0\": [\"T-0\"], \"R-1\": [\"T-9\"]}"
+        dropped: dict[str, list[str]] = {}
+        res: dict[str, list[str]] = self.specs._parse_packed_output(raw_res, ["R-0", "R-1", "R-2"], dropped)
+
+        # Unknown tests are dropped and missing requirements are left out
+        self.assertDictEqual(
+            res,
+            {"R-0": ["1"], "R-1": []}
+        )
+        self.assertDictEqual(dropped, {"R-1": ["T-9"]})
+
+    def test_parse_packed_invalid(self):
+        self.assertRaises(Exception, self.specs._parse_packed_output, "[\"T-0\"]", ["R-0"])
+
+
+class TestLoadSpecs(TestCase):
+    def test_semicolon_delimited(self):
+        reqs: StringIO = StringIO(
+            "ID;Feature;\"Description\"\n" \
+            + "A-1;test;\"first; with a delimiter\"\n" \
+            + "A-2;test;test"
+        )
+        tests: StringIO = StringIO(
+            "ID;Purpose;Extra;\"Test steps\"\n" \
+            + "B-1;test;ignored;test"
+        )
+        specs: RESTSpecification = RESTSpecification.load_specs_from_files(reqs, tests)
+
+        self.assertSetEqual(specs.req_ids, {"A-1", "A-2"})
+        self.assertListEqual(
+            list(specs.reqs),
+            [
+                {"ID": "R-0", "Feature": "test", "Description": "first; with a delimiter"},
+                {"ID": "R-1", "Feature": "test", "Description": "test"}
+            ]
+        )
+        self.assertListEqual(list(specs.tests), [{"ID": "T-0", "Purpose": "test", "Test steps": "test"}])
+
+    def test_doubled_quotes(self):
+        # Quoted fields without doubled quotes in the sniffed lines make the sniffer guess there are none
+        rows: int = RESTSpecification._SNIFF_SIZE // 20
+        reqs: StringIO = StringIO(
+            "ID,Feature,Description\n" \
+            + "".join(f"A-{i},test,\"first, second\"\n" for i in range(rows)) \
+            + f"A-{rows},test,\"Request a \"\"Fail-over\"\" test\""
+        )
+        tests: StringIO = StringIO("ID,Purpose,Test steps\nB-1,test,test")
+        specs: RESTSpecification = RESTSpecification.load_specs_from_files(reqs, tests)
+
+        self.assertEqual(specs.reqs[0]["Description"], "first, second")
+        self.assertEqual(specs.reqs[-1]["Description"], "Request a \"Fail-over\" test")
+
+    def test_missing_fields(self):
+        reqs: StringIO = StringIO("ID;Feature\nA-1;test")
+        tests: StringIO = StringIO("ID,Purpose,\"Test steps\"\nB-1,test,test")
+
+        self.assertRaises(FieldMismatchError, RESTSpecification.load_specs_from_files, reqs, tests)
+
+
+class TestAnswerBudget(TestCase):
+    def test_budget(self):
+        tests: list[dict[str, str]] = [{"ID": f"T-{i}"} for i in range(10)]
+        count_tokens = len
+
+        single: int = RESTSpecification._answer_budget([{"ID": "R-0"}], tests, count_tokens, 1000)
+        packed: int = RESTSpecification._answer_budget([{"ID": "R-0"}, {"ID": "R-1"}], tests, count_tokens, 1000)
+
+        # The longest answer fits, and more tests or requirements allow longer answers
+        self.assertGreaterEqual(single, len("{\"requirementID\": \"R-0\", \"tests\": \"" + ", ".join(t["ID"] for t in tests) + "\"}"))
+        self.assertLess(RESTSpecification._answer_budget([{"ID": "R-0"}], tests[:2], count_tokens, 1000), single)
+        self.assertGreater(packed, single)
+        self.assertEqual(RESTSpecification._answer_budget([{"ID": "R-0"}], tests, count_tokens, 50), 50)
+
+
+class TestGPTPrompting(TestCase):
+    def setUp(self) -> None:
+        reqs: str = "ID,Feature,\"Description\"\n" \
+                  + "".join(f"A-{i},feature {i},description {i}\n" for i in range(5))
+        tests: str = "ID,Purpose,\"Test steps\"\n" \
+                   + "".join(f"B-{i},purpose {i},steps {i}\n" for i in range(3))
+        self.specs: RESTSpecification = RESTSpecification.load_specs_from_str(reqs, tests)
+        self.specs.pack_size = 2
+        self.completions: _Completions = _Completions(3)
+
+    def _records(self, skip: set[str] | None = None) -> list[dict]:
+        with patch.object(rest, "OpenAI", return_value=_Client(self.completions)):
+            records: list[dict] = [record.as_dict for record in self.specs.iter_gpt("gpt-test", skip=skip)]
+
+        # Everything but the wall-clock time is deterministic
+        for record in records:
+            del record["latency"]
+
+        return records
+
+    def test_resume_keeps_packs(self):
+        records: list[dict] = self._records()
+        prompts: list[str] = self.completions.prompts
+
+        # Resume after the first requirement of the first pack and the whole second pack are done
+        self.completions.prompts = []
+        resumed: list[dict] = self._records({"A-0", "A-2", "A-3"})
+
+        self.assertListEqual(resumed, [records[1], records[4]])
+        self.assertListEqual(self.completions.prompts, [prompts[0], prompts[2]])
+
+    def test_tests_over_context(self):
+        # The prompt alone exceeds the context, so no window can hold a test
+        with patch.object(rest, "OpenAI", return_value=_Client(self.completions)):
+            self.assertRaises(ValueError, next, self.specs.iter_gpt("gpt-test", context_window=100))
+
+        self.assertListEqual(self.completions.prompts, [])
+        # Packed prompts are counted on the first requirement of each pack
+        self.assertListEqual(self.specs.estimate_gpt("gpt-test", 100).over_context, ["A-0", "A-2", "A-4"])
+
+    def test_concurrent_matches_sequential(self):
+        for pack_size in (1, 2):
+            self.specs.pack_size = pack_size
+            with patch.object(rest, "OpenAI", return_value=_Client(_Completions(3))):
+                sequential: GPTResponse = self.specs.to_gpt("gpt-test")
+
+            for seed in range(3):
+                with self.subTest(pack_size=pack_size, seed=seed):
+                    # Complete the requests in a shuffled order
+                    delays: list[float] = [i / 1000 for i in range(len(self.specs.reqs))]
+                    random.Random(seed).shuffle(delays)
+                    completions: _AsyncCompletions = _AsyncCompletions(3, delays)
+
+                    with patch.object(rest, "AsyncOpenAI", return_value=_Client(completions)):
+                        concurrent: GPTResponse = self.specs.to_gpt("gpt-test", concurrency=2)
+
+                    self.assertDictEqual(concurrent.as_dict, sequential.as_dict)
+                    self.assertListEqual(list(concurrent.links), list(sequential.links))
+                    self.assertDictEqual(concurrent.raw_res, sequential.raw_res)
+                    self.assertEqual(completions.max_in_flight, 2)
@@ -0,0 +1,60 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from .rest import GPTResponse, Response
+from .results import *
+
+
+class TestResultRecords(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir: TemporaryDirectory = TemporaryDirectory()
+        self.path: str = os.path.join(self.tmp_dir.name, "records.jsonl")
+
+        self.records: list[ResultRecord] = [
+            ResultRecord(1, "b", [], ["traceback", "res"], (3, 4), 0.5, [{"role": "user", "content": "b"}], ["fp"]),
+            ResultRecord(0, "a", ["1", "2"], None, (1, 2), 0.25, [{"role": "user", "content": "a"}], ["fp"])
+        ]
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        with RecordWriter(self.path) as writer:
+            for record in self.records:
+                writer.write(record)
+
+        self.assertListEqual(
+            [record.as_dict for record in load_records(self.path)],
+            [record.as_dict for record in self.records]
+        )
+
+    def test_half_written_record(self):
+        with RecordWriter(self.path) as writer:
+            writer.write(self.records[0])
+
+        # Simulate a run interrupted while writing a record
+        with open(self.path, "a") as f:
+            f.write("{\"index\": 0, \"req")
+
+        self.assertEqual(len(load_records(self.path)), 1)
+
+        # Resuming drops the half-written record
+        with RecordWriter(self.path) as writer:
+            writer.write(self.records[1])
+
+        self.assertListEqual([record.req_id for record in load_records(self.path)], ["b", "a"])
+
+    def test_from_records(self):
+        res: Response = Response.from_records(self.records)
+
+        # Ordered by the position of the requirements
+        self.assertListEqual(list(res.links), ["a", "b"])
+        self.assertDictEqual(res.err, {"b": ["traceback", "res"]})
+
+    def test_gpt_from_records(self):
+        res: GPTResponse = GPTResponse.from_records("model", self.records)
+
+        self.assertEqual((res.input_tokens, res.output_tokens), (4, 6))
+        self.assertListEqual(list(res.raw_res), ["a", "b"])
+        self.assertTrue(res.fingerprint.startswith("null -> fp"))
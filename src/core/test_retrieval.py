@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+from .retrieval import *
+from .rest import RESTSpecification
+
+
+class TestBM25Index(TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+        self.index: BM25Index = BM25Index([
+            "The snake moves left and right",
+            "The score increases when eating fruit",
+            "Pause the game with the space key"
+        ])
+
+    def test_relevant_document_first(self):
+        self.assertEqual(self.index.top_k("eating fruit increases the score", 1), [1])
+
+    def test_ties_in_document_order(self):
+        self.assertListEqual(self.index.top_k("unrelated query", 3), [0, 1, 2])
+
+    def test_tokenize_case_insensitive(self):
+        self.assertListEqual(tokenize("Snake-Game, SCORE!"), ["snake", "game", "score"])
+
+
+class TestCandidateRetrieval(TestCase):
+    def __init__(self, methodName: str = "runTest") -> None:
+        super().__init__(methodName)
+        reqs: str = "ID,Feature,\"Description\"\n" \
+                  + "R1,Movement,The snake moves with the arrow keys\n" \
+                  + "R2,Score,The score increases when eating fruit"
+        tests: str = "ID,Purpose,\"Test steps\"\n" \
+                   + "T1,Score,Eat a fruit and check the score\n" \
+                   + "T2,Movement,Press the arrow keys and check that the snake moves\n" \
+                   + "T3,Pause,Press space and check that the game pauses"
+        self.specs: RESTSpecification = RESTSpecification.load_specs_from_str(reqs, tests)
+
+    def test_all_tests_without_top_k(self):
+        self.assertListEqual(self.specs.candidates("R1"), ["T1", "T2", "T3"])
+
+    def test_top_k_candidates(self):
+        self.specs.top_k = 1
+
+        self.assertListEqual(self.specs.candidates("R1"), ["T2"])
+        self.assertListEqual(self.specs.candidates("R2"), ["T1"])
+
+    def test_retrieval_recall(self):
+        self.specs.top_k = 1
+
+        self.assertEqual(self.specs.retrieval_recall({"R1": {"T2", "T3"}, "R2": {"T1"}}), 2 / 3)
+        self.assertIsNone(self.specs.retrieval_recall({"R1": set()}))
+
+    def test_top_k_without_prefix_cache(self):
+        self.specs.top_k = 1
+
+        self.assertRaises(ValueError, next, self.specs.iter_local("model", 100, prefix_cache=True))
@@ -0,0 +1,99 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from .rest import RESTSpecification
+from .tables import *
+
+
+class TestTableCache(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir: TemporaryDirectory = TemporaryDirectory()
+        self.cache_dir: str = os.path.join(self.tmp_dir.name, "tables")
+        self.path: str = os.path.join(self.tmp_dir.name, "data.csv")
+        self.parses: int = 0
+
+        self._write_source("a,b")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _write_source(self, content: str) -> None:
+        with open(self.path, "w") as f:
+            f.write(content)
+
+    def _parse(self, path: str) -> dict[str, list]:
+        self.parses += 1
+        with open(path) as f:
+            values: list[str] = f.read().split(",")
+
+        return {"value": values, "chars": [list(v) for v in values]}
+
+    def test_round_trip(self):
+        parsed: dict[str, list] = TableCache(self.cache_dir).load(self.path, "test", self._parse)
+
+        # A new cache reads the table written by the first one
+        cache: TableCache = TableCache(self.cache_dir)
+        self.assertDictEqual(cache.load(self.path, "test", self._parse), parsed)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        self.assertEqual(self.parses, 1)
+
+    def test_invalidated_on_change(self):
+        cache: TableCache = TableCache(self.cache_dir)
+        cache.load(self.path, "test", self._parse)
+
+        self._write_source("a,b,c")
+        os.utime(self.path, ns=(0, 0))
+
+        self.assertListEqual(cache.load(self.path, "test", self._parse)["value"], ["a", "b", "c"])
+        self.assertEqual(self.parses, 2)
+
+    def test_touched_source_is_hit(self):
+        cache: TableCache = TableCache(self.cache_dir)
+        cache.load(self.path, "test", self._parse)
+
+        # Same content, different modification time
+        os.utime(self.path, ns=(0, 0))
+
+        cache.load(self.path, "test", self._parse)
+        self.assertEqual(self.parses, 1)
+
+    def test_kinds_are_separate(self):
+        cache: TableCache = TableCache(self.cache_dir)
+        cache.load(self.path, "test", self._parse)
+        cache.load(self.path, "other", self._parse)
+
+        self.assertEqual(self.parses, 2)
+
+    def test_load_specs(self):
+        reqs_path: str = os.path.join(self.tmp_dir.name, "reqs.csv")
+        tests_path: str = os.path.join(self.tmp_dir.name, "tests.csv")
+        with open(reqs_path, "w") as f:
+            f.write("ID;Feature;Description\nA-1;test;\"first; second\"\nA-2;test;test\n")
+        with open(tests_path, "w") as f:
+            f.write("ID,Purpose,Extra,Test steps\nB-1,test,ignored,test\n")
+
+        cache: TableCache = TableCache(self.cache_dir)
+        parsed: RESTSpecification = RESTSpecification.load_specs(reqs_path, tests_path)
+
+        for _ in range(2):
+            specs: RESTSpecification = RESTSpecification.load_specs(reqs_path, tests_path, cache)
+
+            self.assertListEqual(list(specs.reqs), list(parsed.reqs))
+            self.assertListEqual(list(specs.tests), list(parsed.tests))
+            self.assertSetEqual(specs.req_ids, parsed.req_ids)
+            self.assertSetEqual(specs.test_ids, parsed.test_ids)
+
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_load_mapping(self):
+        mapping_path: str = os.path.join(self.tmp_dir.name, "map.csv")
+        with open(mapping_path, "w") as f:
+            f.write("Req ID,Test IDs\nA-1,\"B-1, B-2\"\nA-2,\n")
+
+        cache: TableCache = TableCache(self.cache_dir)
+        for _ in range(2):
+            self.assertDictEqual(load_mapping(mapping_path, cache), {"A-1": {"B-1", "B-2"}, "A-2": set()})
+
+        self.assertDictEqual(load_mapping(mapping_path), load_mapping(mapping_path, cache))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
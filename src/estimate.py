@@ -0,0 +1,188 @@
+"""
+Script for estimating the token usage and cost of a REST-at run before starting it.
+Renders every prompt of the run and counts its tokens, without sending anything to a model.
+Local models are counted with their tokenizer, GPT models with an approximation from the number of characters.
+The model, dataset, system prompt, and user prompt are specified through the command line.
+
+Requires the same envs as `send_data.py` and `send_data_gpt.py` to work.
+
+Copyright:
+----------
+(c) 2024 Test-Scouts
+
+License:
+--------
+MIT (see LICENSE for more information)
+"""
+import os
+import json
+import argparse
+import traceback
+
+from dotenv import load_dotenv
+
+from .core.estimate import TokenEstimate
+from .core.rest import RESTSpecification
+from .core.tables import TableCache
+
+
+# Prices in USD per million input and output tokens
+_GPT_PRICES: dict[str, tuple[float, float]] = {
+    "gpt-3.5-turbo-0125": (0.5, 1.5),
+    "gpt-4-turbo-2024-04-09": (10.0, 30.0)
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Estimate the token usage and cost of a run.")
+    parser.add_argument("--model", "-m", dest="model", type=str, default="mistral", help="Set the model to plan for. Use GPT-3.5 or GPT-4 for OpenAI's models, or Mixtral, Mixtral22, Llama, or Mistral for local models. Default is Mistral.")
+    parser.add_argument("--data", "-d", dest="data", type=str, default="GBG", help="Customize the dataset, not case sensitive. Use MIX for the mix dataset, Mix-small for mix-small-dataset, BTHS for the BTHS dataset, and GBG for the GBG dataset. Default is GBG.")
+    parser.add_argument("--system", "-S", dest="system", type=str, default=None, help="Path to the system prompt used. Falls back on a default if not provided.")
+    parser.add_argument("--prompt", "-p", dest="prompt", type=str, default=None, help="Path to the prompt used. Include `{req}` in place of the requirement and `{tests}` in place of the tests. Falls back on a default if not provided.")
+    parser.add_argument("--top-k", "-k", dest="top_k", type=int, default=None, help="Only include the k tests most relevant to each requirement in its prompt. All tests are included if not provided.")
+    parser.add_argument("--pack", "-n", dest="pack_size", type=int, default=1, help="Number of requirements to prompt together with a single copy of the tests. Default is 1.")
+    parser.add_argument("--packed-prompt", dest="packed_prompt", type=str, default=None, help="Path to the prompt used for packs of requirements. Falls back on a default if not provided.")
+    parser.add_argument("--context-window", "-w", dest="context_window", type=int, default=None, help="Override the context length of the model.")
+    parser.add_argument("--chars-per-token", dest="chars_per_token", type=float, default=None, help="Average number of characters per token when approximating tokens for GPT models. Pass the same value to send_data_gpt.py to prompt the estimated windows. Default is 3.")
+    parser.add_argument("--output-tokens", "-o", dest="output_tokens", type=int, default=None, help="Expected number of output tokens per prompt for the cost estimate. Defaults to the token limit for local models and 64 for GPT models.")
+    parser.add_argument("--input-price", dest="input_price", type=float, default=None, help="Price per million input tokens. Defaults to the list price for GPT models and 0 for local models.")
+    parser.add_argument("--output-price", dest="output_price", type=float, default=None, help="Price per million output tokens. Defaults to the list price for GPT models and 0 for local models.")
+    parser.add_argument("--out", dest="out", type=str, default=None, help="Path to write the full estimate to as JSON.")
+
+    args = parser.parse_args()
+
+    load_dotenv()
+    model: str = args.model.lower()
+    data: str = args.data.lower()
+    system_prompt_path: str = args.system
+    prompt_path: str = args.prompt
+    top_k: int | None = args.top_k
+    context_window: int | None = args.context_window
+    output_tokens: int | None = args.output_tokens
+
+    # Resolve the model and its default prices
+    gpt: bool = model.startswith("gpt")
+    model_path: str
+    token: int
+    if model == "gpt-4":
+        model_path = "gpt-4-turbo-2024-04-09"
+    elif gpt:
+        model_path = "gpt-3.5-turbo-0125"
+    elif model == "mixtral":
+        model_path = os.getenv("MODEL_PATH")
+        token = int(os.getenv("TOKEN_LIMIT"))
+    elif model == "mixtral22":
+        model_path = os.getenv("MODEL_PATH_MIX22")
+        token = int(os.getenv("TOKEN_LIMIT_MIX22"))
+    elif model == "llama":
+        model_path = os.getenv("MODEL_PATH_LLAMA")
+        token = int(os.getenv("TOKEN_LIMIT_LLAMA"))
+    else:
+        model_path = os.getenv("MODEL_PATH_MIS")
+        token = int(os.getenv("TOKEN_LIMIT_MIS"))
+
+    input_price: float
+    output_price: float
+    input_price, output_price = _GPT_PRICES.get(model_path, (0.0, 0.0))
+    if args.input_price is not None:
+        input_price = args.input_price
+    if args.output_price is not None:
+        output_price = args.output_price
+
+    if output_tokens is None:
+        output_tokens = 64 if gpt else token
+
+    print(f"Info - Planning for {model_path}")
+
+    req_path: str
+    test_path: str
+
+    if data == "mix":
+        print("Info - Using MIX data")
+        req_path = os.getenv("MIX_REQ_PATH")
+        test_path = os.getenv("MIX_TEST_PATH")
+    elif data == "mix-small":
+        print("Info - Using MIX-small data")
+        req_path = os.getenv("S_MIX_REQ_PATH")
+        test_path = os.getenv("S_MIX_TEST_PATH")
+    elif data == "bths":
+        print("Info - Using BTHS data")
+        req_path = os.getenv("BTHS_REQ_PATH")
+        test_path = os.getenv("BTHS_TEST_PATH")
+    else:
+        print("Info - Using GBG data")
+        req_path = os.getenv("GBG_REQ_PATH")
+        test_path = os.getenv("GBG_TEST_PATH")
+
+    # Load the REST specifications, reusing the files parsed by previous runs
+    tables: TableCache = TableCache()
+    specs: RESTSpecification = RESTSpecification.load_specs(
+        req_path,
+        test_path,
+        tables
+    )
+
+    # Set the system prompt, falling back on the default file
+    try:
+        with open(system_prompt_path or "./prompts/system/default.txt") as f:
+            specs.system_prompt = f.read()
+    except Exception:
+        print(f"Error loading system prompt")
+        traceback.print_exc()
+
+    # Set the prompt, falling back on the default file
+    try:
+        with open(prompt_path or "./prompts/user/default.txt") as f:
+            specs.prompt = f.read()
+    except Exception:
+        print(f"Error loading prompt")
+        traceback.print_exc()
+
+    if top_k is not None:
+        specs.top_k = top_k
+
+    # Prompt several requirements together, falling back on the default packed prompt file
+    if args.pack_size > 1:
+        specs.pack_size = args.pack_size
+
+        try:
+            with open(args.packed_prompt or "./prompts/user/packed/default.txt") as f:
+                specs.packed_prompt = f.read()
+        except Exception:
+            print(f"Error loading packed prompt")
+            traceback.print_exc()
+
+    estimate: TokenEstimate
+    if gpt:
+        estimate = specs.estimate_gpt(model_path, context_window, args.chars_per_token)
+    else:
+        estimate = specs.estimate_local(model_path, token, context_window)
+
+    report: dict = estimate.as_dict
+
+    # Per-requirement report
+    print(f"{'Requirement':<24}{'Prompts':>8}{'Input tokens':>14}{'Largest prompt':>16}")
+    for req_id, req in report["requirements"].items():
+        print(f"{req_id:<24}{req['prompts']:>8}{req['input_tokens']:>14}{req['largest_prompt']:>16}")
+
+    cost: float = estimate.cost(input_price, output_price, output_tokens)
+
+    print(f"\nPrompts: {estimate.prompts}")
+    print(f"Total input tokens: {estimate.total_input_tokens}")
+    print(f"Estimated output tokens: {estimate.prompts * output_tokens} ({output_tokens} per prompt)")
+    if report["worst_case"]:
+        print(
+            f"Largest prompt: {report['worst_case']['input_tokens']} tokens ({report['worst_case']['req_id']})"
+            + f" of a {report['max_context']} token context with {report['max_new_tokens']} reserved for the response"
+        )
+    if estimate.over_context:
+        print(f"Warning - Prompts exceeding the context: {', '.join(estimate.over_context)}")
+    print(f"Estimated cost: ${cost:.4f} (${input_price}/M input, ${output_price}/M output)")
+
+    if args.out:
+        with open(args.out, "w") as out:
+            json.dump(report | {"output_tokens": output_tokens, "cost": cost}, out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,6 @@ License:
 MIT (see LICENSE for more information)
 """
 
-import csv
 import datetime
 import json
 import os
@@ -24,6 +23,7 @@ from contextlib import redirect_stdout
 
 from .core.rest import RESTSpecification
 from .core.stats import Stats
+from .core.tables import TableCache, load_mapping
 
 
 now: datetime.datetime = datetime.datetime.now()
@@ -38,6 +38,8 @@ log_path: str = f"{res_dir}/eval.log"
 req_data: dict[str, set[str]] = {}
 test_data: dict[str, set[str]] = {}
 mapping_data: dict[str, dict[str, set[str]]] = {}
+# Parsed data files shared with later runs
+table_cache: TableCache = TableCache()
 
 
 def get_specs(req_path: str, test_path: str, mapping_path: str) -> tuple[
@@ -57,30 +59,10 @@ def get_specs(req_path: str, test_path: str, mapping_path: str) -> tuple[
         print(f"Info - \tLoading {mapping_path}")
 
         specs = RESTSpecification.load_specs(
-            req_path, test_path
+            req_path, test_path, table_cache
         )
 
-        map_: dict[str, set[str]]
-        with open(mapping_path, "r") as f:
-            fields: list[str] = [
-                "Req ID",
-                "Test IDs"
-            ]
-            reader: csv.DictReader = csv.DictReader(f)
-
-            # {"Req ID": <Req ID>, "Test IDs": <Test IDs>} for each row
-            tmp: list[dict[str, str | list[str]]] = [
-                {k: row[k] for k in row.keys() if k in fields}
-                for row in reader
-            ]
-
-            for e in tmp:
-                e["Test IDs"] = e["Test IDs"].replace(" ", "").split(",") if e["Test IDs"] else []
-
-            map_ = {
-                e["Req ID"]: (set(e["Test IDs"]) if e["Test IDs"] else set())
-                for e in tmp
-            }
+        map_: dict[str, set[str]] = load_mapping(mapping_path, table_cache)
 
         req_data[req_path] = reqs = reqs or specs.req_ids
         test_data[test_path] = tests = tests or specs.test_ids
@@ -118,6 +100,12 @@ def main() -> None:
         for d in os.listdir(f"./out/{m}"):
             for t in os.listdir(f"./out/{m}/{d}"):
                 out_path: str = f"./out/{m}/{d}/{t}/res.json"
+
+                # Runs in progress or interrupted only have their records so far
+                if not os.path.exists(out_path):
+                    print(f"Info - Skipping ./out/{m}/{d}/{t}: No res.json, the run is in progress or was interrupted")
+                    continue
+
                 print(f"Info - Evaluating {out_path}")
 
                 # Load the tool output
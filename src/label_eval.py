@@ -73,6 +73,12 @@ def main() -> None:
         for d in os.listdir(f"./out/{m}"):
             for t in os.listdir(f"./out/{m}/{d}"):
                 out_path: str = f"./out/{m}/{d}/{t}/res.json"
+
+                # Runs in progress or interrupted only have their records so far
+                if not os.path.exists(out_path):
+                    print(f"Info - Skipping ./out/{m}/{d}/{t}: No res.json, the run is in progress or was interrupted")
+                    continue
+
                 print(f"Info - Evaluating {out_path}")
 
                 # Load the tool output
@@ -30,7 +30,7 @@ if prompt := st.chat_input("What's up?"):
     with st.chat_message("user"):
         st.markdown(prompt)
 
+    # Show the response as it is generated
     with st.chat_message("assistant"):
-        output = session.prompt(prompt)
-        response = st.markdown(output)
+        st.write_stream(session.prompt_stream(prompt))
 
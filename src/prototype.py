@@ -3,9 +3,6 @@ import os
 from dotenv import load_dotenv
 from core.rest import GPTResponse, RESTSpecification, Response
 from helper import *
-from torch import bfloat16
-import transformers
-from core.model import Model
 
 
 load_dotenv()
@@ -125,6 +122,9 @@ if st.button("Generate Traceability Report"):
 def interact_with_model() -> None:
     st.header("Model Interaction", divider="rainbow")
 
+    # Only load torch and transformers when using a local model
+    from core.model import Model
+
     model_id: str = os.getenv("MODEL_PATH")
     max_new_tokens: int = int(os.getenv("TOKEN_LIMIT"))
     model: Model = Model.get(model_id, max_new_tokens)
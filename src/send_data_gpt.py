@@ -40,6 +40,7 @@ License:
 --------
 MIT (see LICENSE for more information)
 """
+import asyncio
 import datetime
 import os
 import json
@@ -48,7 +49,10 @@ import traceback
 
 from dotenv import load_dotenv
 
+from .core.cache import ResponseCache
 from .core.rest import GPTResponse, RESTSpecification
+from .core.results import RecordWriter, ResultRecord, cache_usage, load_records
+from .core.tables import TableCache, load_mapping
 
 
 def main() -> None:
@@ -58,9 +62,40 @@ def main() -> None:
     parser.add_argument("--data", "-d", dest="data", type=str, default= "GBG", help="Customize the dataset, not case sensitive. Use MIX for the mix dataset, Mix-small for mix-small-dataset, BTHS for the BTHS dataset, and GBG for the GBG dataset. Default is GBG.")
     parser.add_argument("--system", "-S", dest="system", type=str, default=None, help="Path to the system prompt used. Falls back on a default if not provided.")
     parser.add_argument("--prompt", "-p", dest="prompt", type=str, default=None, help="Path to the prompt used. Include `{req}` in place of the requirement and `{tests}` in place of the tests. Falls back on a default if not provided.")
+    parser.add_argument("--concurrency", "-c", dest="concurrency", type=int, default=None, help="Maximum number of concurrent requests to the API. Requirements are sent one at a time if not provided.")
+    parser.add_argument("--top-k", "-k", dest="top_k", type=int, default=None, help="Only include the k tests most relevant to each requirement in its prompt. All tests are included if not provided.")
+    parser.add_argument("--pack", "-n", dest="pack_size", type=int, default=1, help="Number of requirements to prompt together with a single copy of the tests. Requirements whose packed answer fails to parse are prompted individually. Default is 1.")
+    parser.add_argument("--packed-prompt", dest="packed_prompt", type=str, default=None, help="Path to the prompt used for packs of requirements. Include `{reqs}` in place of the requirements and `{tests}` in place of the tests. Falls back on a default if not provided.")
+    parser.add_argument("--chars-per-token", dest="chars_per_token", type=float, default=None, help="Average number of characters per token when approximating tokens to split the tests into windows. Use the value given to estimate.py to prompt the estimated windows. Default is 3.")
+    parser.add_argument("--no-cache", dest="no_cache", action="store_true", help="Bypass the response cache and sample fresh responses for every prompt.")
+    parser.add_argument("--resume", "-r", dest="resume", type=str, default=None, help="Path to the run directory of an interrupted run to continue. Uses the arguments of the interrupted run and skips the requirements it completed. Other arguments must be left out or match the interrupted run.")
 
     args = parser.parse_args()
 
+    # Continue an interrupted run with its original arguments
+    resume_dir: str | None = args.resume
+    run: dict | None = None
+    if resume_dir:
+        with open(f"{resume_dir}/run.json") as f:
+            run = json.load(f)
+
+        # Arguments added since the interrupted run keep their defaults
+        defaults: dict = vars(parser.parse_args([]))
+        stored: dict = defaults | run["args"]
+
+        # Refuse arguments that would be silently replaced by those of the interrupted run
+        conflicts: list[str] = [
+            max(action.option_strings, key=len)
+            for action in parser._actions
+            if action.dest in defaults and action.dest != "resume"
+            and getattr(args, action.dest) not in (defaults[action.dest], stored[action.dest])
+        ]
+        if conflicts:
+            parser.error(f"arguments differing from the interrupted run in {resume_dir}: {', '.join(conflicts)}. Resume without them to use its arguments")
+
+        args = argparse.Namespace(**stored)
+        print(f"Info - Resuming run in {resume_dir}")
+
     load_dotenv()
 
     session_name = args.session
@@ -68,6 +103,12 @@ def main() -> None:
     data: str = args.data.lower()
     system_prompt_path: str = args.system
     prompt_path: str = args.prompt
+    no_cache: bool = args.no_cache
+    top_k: int | None = args.top_k
+    pack_size: int = args.pack_size
+    packed_prompt_path: str | None = args.packed_prompt
+    concurrency: int | None = args.concurrency
+    chars_per_token: float | None = args.chars_per_token
 
     if model == "gpt-4":
         model = "gpt-4-turbo-2024-04-09"
@@ -101,10 +142,18 @@ def main() -> None:
         test_path = os.getenv("GBG_TEST_PATH")
         mapping_path = os.getenv("GBG_MAP_PATH")
 
-    # Load the REST specifications
+    # Use the exact data of the interrupted run
+    if run:
+        req_path = run["req_path"]
+        test_path = run["test_path"]
+        mapping_path = run["mapping_path"]
+
+    # Load the REST specifications, reusing the files parsed by previous runs
+    tables: TableCache = TableCache()
     specs: RESTSpecification = RESTSpecification.load_specs(
         req_path,
-        test_path
+        test_path,
+        tables
     )
 
     # Set system prompt if one was passed
@@ -165,18 +214,118 @@ def main() -> None:
             print(f"Error loading default prompt")
             traceback.print_exc()
 
-    # Send data to local model
-    res: GPTResponse = specs.to_gpt(model)
+    # Prompt several requirements together
+    if pack_size > 1:
+        specs.pack_size = pack_size
+
+        try:
+            packed_prompt: str
+            # Read the packed prompt from the specified file, falling back on the default file
+            with open(packed_prompt_path or "./prompts/user/packed/default.txt") as f:
+                packed_prompt = f.read()
+
+            specs.packed_prompt = packed_prompt
+            print(f"Using the following packed prompt:\n{packed_prompt}")
+        except Exception:
+            print(f"Error loading packed prompt")
+            traceback.print_exc()
+
+    # Use the exact prompts of the interrupted run
+    if run:
+        specs.system_prompt = run["system_prompt"]
+        specs.prompt = run["prompt"]
+        specs.packed_prompt = run.get("packed_prompt")
+
+    # Pre-filter the tests of each prompt
+    retrieval: dict | None = None
+    if top_k is not None:
+        specs.top_k = top_k
+        retrieval = {"top_k": top_k, "recall": None}
+
+        # Report how many expected trace links the candidates keep
+        if mapping_path:
+            retrieval["recall"] = specs.retrieval_recall(load_mapping(mapping_path, tables))
+            print(f"Info - Retrieval recall@{top_k}: {retrieval['recall']}")
+
+    # Reuse responses from previous runs unless bypassed
+    cache: ResponseCache | None = None if no_cache else ResponseCache()
+
+    # Create the run directory up front to stream the results into it
+    log_dir: str
+    if resume_dir:
+        log_dir = resume_dir
+    else:
+        now: datetime.datetime = datetime.datetime.now()
+        date: str = str(now.date())
+        time: str = str(now.time())
+
+        log_dir = f"./out/{session_name}/{date}/{time}"
+        os.makedirs(log_dir, exist_ok=True)
+
+        # Store everything needed to resume the run
+        run = {
+            "args": vars(args),
+            "req_path": req_path,
+            "test_path": test_path,
+            "mapping_path": mapping_path,
+            "system_prompt": specs.system_prompt,
+            "prompt": specs.prompt,
+            "packed_prompt": specs.packed_prompt
+        }
+        with open(f"{log_dir}/run.json", "w") as f:
+            json.dump(run, f, indent=2)
+
+    # Send data to the model, appending each result as it completes
+    records_path: str = f"{log_dir}/records.jsonl"
+    print(f"Info - Streaming results to {records_path}")
+
+    # Skip the requirements completed before an interruption
+    done: set[str] = set()
+    if os.path.exists(records_path):
+        done = {record.req_id for record in load_records(records_path)}
+        print(f"Info - Skipping {len(done)} completed requirements")
+
+    with RecordWriter(records_path) as writer:
+        def write(record: ResultRecord) -> None:
+            writer.write(record)
+            print(f"Info - {record.req_id}: {len(record.links)} links in {record.latency:.2f}s")
+
+        if concurrency is None:
+            for record in specs.iter_gpt(model, cache, skip=done, chars_per_token=chars_per_token):
+                write(record)
+        else:
+            async def stream() -> None:
+                async for record in specs.iter_gpt_async(model, concurrency, cache, skip=done, chars_per_token=chars_per_token):
+                    write(record)
+
+            asyncio.run(stream())
+
+    if cache:
+        cache.close()
+        print(f"Info - Response cache: {cache.hits} hits, {cache.misses} misses")
+
+    # Collect the streamed results into the layout used by eval.py
+    records: list[ResultRecord] = load_records(records_path)
+    res: GPTResponse = GPTResponse.from_records(model, records)
 
     input_tokens: int = res.input_tokens
     output_tokens: int = res.output_tokens
     fingerprint: str = res.fingerprint
 
+    # Count the cache usage of every requirement, including those completed before an interruption
+    cache_meta: dict | None = None
+    if cache:
+        usage: tuple[int, int] = cache_usage(records) or (0, 0)
+        cache_meta = {"path": str(cache.path), "hits": usage[0], "misses": usage[1]}
+
     payload: dict[str, dict] = {
         "meta": {
             "req_path": req_path,
             "test_path": test_path,
             "mapping_path": mapping_path,
+            "cache": cache_meta,
+            "retrieval": retrieval,
+            "pack_size": pack_size,
             "fingerprint": fingerprint,
             "input_tokens": input_tokens,
             "output_tokens": output_tokens
@@ -186,13 +335,6 @@ def main() -> None:
     }
 
     # Log response to a file
-    now: datetime.datetime = datetime.datetime.now()
-    date: str = str(now.date())
-    time: str = str(now.time())
-
-    log_dir: str = f"./out/{session_name}/{date}/{time}"
-    os.makedirs(log_dir, exist_ok=True)
-
     chat_log: str = f"{log_dir}/res.json"
     with open(chat_log, "w") as out:
         json.dump(payload, out, indent=2)